@@ -0,0 +1,119 @@
+# app/batching.py
+"""
+마이크로 배칭: 동시에 들어온 단건 요청을 잠깐(max_wait_ms) 모아 한 번에 처리
+- 각 호출자는 Future 로 자기 결과만 받음 (fn 은 입력과 같은 개수의 결과를 같은 순서로 반환해야 함)
+- run() 은 timeout_s 안에 결과가 없으면 TimeoutError (배처 스레드가 멈춰도 호출자는 풀려남)
+- 큐 깊이 / 배치 크기 통계를 노출해 p50 지연과 처리량을 조절
+"""
+from __future__ import annotations
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import queue
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch: int = 32,
+                 max_wait_ms: float = 5.0, name: str = "batcher", timeout_s: float = 30.0):
+        self.fn = fn
+        self.timeout_s = timeout_s
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self._q: "queue.Queue[Tuple[Any, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._max_seen = 0
+        self._size_hist: Dict[int, int] = {}
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        fut: Future = Future()
+        self._q.put((item, fut))
+        return fut
+
+    def run(self, item: Any, timeout: Optional[float] = None) -> Any:
+        return self.submit(item).result(timeout=self.timeout_s if timeout is None else timeout)
+
+    def _collect(self) -> List[Tuple[Any, Future]]:
+        batch = [self._q.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            items = [it for it, _ in batch]
+            try:
+                results = list(self.fn(items))
+                if len(results) != len(batch):
+                    raise RuntimeError(f"결과 개수 불일치: 입력 {len(batch)}개, 결과 {len(results)}개")
+                for (_, fut), res in zip(batch, results):
+                    fut.set_result(res)
+            except BaseException as e:
+                log.warning(f"[{self.name}] 배치 처리 실패 (size={len(batch)}): {e}")
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+            with self._lock:
+                n = len(batch)
+                self._batches += 1
+                self._items += n
+                self._max_seen = max(self._max_seen, n)
+                self._size_hist[n] = self._size_hist.get(n, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._q.qsize(),
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "max_batch_size": self._max_seen,
+                "batch_size_hist": dict(sorted(self._size_hist.items())),
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
+
+
+class BatchingEmbedder:
+    """
+    LocalEmbedder 앞단의 쿼리 임베딩 배처
+    - embed_one 은 배처를 거쳐 model.encode 한 번에 묶여 실행
+    - embed(대량 인덱싱)는 그대로 위임
+    """
+    def __init__(self, embedder, max_batch: int = 32, max_wait_ms: float = 5.0, timeout_s: float = 30.0):
+        self.embedder = embedder
+        self.batcher = MicroBatcher(
+            lambda texts: embedder.embed(texts, show_progress_bar=False),
+            max_batch=max_batch, max_wait_ms=max_wait_ms, name="embed-batcher", timeout_s=timeout_s,
+        )
+
+    @property
+    def dim(self) -> int:
+        return self.embedder.dim
+
+    @property
+    def model_name(self) -> str:
+        return self.embedder.model_name
+
+    def embed(self, texts: List[str], show_progress_bar: bool = True) -> List[List[float]]:
+        return self.embedder.embed(texts, show_progress_bar=show_progress_bar)
+
+    def embed_one(self, text: str) -> List[float]:
+        return self.batcher.run(text)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.batcher.stats()
@@ -0,0 +1,233 @@
+# app/cache.py
+"""
+공용 캐시 유틸
+- normalize_query: 공백 제거 + casefold (Retriever._tokenize 와 같은 공백 처리)
+- LRUCache: 크기 제한 + TTL + hit/miss/eviction 통계 (thread-safe)
+- EmbeddingCache: 쿼리 임베딩 캐시 (LRU 앞단 + 선택적 SQLite 공유 저장소)
+- SemanticAnswerCache: 유사 질문 + 동일 컨텍스트에 대한 LLM 답변 캐시
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional
+import sqlite3
+import threading
+import time
+import numpy as np
+
+_MISSING = object()
+
+
+def normalize_query(text: str) -> str:
+    return "".join(str(text).split()).casefold()
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 1024, ttl_s: float = 0.0):
+        self.maxsize = max(0, maxsize)
+        self.ttl_s = ttl_s  # 0 이하면 만료 없음
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expired = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            value, ts = item
+            if self.ttl_s > 0 and now - ts > self.ttl_s:
+                del self._data[key]
+                self.expired += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data), "maxsize": self.maxsize, "ttl_s": self.ttl_s,
+            "hits": self.hits, "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions, "expired": self.expired,
+        }
+
+
+class EmbeddingCache:
+    """
+    정규화 쿼리 → 임베딩
+    - namespace(모델명:차원)가 키에 포함되므로 모델/차원이 바뀌면 기존 항목은 자동 무효화
+    - store_path 지정 시 SQLite(WAL) 에 공유 저장 → 여러 worker 가 같은 캐시 사용
+    """
+    DDL = (
+        "CREATE TABLE IF NOT EXISTS query_embeddings ("
+        " ns TEXT NOT NULL, key TEXT NOT NULL, vec BLOB NOT NULL, ts REAL NOT NULL,"
+        " PRIMARY KEY (ns, key))"
+    )
+
+    def __init__(self, model_name: str, dim: int, maxsize: int = 2048, ttl_s: float = 86400.0,
+                 store_path: Optional[str] = None):
+        self.namespace = f"{model_name}:{dim}"
+        self.ttl_s = ttl_s
+        self.lru = LRUCache(maxsize=maxsize, ttl_s=ttl_s)
+        self.store_path = store_path or None
+        self.store_hits = 0
+        self._local = threading.local()
+        if self.store_path:
+            Path(self.store_path).parent.mkdir(parents=True, exist_ok=True)
+            con = self._con()
+            con.execute(self.DDL)
+            # 다른 모델/차원으로 만든 항목 제거
+            con.execute("DELETE FROM query_embeddings WHERE ns != ?", (self.namespace,))
+            con.commit()
+
+    def _con(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.store_path, timeout=5.0)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def get(self, query: str) -> Optional[List[float]]:
+        key = normalize_query(query)
+        vec = self.lru.get(key)
+        if vec is not None or not self.store_path:
+            return vec
+        try:
+            row = self._con().execute(
+                "SELECT vec, ts FROM query_embeddings WHERE ns=? AND key=?", (self.namespace, key)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if not row or (self.ttl_s > 0 and time.time() - row[1] > self.ttl_s):
+            return None
+        vec = np.frombuffer(row[0], dtype=np.float32).tolist()
+        self.store_hits += 1
+        self.lru.put(key, vec)
+        return vec
+
+    def put(self, query: str, vec: List[float]) -> None:
+        key = normalize_query(query)
+        self.lru.put(key, vec)
+        if not self.store_path:
+            return
+        try:
+            con = self._con()
+            con.execute(
+                "INSERT OR REPLACE INTO query_embeddings (ns, key, vec, ts) VALUES (?,?,?,?)",
+                (self.namespace, key, np.asarray(vec, dtype=np.float32).tobytes(), time.time()),
+            )
+            con.commit()
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.lru.stats(), "namespace": self.namespace,
+                "store": self.store_path, "store_hits": self.store_hits}
+
+
+class SemanticAnswerCache:
+    """
+    LLM 최종 답변 캐시
+    - 키: 쿼리 임베딩(코사인 유사도 >= threshold) + 상위 컨텍스트 문서 ID 집합 + scope
+    - scope: 답변이 의존하는 나머지 입력 (인덱스 generation, 대화 히스토리 해시 등) — 정확히 같아야 hit
+    - 같은 (scope, 컨텍스트 집합) 항목끼리만 유사도를 비교하므로 비교 대상이 작음
+    """
+    def __init__(self, threshold: float = 0.95, maxsize: int = 512, ttl_s: float = 3600.0):
+        self.threshold = threshold
+        self.maxsize = max(0, maxsize)
+        self.ttl_s = ttl_s
+        self._groups: Dict[tuple, Dict[int, tuple]] = {}     # ctx_key -> {entry_id: (vec, answer, ts)}
+        self._order: "OrderedDict[int, tuple]" = OrderedDict()  # entry_id -> ctx_key (LRU 순서)
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def _unit(vec) -> np.ndarray:
+        v = np.asarray(vec, dtype=np.float32)
+        n = float(np.linalg.norm(v))
+        return v / n if n > 0 else v
+
+    def get(self, qvec, ctx_ids: List[str], scope: Hashable = ()) -> Optional[str]:
+        ctx_key = (scope, tuple(sorted(ctx_ids)))
+        q = self._unit(qvec)
+        now = time.monotonic()
+        with self._lock:
+            group = self._groups.get(ctx_key) or {}
+            best_id, best_sim = None, -1.0
+            for entry_id, (vec, _, ts) in list(group.items()):
+                if self.ttl_s > 0 and now - ts > self.ttl_s:
+                    self._drop(entry_id)
+                    continue
+                sim = float(vec @ q)
+                if sim > best_sim:
+                    best_id, best_sim = entry_id, sim
+            if best_id is None or best_sim < self.threshold:
+                self.misses += 1
+                return None
+            self._order.move_to_end(best_id)
+            self.hits += 1
+            return group[best_id][1]
+
+    def put(self, qvec, ctx_ids: List[str], answer: str, scope: Hashable = ()) -> None:
+        if self.maxsize <= 0 or not answer:
+            return
+        ctx_key = (scope, tuple(sorted(ctx_ids)))
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._groups.setdefault(ctx_key, {})[entry_id] = (self._unit(qvec), answer, time.monotonic())
+            self._order[entry_id] = ctx_key
+            while len(self._order) > self.maxsize:
+                self._drop(next(iter(self._order)))
+                self.evictions += 1
+
+    def _drop(self, entry_id: int) -> None:
+        ctx_key = self._order.pop(entry_id, None)
+        group = self._groups.get(ctx_key)
+        if group is not None:
+            group.pop(entry_id, None)
+            if not group:
+                del self._groups[ctx_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._groups.clear()
+            self._order.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._order), "maxsize": self.maxsize, "threshold": self.threshold,
+            "hits": self.hits, "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,111 @@
+# app/concurrency.py
+"""
+블로킹 작업(임베딩, Chroma, BM25, 리랭커)을 이벤트 루프 밖에서 실행하기 위한 bounded executor
+- anyio 기본 threadpool(40) 과 분리해 retrieval 이 다른 요청 처리를 굶기지 않도록 함
+- 포화 지표: executor 대기열/실행 중 작업 수/대기 시간, 이벤트 루프 지연 (/debug/runtime)
+"""
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+from .config import settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+# executor 사용량 (run_blocking 경유 작업만)
+_stats_lock = threading.Lock()
+_active = 0
+_submitted = 0
+_completed = 0
+_wait_ewma_ms = 0.0
+_wait_max_ms = 0.0
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, settings.retrieval_workers),
+                    thread_name_prefix="retrieval",
+                )
+    return _executor
+
+
+def _tracked(fn: Callable[[], Any], submitted_at: float) -> Any:
+    global _active, _completed, _wait_ewma_ms, _wait_max_ms
+    wait_ms = (time.perf_counter() - submitted_at) * 1000.0
+    with _stats_lock:
+        _active += 1
+        _wait_ewma_ms += 0.1 * (wait_ms - _wait_ewma_ms)
+        _wait_max_ms = max(_wait_max_ms, wait_ms)
+    try:
+        return fn()
+    finally:
+        with _stats_lock:
+            _active -= 1
+            _completed += 1
+
+
+async def run_blocking(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    global _submitted
+    loop = asyncio.get_running_loop()
+    with _stats_lock:
+        _submitted += 1
+    return await loop.run_in_executor(get_executor(), _tracked, partial(fn, *args, **kwargs), time.perf_counter())
+
+
+def executor_stats(reset_max: bool = False) -> Dict[str, Any]:
+    """retrieval executor 포화도 — queued > 0 이 계속되면 RETRIEVAL_WORKERS 부족"""
+    global _wait_max_ms
+    ex = get_executor()
+    with _stats_lock:
+        out = {
+            "max_workers": ex._max_workers,
+            "active": _active,
+            "queued": ex._work_queue.qsize(),
+            "submitted": _submitted,
+            "completed": _completed,
+            "queue_wait_ms_ewma": round(_wait_ewma_ms, 2),
+            "queue_wait_ms_max": round(_wait_max_ms, 2),
+        }
+        if reset_max:
+            _wait_max_ms = 0.0
+    return out
+
+
+class LoopLagMonitor:
+    """interval_s 마다 깨어나 예정보다 늦은 시간(이벤트 루프 지연)을 기록"""
+    def __init__(self, interval_s: float = 0.1):
+        self.interval_s = interval_s
+        self.last_ms = self.ewma_ms = self.max_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(self.interval_s)
+            lag = max(0.0, (loop.time() - t0 - self.interval_s) * 1000.0)
+            self.last_ms = lag
+            self.ewma_ms += 0.1 * (lag - self.ewma_ms)
+            self.max_ms = max(self.max_ms, lag)
+
+    def stats(self, reset_max: bool = False) -> Dict[str, Any]:
+        out = {"running": self._task is not None, "last_ms": round(self.last_ms, 2),
+               "ewma_ms": round(self.ewma_ms, 2), "max_ms": round(self.max_ms, 2)}
+        if reset_max:
+            self.max_ms = 0.0
+        return out
+
+
+loop_lag = LoopLagMonitor()
@@ -13,7 +13,16 @@ class Settings(BaseSettings):
     openai_api_key: str = Field(default="", alias="OPENAI_API_KEY")
     openai_chat_model: str = Field(default="gpt-4o-mini", alias="OPENAI_CHAT_MODEL")
     gemini_api_key: str = Field(default="", alias="GEMINI_API_KEY")
-    llm_provider: str = Field(default="gemini", alias="LLM_PROVIDER")  # "openai" or "gemini"
+    llm_provider: str = Field(default="gemini", alias="LLM_PROVIDER")  # "openai", "gemini" or "stub"(부하 테스트)
+    llm_warmup: bool = Field(default=True, alias="LLM_WARMUP")  # 시작 시 provider 클라이언트 미리 연결
+    # provider 라우팅: 다른 provider 키가 있으면 failover/hedge 대상으로 사용
+    llm_failover: bool = Field(default=True, alias="LLM_FAILOVER")
+    llm_hedge_after_ms: float = Field(default=0.0, alias="LLM_HEDGE_AFTER_MS")  # 0 이면 hedging 끔 (켜면 느린 요청마다 upstream 호출이 2배)
+    llm_first_token_timeout_ms: float = Field(default=15000.0, alias="LLM_FIRST_TOKEN_TIMEOUT_MS")  # 0 이면 제한 없음
+    llm_max_concurrency_openai: int = Field(default=32, alias="LLM_MAX_CONCURRENCY_OPENAI")
+    llm_max_concurrency_gemini: int = Field(default=32, alias="LLM_MAX_CONCURRENCY_GEMINI")
+    llm_breaker_failures: int = Field(default=5, alias="LLM_BREAKER_FAILURES")
+    llm_breaker_reset_s: float = Field(default=30.0, alias="LLM_BREAKER_RESET_S")
 
     # Local embeddings (BAAI/bge-m3)
     local_embed_model: str = Field(default="BAAI/bge-m3", alias="LOCAL_EMBED_MODEL")
@@ -22,6 +31,26 @@ class Settings(BaseSettings):
     # Storage
     chroma_path: str = Field(default="data/chroma", alias="CHROMA_PATH")
     sqlite_path: str = Field(default="data/memory.db", alias="SQLITE_PATH")
+    # 대화 메모리 백엔드: pooled(WAL + 스레드별 연결 + 배치 쓰기) | sqlite(호출마다 연결)
+    memory_backend: str = Field(default="pooled", alias="MEMORY_BACKEND")
+    sqlite_synchronous: str = Field(default="NORMAL", alias="SQLITE_SYNCHRONOUS")  # WAL 에서는 NORMAL 로 충분
+    sqlite_busy_timeout_ms: int = Field(default=5000, alias="SQLITE_BUSY_TIMEOUT_MS")
+    memory_write_batch: int = Field(default=64, alias="MEMORY_WRITE_BATCH")
+    memory_write_wait_ms: float = Field(default=10.0, alias="MEMORY_WRITE_WAIT_MS")
+    # 대화별 최근 턴 캐시 (대화 단위 LRU + idle TTL), 0 이면 끔 — chat 히스토리 창(12턴) 이상으로 설정
+    history_cache_size: int = Field(default=4096, alias="HISTORY_CACHE_SIZE")
+    history_cache_ttl_s: float = Field(default=1800.0, alias="HISTORY_CACHE_TTL_S")
+    history_window: int = Field(default=12, alias="HISTORY_WINDOW")
+
+    # 대화 보존 정책 (0 이면 해당 규칙 끔) — 마지막 메시지 기준 TTL, 대화별 최대 메시지 수
+    retention_ttl_days: float = Field(default=0.0, alias="RETENTION_TTL_DAYS")
+    retention_max_turns: int = Field(default=0, alias="RETENTION_MAX_TURNS")
+    retention_interval_s: float = Field(default=3600.0, alias="RETENTION_INTERVAL_S")
+    retention_chunk_size: int = Field(default=500, alias="RETENTION_CHUNK_SIZE")
+    retention_archive_dir: str = Field(default="", alias="RETENTION_ARCHIVE_DIR")  # 비우면 보관 없이 삭제
+    retention_vacuum_pages: int = Field(default=1000, alias="RETENTION_VACUUM_PAGES")
+    # 기존 DB 를 auto_vacuum=INCREMENTAL 로 바꾸는 전체 VACUUM 을 retention 스레드에서 실행 (배타 락 — 기본 끔)
+    retention_convert_vacuum: bool = Field(default=False, alias="RETENTION_CONVERT_VACUUM")
 
     # Retrieval
     top_k: int = Field(default=6, alias="TOP_K")
@@ -29,10 +58,88 @@ class Settings(BaseSettings):
     score_threshold: float = Field(default=0.18, alias="SCORE_THRESHOLD")
     enable_reranker: bool = Field(default=True, alias="ENABLE_RERANKER")  # default True
     reranker_model: str = Field(default="BAAI/bge-reranker-v2-m3", alias="RERANKER_MODEL")
+    # 리랭커 backend: flag(FlagEmbedding) / onnx(int8 양자화 ONNX, RERANKER_ONNX_PATH 디렉토리)
+    reranker_backend: str = Field(default="flag", alias="RERANKER_BACKEND")
+    reranker_onnx_path: str = Field(default="", alias="RERANKER_ONNX_PATH")
+    reranker_onnx_threads: int = Field(default=0, alias="RERANKER_ONNX_THREADS")  # 0: onnxruntime 기본값
+    reranker_fp16: str = Field(default="auto", alias="RERANKER_FP16")  # auto: GPU 일 때만
+    # 후보 본문 토큰 예산, 융합 점수 1·2위 차이가 이 이상이면 리랭킹 생략 (0: 항상 리랭킹)
+    # 기본값은 기존 동작(512 토큰, cascade 없음) — 줄이기 전에 scripts/bench_rerank.py 로 recall@k 유지 확인
+    rerank_max_tokens: int = Field(default=512, alias="RERANK_MAX_TOKENS")
+    rerank_skip_margin: float = Field(default=0.0, alias="RERANK_SKIP_MARGIN")
+    # 동시 요청의 (query, passage) 쌍을 모아 한 번에 점수화
+    rerank_batch_enabled: bool = Field(default=True, alias="RERANK_BATCH_ENABLED")
+    rerank_batch_max_size: int = Field(default=8, alias="RERANK_BATCH_MAX_SIZE")  # 요청 수
+    rerank_batch_max_wait_ms: float = Field(default=3.0, alias="RERANK_BATCH_MAX_WAIT_MS")
+    # rerank 점수 캐시 ((정규화 쿼리, doc_id, 인덱스 generation) 쌍 단위, 0 이면 끔)
+    rerank_cache_size: int = Field(default=20000, alias="RERANK_CACHE_SIZE")
+    rerank_cache_ttl_s: float = Field(default=0.0, alias="RERANK_CACHE_TTL_S")
+
+    # fuzzy 제목 fallback: 제목이 PREFILTER_MIN 개 초과면 bigram 공유 상위 MAX_CANDIDATES 개만 partial_ratio 계산
+    fuzzy_max_candidates: int = Field(default=1024, alias="FUZZY_MAX_CANDIDATES")
+    fuzzy_prefilter_min: int = Field(default=2000, alias="FUZZY_PREFILTER_MIN")
 
     # Hybrid fuse weight (dense score contribution multiplier)
     hybrid_dense_weight: float = Field(default=0.2, alias="HYBRID_DENSE_WEIGHT")
+    # 점수 융합: legacy(기존 가중합) / rrf / minmax / zscore, 가중치 파일(JSON)이 있으면 우선
+    fusion_mode: str = Field(default="legacy", alias="FUSION_MODE")
+    fusion_weights_path: str = Field(default="", alias="FUSION_WEIGHTS_PATH")
+    # leg 별 후보 수 (0: RERANK_TOP_K) — 보정된 융합에서는 줄여도 recall 유지 가능
+    retrieval_candidate_k: int = Field(default=0, alias="RETRIEVAL_CANDIDATE_K")
+
+    # Concurrency (retrieval/embedding 전용 executor 크기)
+    retrieval_workers: int = Field(default=8, alias="RETRIEVAL_WORKERS")
+    # dense/sparse/history 단계를 동시에 실행 (단계별 타임아웃, ms)
+    parallel_retrieval: bool = Field(default=True, alias="PARALLEL_RETRIEVAL")
+    dense_timeout_ms: int = Field(default=5000, alias="DENSE_TIMEOUT_MS")
+    sparse_timeout_ms: int = Field(default=2000, alias="SPARSE_TIMEOUT_MS")
+    history_timeout_ms: int = Field(default=2000, alias="HISTORY_TIMEOUT_MS")
+
+    # LLM_PROVIDER=stub: 첫 토큰 지연(±jitter 비율), 초당 토큰 수, 첫 토큰 전 오류 확률, 응답 토큰 수
+    llm_stub_ttft_ms: float = Field(default=300.0, alias="LLM_STUB_TTFT_MS")
+    llm_stub_tokens_per_s: float = Field(default=50.0, alias="LLM_STUB_TOKENS_PER_S")
+    llm_stub_error_rate: float = Field(default=0.0, alias="LLM_STUB_ERROR_RATE")
+    llm_stub_tokens: int = Field(default=120, alias="LLM_STUB_TOKENS")
+    llm_stub_jitter: float = Field(default=0.2, alias="LLM_STUB_JITTER")
+
+    # /metrics (Prometheus) 단계별 지연 히스토그램 / 의도·fallback 카운터 기록
+    metrics_enabled: bool = Field(default=True, alias="METRICS_ENABLED")
+
+    # 쿼리 임베딩 마이크로 배칭 (동시 요청을 max_wait_ms 동안 모아 한 번에 encode)
+    embed_batch_enabled: bool = Field(default=True, alias="EMBED_BATCH_ENABLED")
+    embed_batch_max_size: int = Field(default=32, alias="EMBED_BATCH_MAX_SIZE")
+    embed_batch_max_wait_ms: float = Field(default=5.0, alias="EMBED_BATCH_MAX_WAIT_MS")
+    embed_batch_timeout_s: float = Field(default=30.0, alias="EMBED_BATCH_TIMEOUT_S")  # 호출자 최대 대기
+
+    # 쿼리 임베딩 캐시 (정규화 쿼리 키, LRU+TTL, path 지정 시 SQLite 공유 저장)
+    embed_cache_size: int = Field(default=2048, alias="EMBED_CACHE_SIZE")
+    embed_cache_ttl_s: float = Field(default=86400.0, alias="EMBED_CACHE_TTL_S")
+    embed_cache_path: str = Field(default="", alias="EMBED_CACHE_PATH")
+
+    # retrieve() 결과 캐시 (정규화 쿼리 + k + 융합 가중치 + 인덱스 generation 키)
+    result_cache_size: int = Field(default=1024, alias="RESULT_CACHE_SIZE")
+    result_cache_ttl_s: float = Field(default=0.0, alias="RESULT_CACHE_TTL_S")  # 0: 만료 없음
+
+    # LLM 답변 시맨틱 캐시 (쿼리 임베딩 코사인 >= threshold + 상위 컨텍스트 ID 동일)
+    answer_cache_enabled: bool = Field(default=True, alias="ANSWER_CACHE_ENABLED")
+    answer_cache_threshold: float = Field(default=0.95, alias="ANSWER_CACHE_THRESHOLD")
+    answer_cache_size: int = Field(default=512, alias="ANSWER_CACHE_SIZE")
+    answer_cache_ttl_s: float = Field(default=3600.0, alias="ANSWER_CACHE_TTL_S")
+    answer_cache_ctx_k: int = Field(default=3, alias="ANSWER_CACHE_CTX_K")
+
+    # sparse 인덱스 증분 갱신: delta(추가/수정) + tombstone 이 max(MIN_OPS, RATIO * base 문서 수) 를 넘으면 compaction
+    sparse_compact_ratio: float = Field(default=0.2, alias="SPARSE_COMPACT_RATIO")
+    sparse_compact_min_ops: int = Field(default=1000, alias="SPARSE_COMPACT_MIN_OPS")
+    # 다른 worker 의 증분 변경(저널)을 확인하는 최소 간격
+    index_refresh_interval_s: float = Field(default=1.0, alias="INDEX_REFRESH_INTERVAL_S")
     
+    # greeting/thanks 는 키워드만으로 라우팅하고 retrieval 생략
+    intent_preroute: bool = Field(default=True, alias="INTENT_PREROUTE")
+
+    # guard 키워드 파일 (비우면 app/data/keywords.json), 변경 확인 간격
+    keywords_path: str = Field(default="", alias="KEYWORDS_PATH")
+    keywords_reload_interval_s: float = Field(default=5.0, alias="KEYWORDS_RELOAD_INTERVAL_S")
+
     # 차원 불일치 방지
     expected_embed_dim_env: str | None = os.getenv("EXPECTED_EMBED_DIM", "").strip() or None
     
@@ -0,0 +1,123 @@
+# app/docstore.py
+"""
+mmap 기반 문서 저장소 (bm25_docs.pkl 대체)
+- docs.bin      : 문서별 UTF-8 JSON 레코드를 이어 붙인 파일
+- offsets.npy   : int64[N+1] 레코드 경계
+- ids.npy       : row 순서의 문서 ID (BM25 row → doc_id)
+- keys.npy / key_rows.npy : 정렬된 ID 와 해당 row (doc_id → row, searchsorted)
+레코드는 접근할 때만 디코드하므로 로드 비용이 코퍼스 크기와 무관합니다.
+"""
+from __future__ import annotations
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+import json
+import mmap
+import numpy as np
+
+DOC_FIELDS = ("id", "text", "title", "url", "category")
+
+
+class DocStore(Mapping):
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.offsets = np.load(self.path / "offsets.npy", mmap_mode="r")
+        self.ids = np.load(self.path / "ids.npy", mmap_mode="r")
+        self._keys = np.load(self.path / "keys.npy", mmap_mode="r")
+        self._key_rows = np.load(self.path / "key_rows.npy", mmap_mode="r")
+        with open(self.path / "docs.bin", "rb") as f:
+            size = f.seek(0, 2)
+            # 빈 파일은 mmap 불가
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    @staticmethod
+    def write(path: str | Path, docs: Iterable[Dict[str, Any]]) -> None:
+        with DocStoreWriter(path) as w:
+            for d in docs:
+                w.add(d)
+
+    @staticmethod
+    def exists(path: str | Path) -> bool:
+        return (Path(path) / "offsets.npy").exists()
+
+    # ---------------- row 접근 ----------------
+    def id_at(self, row: int) -> str:
+        return str(self.ids[row])
+
+    def get_row(self, row: int) -> Dict[str, Any]:
+        s, e = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(bytes(self._buf[s:e]).decode("utf-8"))
+
+    def row_of(self, doc_id: str) -> int:
+        if not len(self._keys):
+            return -1
+        # 중복 ID 는 마지막 row 가 우선 (dict 덮어쓰기와 동일)
+        pos = int(np.searchsorted(self._keys, doc_id, side="right")) - 1
+        if pos >= 0 and self._keys[pos] == doc_id:
+            return int(self._key_rows[pos])
+        return -1
+
+    # ---------------- Mapping ----------------
+    def __getitem__(self, doc_id: str) -> Dict[str, Any]:
+        row = self.row_of(doc_id)
+        if row < 0:
+            raise KeyError(doc_id)
+        return self.get_row(row)
+
+    def __contains__(self, doc_id: object) -> bool:
+        return isinstance(doc_id, str) and self.row_of(doc_id) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        for row in range(len(self)):
+            yield self.id_at(row)
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    def items(self):
+        for row in range(len(self)):
+            yield self.id_at(row), self.get_row(row)
+
+    def values(self):
+        for row in range(len(self)):
+            yield self.get_row(row)
+
+
+class DocStoreWriter:
+    """문서를 하나씩 append — 레코드는 바로 docs.bin 에 쓰고 ID/offset 만 메모리에 유지"""
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path / "docs.bin", "wb")
+        self._offsets: List[int] = [0]
+        self._ids: List[str] = []
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        rec = json.dumps({k: doc.get(k, "") for k in DOC_FIELDS}, ensure_ascii=False).encode("utf-8")
+        self._f.write(rec)
+        self._offsets.append(self._offsets[-1] + len(rec))
+        self._ids.append(str(doc["id"]))
+
+    def add_raw(self, rec: bytes, doc_id: str) -> None:
+        """이미 직렬화된 레코드 (IndexBuilder spill 파일 병합용)"""
+        self._f.write(rec)
+        self._offsets.append(self._offsets[-1] + len(rec))
+        self._ids.append(doc_id)
+
+    def close(self) -> None:
+        self._f.close()
+        ids = np.array(self._ids, dtype=str) if self._ids else np.zeros(0, dtype="<U1")
+        order = np.argsort(ids, kind="stable")
+        np.save(self.path / "offsets.npy", np.array(self._offsets, dtype=np.int64), allow_pickle=False)
+        np.save(self.path / "ids.npy", ids, allow_pickle=False)
+        np.save(self.path / "keys.npy", ids[order], allow_pickle=False)
+        np.save(self.path / "key_rows.npy", order.astype(np.int64), allow_pickle=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.close()
@@ -47,9 +47,10 @@ class LocalEmbedder:
     def dim(self) -> int:
         return self._dim
 
-    def embed(self, texts: List[str]) -> List[List[float]]:
-        vecs = self.model.encode(texts, batch_size=64, show_progress_bar=True, normalize_embeddings=True)
+    def embed(self, texts: List[str], show_progress_bar: bool = True) -> List[List[float]]:
+        vecs = self.model.encode(texts, batch_size=64, show_progress_bar=show_progress_bar, normalize_embeddings=True)
         return [v.tolist() for v in vecs]
 
     def embed_one(self, text: str) -> List[float]:
-        return self.embed([text])[0]
+        # 쿼리 단건: 진행바 출력 비용 제거
+        return self.embed([text], show_progress_bar=False)[0]
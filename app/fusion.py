@@ -0,0 +1,166 @@
+# app/fusion.py
+"""
+하이브리드 점수 융합 (dense / sparse leg → 문서별 점수 하나)
+- legacy : dense(1-거리) * w + min(bm25/10, 1) * (1-w), 리랭크 점수는 그대로 덮어씀 (기존 동작)
+- rrf    : Σ w_leg / (rrf_k + 순위), 모든 leg 1위면 1.0 이 되도록 정규화
+- minmax : leg 별 min-max 정규화 후 가중합 (없는 leg 는 0)
+- zscore : leg 별 z-score 가중합 → sigmoid 로 0~1 (없는 leg 는 그 leg 의 최저 z)
+legacy 외 모드에서는 리랭크 점수(logit)를 sigmoid(scale * x + bias) 로 0~1 로 보정하고,
+리랭크되지 않은 후보는 리랭크된 후보 아래에 융합 점수 순서로 둠 → score_threshold 와 같은 척도
+
+가중치 파일(FUSION_WEIGHTS_PATH, JSON — 오프라인 학습 결과를 그대로 저장):
+  {"dense": 0.4, "sparse": 0.6, "rrf_k": 60, "rerank_scale": 1.0, "rerank_bias": 0.0}
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import heapq
+import json
+import logging
+import math
+from .config import settings
+
+log = logging.getLogger(__name__)
+
+MODES = ("legacy", "rrf", "minmax", "zscore")
+
+Hits = Sequence[Tuple[str, float]]
+
+
+def _sigmoid(x: float) -> float:
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    e = math.exp(x)
+    return e / (1.0 + e)
+
+
+@dataclass
+class FusionWeights:
+    dense: float = 0.2
+    sparse: float = 0.8
+    rrf_k: float = 60.0
+    rerank_scale: float = 1.0
+    rerank_bias: float = 0.0
+
+    @classmethod
+    def load(cls, path: str = "", dense_weight: Optional[float] = None) -> "FusionWeights":
+        """파일이 없으면 HYBRID_DENSE_WEIGHT 기반 기본값"""
+        w = settings.hybrid_dense_weight if dense_weight is None else dense_weight
+        weights = cls(dense=w, sparse=1.0 - w)
+        if path:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                for name in cls.__dataclass_fields__:
+                    if name in data:
+                        setattr(weights, name, float(data[name]))
+            except Exception as e:
+                log.warning(f"[fusion] 가중치 파일 로드 실패 ({path}): {e} — 기본값 사용")
+        return weights
+
+
+class Fusion:
+    def __init__(self, mode: str = "legacy", weights: Optional[FusionWeights] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unsupported fusion mode: {mode} (choose from {MODES})")
+        self.mode = mode
+        self.weights = weights or FusionWeights.load()
+
+    # ---------------- leg 융합 ----------------
+    def fuse(self, dense: Hits, sparse: Hits) -> Dict[str, float]:
+        legs = [(dense, self.weights.dense), (sparse, self.weights.sparse)]
+        if self.mode == "legacy":
+            return self._legacy(dense, sparse)
+        if self.mode == "rrf":
+            return self._rrf(legs)
+        if self.mode == "minmax":
+            return self._minmax(legs)
+        return self._zscore(legs)
+
+    def _legacy(self, dense: Hits, sparse: Hits) -> Dict[str, float]:
+        fused: Dict[str, float] = {}
+        w = self.weights.dense
+        for doc_id, score in dense:
+            fused[doc_id] = fused.get(doc_id, 0.0) + (score * w)
+        for doc_id, bm25_score in sparse:
+            # BM25 점수 정규화 (0~1 범위로)
+            fused[doc_id] = fused.get(doc_id, 0.0) + (min(bm25_score / 10.0, 1.0) * (1.0 - w))
+        return fused
+
+    def _rrf(self, legs) -> Dict[str, float]:
+        k = self.weights.rrf_k
+        fused: Dict[str, float] = {}
+        for hits, w in legs:
+            ranked = sorted(hits, key=lambda x: x[1], reverse=True)
+            for rank, (doc_id, _) in enumerate(ranked, start=1):
+                fused[doc_id] = fused.get(doc_id, 0.0) + w / (k + rank)
+        best = sum(w for hits, w in legs if hits) / (k + 1)
+        return {d: s / best for d, s in fused.items()} if best > 0 else fused
+
+    def _minmax(self, legs) -> Dict[str, float]:
+        fused: Dict[str, float] = {}
+        total = sum(w for hits, w in legs if hits)
+        for hits, w in legs:
+            if not hits:
+                continue
+            lo = min(s for _, s in hits)
+            hi = max(s for _, s in hits)
+            span = hi - lo
+            for doc_id, s in hits:
+                norm = (s - lo) / span if span > 0 else 1.0
+                fused[doc_id] = fused.get(doc_id, 0.0) + w * norm
+        return {d: s / total for d, s in fused.items()} if total > 0 else fused
+
+    def _zscore(self, legs) -> Dict[str, float]:
+        per_leg: List[Tuple[Dict[str, float], float, float]] = []
+        for hits, w in legs:
+            if not hits:
+                continue
+            xs = [s for _, s in hits]
+            mean = sum(xs) / len(xs)
+            std = math.sqrt(sum((x - mean) ** 2 for x in xs) / len(xs))
+            z = {d: ((s - mean) / std if std > 0 else 0.0) for d, s in hits}
+            per_leg.append((z, w, min(z.values())))
+        total = sum(w for _, w, _ in per_leg)
+        docs = dict.fromkeys(d for z, _, _ in per_leg for d in z)  # 순서 고정 (동점 처리)
+        fused = {}
+        for d in docs:
+            combined = sum(w * z.get(d, floor) for z, w, floor in per_leg)
+            fused[d] = _sigmoid(combined / total) if total > 0 else 0.0
+        return fused
+
+    # ---------------- 리랭크 / 상위 k ----------------
+    def calibrate(self, rerank_score: float) -> float:
+        return _sigmoid(self.weights.rerank_scale * rerank_score + self.weights.rerank_bias)
+
+    def apply_rerank(self, fused: Dict[str, float], rerank_scores: Dict[str, float]) -> Dict[str, float]:
+        if not rerank_scores:
+            return fused
+        if self.mode == "legacy":
+            out = dict(fused)
+            out.update(rerank_scores)  # 기존 동작: raw 점수로 덮어씀
+            return out
+        out = {d: self.calibrate(s) for d, s in rerank_scores.items()}
+        floor = min(out.values())
+        for d, s in fused.items():
+            if d not in out:
+                out[d] = floor * min(max(s, 0.0), 1.0)  # 0~1 융합 점수를 floor 아래로 (순서 유지)
+        return out
+
+    @staticmethod
+    def top(scores: Dict[str, float], n: int) -> List[Tuple[str, float]]:
+        return heapq.nlargest(n, scores.items(), key=lambda x: x[1])
+
+    @property
+    def cache_key(self) -> Tuple:
+        """결과 캐시 키에 넣을 설정 (모드/가중치가 바뀌면 다른 결과)"""
+        w = self.weights
+        return (self.mode, w.dense, w.sparse, w.rrf_k, w.rerank_scale, w.rerank_bias)
+
+    def describe(self) -> Dict[str, object]:
+        return {"mode": self.mode, **self.weights.__dict__}
+
+
+def build_fusion() -> Fusion:
+    mode = (settings.fusion_mode or "legacy").lower()
+    return Fusion(mode, FusionWeights.load(settings.fusion_weights_path))
@@ -0,0 +1,145 @@
+# app/index_builder.py
+"""
+스트리밍 sparse/doc 인덱스 빌더 (scripts/build_index.py 용)
+- 청크마다 spill 파일(chunk_XXXXX.docs.jsonl + chunk_XXXXX.npz)을 쓰고 마지막에 병합
+- spill 파일은 청크 단위로 원자적으로 생성되므로 중단 후 재실행 시 이어서 진행
+- 병합은 청크를 하나씩 읽어 np.memmap 출력에 흩어 쓰므로 메모리는 vocab 크기 + 청크 크기
+결과물은 Retriever 가 여는 {INDEX_DIR}/bm25, {INDEX_DIR}/docs 포맷과 동일합니다.
+"""
+from __future__ import annotations
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+import json
+import os
+import shutil
+import numpy as np
+from numpy.lib.format import open_memmap
+from .sparse import calc_idf, write_meta
+from .docstore import DocStoreWriter, DOC_FIELDS
+
+
+def replace_dir(tmp: Path, root: Path) -> None:
+    """tmp 디렉토리로 root 를 교체 — 기존 mmap 사용자는 이전 inode 를 계속 사용"""
+    old = root.with_name(root.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if root.exists():
+        root.rename(old)
+    tmp.rename(root)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+class IndexBuilder:
+    def __init__(self, work_dir: str | Path):
+        self.work_dir = Path(work_dir)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+
+    def _chunk_path(self, i: int) -> Path:
+        return self.work_dir / f"chunk_{i:05d}"
+
+    def has_chunk(self, i: int) -> bool:
+        return self._chunk_path(i).with_suffix(".npz").exists()
+
+    def chunk_count(self) -> int:
+        n = 0
+        while self.has_chunk(n):
+            n += 1
+        return n
+
+    def write_chunk(self, i: int, docs: List[Dict[str, Any]], tokenized: Sequence[Sequence[str]]) -> None:
+        base = self._chunk_path(i)
+        with open(base.with_suffix(".docs.jsonl"), "wb") as f:
+            for d in docs:
+                rec = json.dumps({k: d.get(k, "") for k in DOC_FIELDS}, ensure_ascii=False)
+                f.write(rec.encode("utf-8") + b"\n")
+
+        vocab: Dict[str, int] = {}
+        tok, doc, tf = [], [], []
+        doc_len = np.zeros(len(tokenized), dtype=np.float32)
+        for j, tokens in enumerate(tokenized):
+            doc_len[j] = len(tokens)
+            for t, c in Counter(tokens).items():
+                tok.append(vocab.setdefault(t, len(vocab)))
+                doc.append(j)
+                tf.append(c)
+        tmp = base.with_suffix(".tmp.npz")
+        np.savez(
+            tmp,
+            vocab=np.array(list(vocab), dtype=str) if vocab else np.zeros(0, dtype="<U1"),
+            tok=np.array(tok, dtype=np.int64), doc=np.array(doc, dtype=np.int32),
+            tf=np.array(tf, dtype=np.float32), doc_len=doc_len,
+        )
+        # npz 존재 = 청크 완료 표시 (원자적 rename)
+        os.replace(tmp, base.with_suffix(".npz"))
+
+    def _load_chunk(self, i: int):
+        return np.load(self._chunk_path(i).with_suffix(".npz"), allow_pickle=False)
+
+    def finalize(self, out_dir: str | Path, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25) -> Dict[str, Any]:
+        n_chunks = self.chunk_count()
+        out_dir = Path(out_dir)
+        tmp = out_dir.with_name(out_dir.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        bm25_dir = tmp / "bm25"
+        bm25_dir.mkdir(parents=True)
+
+        # 1) 전역 vocab (정렬) — 청크별 vocab 합집합
+        vocab = np.zeros(0, dtype="<U1")
+        for i in range(n_chunks):
+            vocab = np.union1d(vocab, self._load_chunk(i)["vocab"])
+
+        # 2) df / 문서 길이
+        df = np.zeros(len(vocab), dtype=np.int64)
+        doc_lens, nnz = [], 0
+        for i in range(n_chunks):
+            c = self._load_chunk(i)
+            rows = np.searchsorted(vocab, c["vocab"])[c["tok"]]
+            df += np.bincount(rows, minlength=len(vocab))
+            doc_lens.append(c["doc_len"])
+            nnz += len(rows)
+        doc_len = np.concatenate(doc_lens) if doc_lens else np.zeros(0, dtype=np.float32)
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=indptr[1:])
+
+        # 3) posting 을 memmap 출력에 청크 순서대로 흩어 쓰기 (token 내 문서 순서 = 오름차순)
+        indices = open_memmap(bm25_dir / "indices.npy", mode="w+", dtype=np.int32, shape=(nnz,))
+        tfs = open_memmap(bm25_dir / "tfs.npy", mode="w+", dtype=np.float32, shape=(nnz,))
+        cursor = indptr[:-1].copy()
+        doc_base = 0
+        for i in range(n_chunks):
+            c = self._load_chunk(i)
+            rows = np.searchsorted(vocab, c["vocab"])[c["tok"]]
+            order = np.argsort(rows, kind="stable")
+            rs = rows[order]
+            uniq, starts, counts = np.unique(rs, return_index=True, return_counts=True)
+            within = np.arange(len(rs)) - np.repeat(starts, counts)
+            pos = cursor[rs] + within
+            indices[pos] = c["doc"][order] + doc_base
+            tfs[pos] = c["tf"][order]
+            cursor[uniq] += counts
+            doc_base += len(c["doc_len"])
+        indices.flush()
+        tfs.flush()
+        del indices, tfs
+
+        corpus_size = int(doc_len.shape[0])
+        avgdl = float(doc_len.mean()) if corpus_size else 0.0
+        np.save(bm25_dir / "vocab.npy", vocab, allow_pickle=False)
+        np.save(bm25_dir / "indptr.npy", indptr, allow_pickle=False)
+        np.save(bm25_dir / "doc_len.npy", doc_len, allow_pickle=False)
+        np.save(bm25_dir / "idf.npy", calc_idf(df, corpus_size, epsilon), allow_pickle=False)
+        write_meta(bm25_dir, corpus_size, avgdl, k1, b, epsilon)
+
+        # 4) 문서 저장소: spill jsonl 을 그대로 이어 붙임
+        with DocStoreWriter(tmp / "docs") as w:
+            for i in range(n_chunks):
+                with open(self._chunk_path(i).with_suffix(".docs.jsonl"), "rb") as f:
+                    for line in f:
+                        rec = line.rstrip(b"\n")
+                        w.add_raw(rec, json.loads(rec)["id"])
+
+        replace_dir(tmp, out_dir)
+        return {"docs": corpus_size, "vocab": len(vocab), "postings": nnz, "chunks": n_chunks}
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.work_dir, ignore_errors=True)
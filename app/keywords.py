@@ -0,0 +1,129 @@
+# app/keywords.py
+"""
+키워드 매처 (Aho-Corasick)
+- 모든 카테고리(smart/greeting/thanks/help ...) 키워드를 하나의 오토마톤으로 컴파일
+- 쿼리를 한 번 훑어 카테고리별로 매칭된 키워드를 모두 반환
+- 키워드는 JSON 파일({카테고리: [키워드, ...]})에서 읽고, 파일이 바뀌면 재시작 없이 다시 컴파일
+매칭은 대소문자 구분 없이(casefold) 합니다.
+"""
+from __future__ import annotations
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PATH = Path(__file__).parent / "data" / "keywords.json"
+
+
+class AhoCorasick:
+    def __init__(self, keywords: Dict[str, Iterable[str]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[str, str]]] = [[]]  # 상태별 (카테고리, 원래 키워드)
+        for category, words in keywords.items():
+            for word in words:
+                key = str(word).casefold()
+                if key:
+                    self._insert(key, (category, str(word)))
+        self._link()
+
+    def _insert(self, key: str, item: Tuple[str, str]) -> None:
+        state = 0
+        for ch in key:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        if item not in self.out[state]:
+            self.out[state].append(item)
+
+    def _link(self) -> None:
+        q = deque(self.goto[0].values())
+        while q:
+            state = q.popleft()
+            for ch, nxt in self.goto[state].items():
+                q.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                cand = self.goto[f].get(ch, 0)
+                self.fail[nxt] = cand if cand != nxt else 0
+                self.out[nxt] += [o for o in self.out[self.fail[nxt]] if o not in self.out[nxt]]
+
+    def scan(self, text: str) -> Dict[str, List[str]]:
+        """카테고리 → 매칭된 키워드 목록 (첫 등장 순서, 중복 제거)"""
+        hits: Dict[str, List[str]] = {}
+        state = 0
+        goto, fail, out = self.goto, self.fail, self.out
+        for ch in text.casefold():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for category, word in out[state]:
+                words = hits.setdefault(category, [])
+                if word not in words:
+                    words.append(word)
+        return hits
+
+    def __len__(self) -> int:
+        return len(self.goto)
+
+
+class KeywordMatcher:
+    """JSON 키워드 파일 + 오토마톤 (mtime 이 바뀌면 check_interval_s 간격으로 다시 로드)"""
+    def __init__(self, path: Optional[str | Path] = None, check_interval_s: float = 5.0):
+        self.path = Path(path) if path else DEFAULT_PATH
+        self.check_interval_s = check_interval_s
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked = 0.0
+        self.keywords: Dict[str, List[str]] = {}
+        self.automaton = AhoCorasick({})
+        self.reload()
+
+    def reload(self) -> Dict[str, int]:
+        with open(self.path, encoding="utf-8") as f:
+            keywords = {k: list(v) for k, v in json.load(f).items()}
+        automaton = AhoCorasick(keywords)
+        with self._lock:
+            self.keywords, self.automaton = keywords, automaton
+            self._mtime = os.stat(self.path).st_mtime_ns
+            self._checked = time.monotonic()
+        log.info(f"[keywords] 로드: {self.path} ({ {k: len(v) for k, v in keywords.items()} })")
+        return {k: len(v) for k, v in keywords.items()}
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < self.check_interval_s:
+            return
+        self._checked = now
+        try:
+            if os.stat(self.path).st_mtime_ns != self._mtime:
+                self.reload()
+        except Exception as e:
+            # 잘못된 파일이면 기존 오토마톤 유지
+            log.warning(f"[keywords] 다시 로드 실패: {e}")
+            try:
+                self._mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                pass
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        self._maybe_reload()
+        return self.automaton.scan(text)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "path": str(self.path), "states": len(self.automaton),
+            "keywords": {k: len(v) for k, v in self.keywords.items()},
+        }
@@ -1,11 +1,13 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Iterable
+from typing import List, Dict, Any, Iterable, AsyncIterator, Tuple
 import json
 import re
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from .config import settings
 from .prompts import SYSTEM_PROMPT, build_user_prompt
 from .llm_gemini import GeminiLLM
+from .llm_stub import StubLLM
+from .providers import build_router
 
 def _strip_passage_prefix(text: str) -> str:
     if text.startswith("passage: "):
@@ -52,11 +54,17 @@ class LLM:
         self.provider = settings.llm_provider
         if self.provider == "openai":
             self.client = OpenAI(api_key=settings.openai_api_key)
+            self.aclient = AsyncOpenAI(api_key=settings.openai_api_key)
             self.model = settings.openai_chat_model
         elif self.provider == "gemini":
             self.gemini = GeminiLLM()
+        elif self.provider == "stub":
+            # 부하 테스트용 (외부 API 호출 없음)
+            self.stub = StubLLM.from_settings()
         else:
             raise ValueError(f"Unsupported LLM provider: {self.provider}")
+        # chat 경로: 동시성 제한 / hedging / 서킷 브레이커 / failover
+        self.router = build_router(self)
 
     def stream_answer(self, messages: List[Dict[str,str]]) -> Iterable[str]:
         if self.provider == "openai":
@@ -76,3 +84,36 @@ class LLM:
         elif self.provider == "gemini":
             # Gemini 스트리밍
             yield from self.gemini.stream_answer(messages)
+        elif self.provider == "stub":
+            yield from self.stub.stream_answer(messages)
+
+    async def astream_answer(self, messages: List[Dict[str,str]]) -> AsyncIterator[str]:
+        """stream_answer 의 async 버전 (이벤트 루프를 막지 않음)"""
+        if self.provider == "openai":
+            stream = await self.aclient.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.3,
+                top_p=0.9,
+                max_tokens=700,
+                stream=True,
+            )
+            async for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+        elif self.provider == "gemini":
+            async for delta in self.gemini.astream_answer(messages):
+                yield delta
+        elif self.provider == "stub":
+            async for delta in self.stub.astream_answer(messages):
+                yield delta
+
+    def astream_events(self, messages: List[Dict[str,str]]) -> AsyncIterator[Tuple[str, Any]]:
+        """chat 경로용: ("token", 텍스트) / ("tool", 툴 결과) — 모든 provider 실패 시 에러를 호출자에게 전달"""
+        return self.router.astream_events(messages)
+
+    async def warmup(self) -> None:
+        """시작 시 provider 클라이언트 연결을 미리 열어 첫 토큰 지연을 줄임"""
+        await self.router.warmup()
@@ -1,8 +1,10 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Iterable, Optional
+from typing import List, Dict, Any, Iterable, AsyncIterator, Optional, Tuple
 import google.generativeai as genai
 import time
 import random
+import asyncio
+import logging
 from .config import settings
 from .utils.help_links import build_help_search_url
 
@@ -36,37 +38,68 @@ def handle_tool_call(name: str, args: dict) -> Optional[dict]:
         }
     return None
 
+def _function_call(chunk) -> Optional[Any]:
+    """스트림 청크에서 첫 function_call part 를 찾음"""
+    for candidate in getattr(chunk, "candidates", None) or []:
+        content = getattr(candidate, "content", None)
+        for part in getattr(content, "parts", None) or []:
+            function_call = getattr(part, "function_call", None)
+            if function_call and getattr(function_call, "name", ""):
+                return function_call
+    return None
+
+
 class GeminiLLM:
+    """
+    worker 당 1개 — configure / GenerativeModel 생성은 여기서 한 번만
+    (GenerativeModel 은 첫 호출 때 만든 gRPC 채널을 재사용)
+    """
+    MODEL_NAME = "gemini-1.5-flash"
+
     def __init__(self):
         genai.configure(api_key=settings.gemini_api_key)
         self.model = genai.GenerativeModel(
-            'gemini-1.5-flash',
+            self.MODEL_NAME,
             tools=TOOLS,
             tool_config={"function_calling_config": {"mode": "AUTO"}}
         )
         self.max_retries = 3
         self.timeout = 30
         
+    @staticmethod
+    def _to_prompt(messages: List[Dict[str,str]]) -> str:
+        # Gemini는 system message를 지원하지 않으므로 user message에 포함
+        if messages[0]["role"] == "system":
+            system_content = messages[0]["content"]
+            user_content = messages[1]["content"]
+            return f"{system_content}\n\n{user_content}"
+        return messages[0]["content"]
+
+    @staticmethod
+    def _to_contents(messages: List[Dict[str,str]]) -> List[Dict[str,str]]:
+        # system 메시지는 user 턴으로 전달
+        return [
+            {"role": "user" if m["role"] == "system" else m["role"], "parts": m["content"]}
+            for m in messages
+        ]
+
+    @staticmethod
+    def _generation_config():
+        return genai.types.GenerationConfig(
+            temperature=0.3,
+            top_p=0.9,
+            max_output_tokens=700,
+        )
+
     def stream_answer(self, messages: List[Dict[str,str]]) -> Iterable[str]:
         """Gemini API를 사용해서 스트리밍 응답을 생성합니다."""
         for attempt in range(self.max_retries):
             try:
-                # Gemini는 system message를 지원하지 않으므로 user message에 포함
-                if messages[0]["role"] == "system":
-                    system_content = messages[0]["content"]
-                    user_content = messages[1]["content"]
-                    combined_content = f"{system_content}\n\n{user_content}"
-                    messages = [{"role": "user", "content": combined_content}]
-                
                 # Gemini API 호출
                 response = self.model.generate_content(
-                    messages[0]["content"],
+                    self._to_prompt(messages),
                     stream=True,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.3,
-                        top_p=0.9,
-                        max_output_tokens=700,
-                    )
+                    generation_config=self._generation_config(),
                 )
                 
                 # 스트리밍 응답
@@ -84,3 +117,57 @@ class GeminiLLM:
                 # 지수 백오프로 재시도
                 wait_time = (2 ** attempt) + random.uniform(0, 1)
                 time.sleep(wait_time)
+
+    async def astream_answer(self, messages: List[Dict[str,str]]) -> AsyncIterator[str]:
+        """stream_answer 의 async 버전 — 재시도 대기도 asyncio.sleep 으로 처리"""
+        for attempt in range(self.max_retries):
+            try:
+                response = await self.model.generate_content_async(
+                    self._to_prompt(messages),
+                    stream=True,
+                    generation_config=self._generation_config(),
+                )
+                async for chunk in response:
+                    if chunk.text:
+                        yield chunk.text
+                return
+
+            except Exception:
+                if attempt == self.max_retries - 1:
+                    yield "죄송합니다. 일시적인 서비스 오류가 발생했습니다. 잠시 후 다시 시도해주세요."
+                    return
+                await asyncio.sleep((2 ** attempt) + random.uniform(0, 1))
+
+    async def astream_events(self, messages: List[Dict[str,str]]) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        chat 스트리밍 경로: ("tool", 툴 결과 dict) 또는 ("token", 텍스트)
+        - 툴 호출이 처리되면 이후 청크는 버림, 호출 실패는 호출자(fallback)에게 전달
+        """
+        response = await self.model.generate_content_async(self._to_contents(messages), stream=True)
+        tool_called = False
+        async for chunk in response:
+            if tool_called:
+                continue
+            try:
+                function_call = _function_call(chunk)
+                if function_call:
+                    result = handle_tool_call(function_call.name, dict(function_call.args or {}))
+                    if result:
+                        tool_called = True
+                        yield "tool", result
+                        continue
+            except Exception:
+                pass
+            try:
+                text = getattr(chunk, "text", "")
+            except Exception:
+                text = ""  # function_call 만 있는 청크
+            if text:
+                yield "token", text
+
+    async def warmup(self) -> None:
+        """첫 요청 전에 async 클라이언트/채널을 미리 연결 (토큰 생성 없음)"""
+        try:
+            await self.model.count_tokens_async("ping")
+        except Exception as e:
+            logging.warning(f"[gemini] warmup 실패: {e}")
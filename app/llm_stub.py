@@ -0,0 +1,94 @@
+# app/llm_stub.py
+"""
+부하 테스트용 로컬 stub LLM (LLM_PROVIDER=stub) — 외부 API/쿼터를 쓰지 않음
+- 첫 토큰까지 ttft_ms (± jitter), 이후 tokens_per_s 속도로 토큰 방출
+- error_rate 확률로 첫 토큰 전에 예외 → chat 경로의 fallback/브레이커 동작까지 재현
+- 응답은 실제 프롬프트 형식(본문 + <followups> + <citations>)을 따라 후처리 비용도 포함
+"""
+from __future__ import annotations
+from typing import Any, AsyncIterator, Dict, Iterable, List, Tuple
+import asyncio
+import random
+import time
+from .config import settings
+
+_BODY = (
+    "스마트스토어 정책에 따라 안내드려요. 판매자센터에서 해당 메뉴로 이동한 뒤 "
+    "필요한 정보를 입력하고 저장하면 됩니다. 처리 결과는 영업일 기준으로 확인할 수 있어요."
+).split()
+_TAIL = "\n<followups>\n- 관련 수수료도 알려드릴까요?\n- 정산 일정도 확인해 드릴까요?\n</followups>\n<citations>\n</citations>"
+
+
+class StubLLMError(RuntimeError):
+    pass
+
+
+class StubLLM:
+    def __init__(self, ttft_ms: float = 300.0, tokens_per_s: float = 50.0, error_rate: float = 0.0,
+                 tokens: int = 120, jitter: float = 0.2):
+        self.ttft_ms = max(0.0, ttft_ms)
+        self.tokens_per_s = max(0.0, tokens_per_s)
+        self.error_rate = min(1.0, max(0.0, error_rate))
+        self.tokens = max(1, tokens)
+        self.jitter = max(0.0, jitter)
+        self.requests = self.errors = 0
+
+    @classmethod
+    def from_settings(cls) -> "StubLLM":
+        return cls(
+            ttft_ms=settings.llm_stub_ttft_ms,
+            tokens_per_s=settings.llm_stub_tokens_per_s,
+            error_rate=settings.llm_stub_error_rate,
+            tokens=settings.llm_stub_tokens,
+            jitter=settings.llm_stub_jitter,
+        )
+
+    def _pieces(self) -> List[str]:
+        words = [_BODY[i % len(_BODY)] for i in range(self.tokens)]
+        pieces = [w + " " for w in words]
+        pieces.append(_TAIL)
+        return pieces
+
+    def _delays(self) -> Tuple[float, float]:
+        """(첫 토큰 대기 초, 토큰 간 간격 초)"""
+        j = 1.0 + random.uniform(-self.jitter, self.jitter)
+        ttft = self.ttft_ms / 1000.0 * j
+        gap = 1.0 / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
+        return ttft, gap
+
+    def _maybe_fail(self) -> None:
+        self.requests += 1
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            raise StubLLMError("stub LLM 주입 오류")
+
+    def stream_answer(self, messages: List[Dict[str, str]]) -> Iterable[str]:
+        ttft, gap = self._delays()
+        time.sleep(ttft)
+        self._maybe_fail()
+        for i, piece in enumerate(self._pieces()):
+            if i and gap:
+                time.sleep(gap)
+            yield piece
+
+    async def astream_answer(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        async for _, piece in self.astream_events(messages):
+            yield piece
+
+    async def astream_events(self, messages: List[Dict[str, str]]) -> AsyncIterator[Tuple[str, Any]]:
+        ttft, gap = self._delays()
+        await asyncio.sleep(ttft)
+        self._maybe_fail()
+        for i, piece in enumerate(self._pieces()):
+            if i and gap:
+                await asyncio.sleep(gap)
+            yield "token", piece
+
+    async def warmup(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ttft_ms": self.ttft_ms, "tokens_per_s": self.tokens_per_s, "error_rate": self.error_rate,
+            "tokens": self.tokens, "requests": self.requests, "errors": self.errors,
+        }
@@ -1,19 +1,31 @@
 from __future__ import annotations
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse, FileResponse, HTMLResponse
+from fastapi.responses import StreamingResponse, FileResponse, HTMLResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Dict, Any
 import json, uuid, os
+import hashlib
+import asyncio
+import logging
+from itertools import islice
 import re
 import pandas as pd
 from urllib.parse import quote_plus
-from .schemas import ChatRequest, ChatChunk, ChatResponse, IndexRequest, ConversationHistory, Message
+from .schemas import ChatRequest, ChatChunk, ChatResponse, IndexRequest, IndexDeleteRequest, ConversationHistory, Message
 from .retriever import Retriever
-from .memory import ConversationMemory
+from .memory import make_memory, AsyncConversationMemory
 from .llm import LLM, build_prompt
 from .config import settings
-from .guard import is_on_topic, detect_intent
+from .guard import is_on_topic, detect_intent, match_keywords, get_matcher, route_without_retrieval, RouteStats
 from .prompts import build_fallback_response
+from .concurrency import run_blocking, executor_stats, loop_lag
+from .cache import SemanticAnswerCache
+from .retention import RetentionEngine
+from .postprocess import AnswerFilter
+from . import metrics
+from .metrics import STAGE_SECONDS, CHAT_TTFT_SECONDS, CHAT_STREAM_SECONDS, INTENTS, RETRIEVAL_SKIPPED, FALLBACKS, timer
+import threading
+import time
 
 # 배포 환경에서 데이터 다운로드
 def ensure_data_exists():
@@ -53,17 +65,107 @@ class _Lazy:
     def __init__(self, factory):
         self._factory = factory
         self._obj = None
+        self._lock = threading.Lock()
     def __getattr__(self, name):
         if self._obj is None:
-            self._obj = self._factory()
+            # executor 스레드에서 동시에 첫 접근해도 한 번만 생성
+            with self._lock:
+                if self._obj is None:
+                    self._obj = self._factory()
         return getattr(self._obj, name)
 
-retriever = _Lazy(Retriever)
-memory    = _Lazy(ConversationMemory)
+def _make_retriever() -> Retriever:
+    r = Retriever()
+    r.on_generation_change(answer_cache.clear)  # FAQ 가 바뀌면 이전 답변을 재생하지 않음
+    return r
+
+retriever = _Lazy(_make_retriever)
+memory    = _Lazy(make_memory)
+amemory   = _Lazy(lambda: AsyncConversationMemory(memory))
 llm       = _Lazy(LLM)
+
+answer_cache = SemanticAnswerCache(
+    threshold=settings.answer_cache_threshold,
+    maxsize=settings.answer_cache_size if settings.answer_cache_enabled else 0,
+    ttl_s=settings.answer_cache_ttl_s,
+)
+retention = RetentionEngine(
+    memory=memory,
+    ttl_days=settings.retention_ttl_days,
+    max_turns=settings.retention_max_turns,
+    chunk_size=settings.retention_chunk_size,
+    archive_dir=settings.retention_archive_dir,
+    vacuum_pages=settings.retention_vacuum_pages,
+    convert_vacuum=settings.retention_convert_vacuum,
+)
+route_stats = RouteStats()
+
+
+class _ChatLoad:
+    """진행 중인 /chat/stream 수 (응답 스트림이 끝날 때까지)"""
+    def __init__(self):
+        self.inflight = self.peak = self.total = 0
+
+    def enter(self):
+        self.inflight += 1
+        self.total += 1
+        self.peak = max(self.peak, self.inflight)
+
+    def exit(self):
+        self.inflight -= 1
+
+    async def track(self, body, t0: float, intent: str):
+        # 요청 시작 → 첫 토큰 / 스트림 종료 시간 (의도별)
+        first = True
+        try:
+            async for chunk in body:
+                if first and chunk.startswith('data: {"type": "token"'):
+                    first = False
+                    CHAT_TTFT_SECONDS.observe(time.perf_counter() - t0, intent=intent)
+                yield chunk
+        finally:
+            CHAT_STREAM_SECONDS.observe(time.perf_counter() - t0, intent=intent)
+            self.exit()
+
+    def stats(self, reset_peak: bool = False):
+        out = {"inflight": self.inflight, "peak": self.peak, "total": self.total}
+        if reset_peak:
+            self.peak = self.inflight
+        return out
+
+
+chat_load = _ChatLoad()
 # --------------------------------------------
 
 
+@app.on_event("startup")
+async def warmup_llm():
+    # LLM 클라이언트 생성 + 연결을 백그라운드에서 미리 (첫 SMART 응답의 TTFT 단축)
+    if not settings.llm_warmup:
+        return
+
+    async def _warm():
+        try:
+            await run_blocking(lambda: llm.provider)  # lazy 생성은 executor 에서
+            await llm.warmup()
+        except Exception as e:
+            logging.warning(f"[startup] LLM warmup 실패: {e}")
+
+    asyncio.ensure_future(_warm())
+
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    # 이벤트 루프 지연 측정 (/debug/runtime)
+    loop_lag.start()
+
+
+@app.on_event("startup")
+def start_retention():
+    # TTL/최대 턴 중 하나라도 설정된 경우에만 주기 실행
+    retention.start(settings.retention_interval_s)
+
+
 def make_help_links(q: str):
     base = "https://help.sell.smartstore.naver.com/index.help"
     search = f"https://help.sell.smartstore.naver.com/faq/search.help?categoryNo=0&searchKeyword={quote_plus(q)}"
@@ -179,7 +281,7 @@ def index(req: IndexRequest):
     samples = []
     try:
         # 제목 샘플 최대 5개
-        for i, d in enumerate(list((getattr(retriever, "_doc_map", {}) or {}).values())[:5]):
+        for d in islice((getattr(retriever, "_doc_map", {}) or {}).values(), 5):
             samples.append(d.get("title", ""))
     except Exception:
         samples = []
@@ -193,8 +295,25 @@ def index(req: IndexRequest):
     }
     return out
 
+@app.post("/index/delete")
+def index_delete(req: IndexDeleteRequest):
+    result = retriever.delete(req.ids)
+    return {**result, "doc_map_size": len(getattr(retriever, "_doc_map", {}) or {})}
+
 @app.post("/chat/stream")
-def chat_stream(req: ChatRequest):
+async def chat_stream(req: ChatRequest):
+    t0 = time.perf_counter()
+    chat_load.enter()
+    try:
+        intent, resp = await _chat_stream(req)
+    except BaseException:
+        chat_load.exit()
+        raise
+    resp.body_iterator = chat_load.track(resp.body_iterator, t0, intent)
+    return resp
+
+async def _chat_stream(req: ChatRequest):
+    """(의도, 응답 스트림)"""
     conv_id = req.conversation_id or str(uuid.uuid4())
     user_msg = req.message.strip()
     top_k = req.top_k or settings.top_k
@@ -202,15 +321,49 @@ def chat_stream(req: ChatRequest):
     if not user_msg:
         raise HTTPException(status_code=400, detail="Empty message.")
 
-    memory.add(conv_id, "user", user_msg)
-    history_text = memory.format_as_chat(conv_id, limit=12)
-    ctx = retriever.retrieve(user_msg, k=top_k)
-
-    # -------- Intent routing --------
-    intent = detect_intent(user_msg, ctx, settings.score_threshold)
+    async def _history():
+        with timer(STAGE_SECONDS, stage="history"):
+            await amemory.add(conv_id, "user", user_msg)
+            return await amemory.format_as_chat(conv_id, limit=12)
+
+    async def _retrieve_with_history():
+        # 임베딩/Chroma/BM25/리랭커는 retrieval 전용 executor 에서 실행 (lazy 로딩 포함)
+        t0 = time.perf_counter()
+        retrieval = run_blocking(lambda: retriever.retrieve(user_msg, k=top_k))
+        if settings.parallel_retrieval:
+            # 히스토리(SQLite) 조회와 retrieval 은 서로 독립 → 동시에 실행
+            history_task = asyncio.ensure_future(_history())
+            ctx = await retrieval
+            retrieval_ms = (time.perf_counter() - t0) * 1000.0
+            try:
+                history_text = await asyncio.wait_for(asyncio.shield(history_task), timeout=settings.history_timeout_ms / 1000.0)
+            except asyncio.TimeoutError:
+                logging.warning("[chat] history fetch timeout (%sms) — 히스토리 없이 진행", settings.history_timeout_ms)
+                history_text = ""
+        else:
+            history_text = await _history()
+            ctx = await retrieval
+            retrieval_ms = (time.perf_counter() - t0) * 1000.0
+        return ctx, history_text, retrieval_ms
+
+    # -------- 1단계: 키워드만으로 확정되는 의도는 retrieval 없이 응답 --------
+    hits = match_keywords(user_msg)  # 한 번 스캔한 키워드 매칭을 재사용
+    intent = route_without_retrieval(user_msg, hits) if settings.intent_preroute else None
+
+    if intent is not None:
+        await amemory.add(conv_id, "user", user_msg)
+        route_stats.record(intent)
+        RETRIEVAL_SKIPPED.inc()
+        ctx, history_text = [], ""
+    else:
+        # -------- 2단계: 검색 점수까지 보고 의도 결정 (smart/help/offtopic) --------
+        ctx, history_text, retrieval_ms = await _retrieve_with_history()
+        intent = detect_intent(user_msg, ctx, settings.score_threshold, hits)
+        route_stats.record(intent, retrieval_ms)
+    INTENTS.inc(intent=intent)
 
     def simple_stream(text: str):
-        def gen():
+        async def gen():
             chunk_size = 90
             for i in range(0, len(text), chunk_size):
                 yield f"data: {json.dumps({'type':'token','content': text[i:i+chunk_size]})}\n\n"
@@ -226,11 +379,11 @@ def chat_stream(req: ChatRequest):
             "- 상품 등록은 어떤 순서로 하나요?\n"
             "- 정산 주기/수수료는 어떻게 되나요?\n"
         )
-        return simple_stream(msg)
+        return intent, simple_stream(msg)
 
     if intent == "thanks":
         msg = "도움이 되었다니 다행이에요! 스마트스토어에 대해 더 궁금한 점이 있으면 편하게 물어보세요."
-        return simple_stream(msg)
+        return intent, simple_stream(msg)
 
     if intent == "help":
         msg = (
@@ -241,110 +394,67 @@ def chat_stream(req: ChatRequest):
             "- \"상품 일괄등록 방법 알려줘\"\n"
             "구체적으로 물어볼수록 더 정확히 안내드려요."
         )
-        return simple_stream(msg)
+        return intent, simple_stream(msg)
 
     if intent == "offtopic":
         msg = (
             "저는 스마트스토어 FAQ를 위한 챗봇입니다. 스마트스토어 관련 질문을 부탁드려요.\n\n"
             "예시: 상품 등록 절차, 수수료/정산, 정책/인증, 배송/교환/환불 등"
         )
-        return simple_stream(msg)
+        return intent, simple_stream(msg)
 
     # -------- SMART intent: go through LLM (with fallback) --------
+    # 시맨틱 답변 캐시: 유사 질문 + 같은 상위 컨텍스트 + 같은 인덱스 generation·대화 히스토리면 LLM 호출 없이 재생
+    # (답변은 히스토리에 의존 → 다른 대화의 답변을 재생하지 않도록 히스토리 해시를 scope 에 포함)
+    qvec = None
+    ctx_ids = [d["id"] for d in ctx[:settings.answer_cache_ctx_k]]
+    cache_scope = (retriever.generation, hashlib.sha1(history_text.encode("utf-8")).hexdigest())
+    if settings.answer_cache_enabled and ctx_ids:
+        try:
+            qvec = await run_blocking(lambda: retriever.embed_query(user_msg))  # 임베딩 캐시 hit
+        except Exception as e:
+            logging.warning(f"[answer-cache] 쿼리 임베딩 실패: {e}")
+        if qvec is not None:
+            cached = answer_cache.get(qvec, ctx_ids, cache_scope)
+            if cached:
+                await amemory.add(conv_id, "assistant", cached[:1500])
+                return intent, simple_stream(cached)
+
     messages = build_prompt(ctx, history_text, user_msg)
 
-    def sse_gen():
-        buffer = []
-        tool_called = False
+    async def _finalize(final):
+        # 클라이언트로 스트리밍한 텍스트(후처리 완료)를 그대로 저장
+        if final.strip():
+            await amemory.add(conv_id, "assistant", final[:1500])
+            if qvec is not None:
+                answer_cache.put(qvec, ctx_ids, final, cache_scope)
+        yield "event: done\n"
+        yield "data: {}\n\n"
+
+    async def sse_gen():
+        # 페르소나 제거 / followups 중복 제거 / citations 주입을 토큰 스트림에서 바로 처리
+        filt = AnswerFilter(_build_citations(ctx))
         try:
-            # Gemini 모델에서 직접 스트리밍 처리
-            from .llm_gemini import handle_tool_call
-            
-            # Gemini API 직접 호출
-            import google.generativeai as genai
-            from .config import settings
-            
-            genai.configure(api_key=settings.gemini_api_key)
-            model = genai.GenerativeModel(
-                'gemini-1.5-flash',
-                tools=[{
-                    "function_declarations": [{
-                        "name": "open_help_search",
-                        "description": "스마트스토어 도움말(FAQ)에서 keyword로 검색하는 링크를 생성합니다.",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "keyword": {"type": "string", "description": "검색 키워드 (예: '상품등록')"},
-                                "categoryNo": {"type": "integer", "description": "도움말 카테고리 번호 (모르면 0)"},
-                            },
-                            "required": ["keyword"],
-                        },
-                    }]
-                }],
-                tool_config={"function_calling_config": {"mode": "AUTO"}}
-            )
-            
-            # 메시지 변환
-            gemini_messages = []
-            for msg in messages:
-                if msg["role"] == "system":
-                    gemini_messages.append({"role": "user", "parts": msg["content"]})
-                else:
-                    gemini_messages.append({"role": msg["role"], "parts": msg["content"]})
-            
-            response = model.generate_content(gemini_messages, stream=True)
-            
-            for chunk in response:
-                # 툴콜 감지
-                try:
-                    candidates = getattr(chunk, "candidates", [])
-                    for candidate in candidates:
-                        content = getattr(candidate, "content", None)
-                        if content:
-                            parts = getattr(content, "parts", [])
-                            for part in parts:
-                                function_call = getattr(part, "function_call", None)
-                                if function_call and not tool_called:
-                                    tool_name = function_call.name
-                                    tool_args = dict(function_call.args or {})
-                                    result = handle_tool_call(tool_name, tool_args)
-                                    if result:
-                                        tool_called = True
-                                        yield f"event: tool\n"
-                                        yield f"data: {json.dumps(result, ensure_ascii=False)}\n\n"
-                                        break
-                            if tool_called:
-                                break
-                        if tool_called:
-                            break
-                    if tool_called:
-                        continue
-                except Exception:
-                    pass
-                
-                # 일반 텍스트 청크
-                text = getattr(chunk, "text", "")
+            # worker 당 1개의 provider 클라이언트 재사용 (Gemini 툴 호출은 ("tool", 결과) 이벤트)
+            async for kind, payload in llm.astream_events(messages):
+                if kind == "tool":
+                    yield "event: tool\n"
+                    yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                    continue
+                text = filt.feed(payload)
                 if text:
-                    buffer.append(text)
                     yield f"data: {json.dumps({'type':'token','content': text})}\n\n"
-            
-            final = "".join(buffer)
-            
-            # 후처리 훅 적용
-            final = _strip_persona(final)
-            final = _dedup_followups(final)
-            # citations 주입/치환
-            cits = _build_citations(ctx)
-            final = re.sub(r"<citations>.*?</citations>", cits, final, flags=re.S) if "<citations>" in final else (final + "\n\n" + cits)
-            
-            if final.strip():
-                memory.add(conv_id, "assistant", final[:1500])
-            yield "event: done\n"
-            yield "data: {}\n\n"
+            text = filt.finish()
+            if text:
+                yield f"data: {json.dumps({'type':'token','content': text})}\n\n"
+
+            async for event in _finalize(filt.text):
+                yield event
         except Exception as e:
             # LLM 에러 로깅 추가
             import logging
             logging.exception("LLM error", exc_info=True)
+            FALLBACKS.inc(kind="llm")
             # Fallback: 컨텍스트 기반 간단 답변 (SMART 의도에서만 사용)
             try:
                 parts = []
@@ -371,7 +481,7 @@ def chat_stream(req: ChatRequest):
                 chunk_size = 90
                 for i in range(0, len(text), chunk_size):
                     yield f"data: {json.dumps({'type':'token','content': text[i:i+chunk_size]})}\n\n"
-                memory.add(conv_id, "assistant", text[:1500])
+                await amemory.add(conv_id, "assistant", text[:1500])
             except Exception as _:
                 err = f"[server error] {e}"
                 yield f"data: {json.dumps({'type':'token','content': err})}\n\n"
@@ -379,21 +489,9 @@ def chat_stream(req: ChatRequest):
                 yield "event: done\n"
                 yield "data: {}\n\n"
 
-    return StreamingResponse(sse_gen(), media_type="text/event-stream")
+    return intent, StreamingResponse(sse_gen(), media_type="text/event-stream")
 
 # 후처리 함수들
-def _strip_persona(text: str) -> str:
-    """페르소나 제거 (상담사입니다... 안녕하세요... 도입부 컷)"""
-    lines = text.splitlines()
-    out, started = [], False
-    persona = re.compile(r"(상담사입니다|전문가입니다|도와드리겠습니다)", re.I)
-    for ln in lines:
-        if not started and (ln.strip().startswith("안녕하세요") or persona.search(ln)):
-            continue
-        started = True
-        out.append(ln)
-    return "\n".join(out).strip()
-
 def _build_citations(ctx):
     """실제 인용 강제: 리트리버 상위 문서의 (title, url)로 citations 채움"""
     items, seen = [], set()
@@ -431,24 +529,6 @@ def parse_answer_v3(text: str):
         "followups": fups,
     }
 
-def _dedup_followups(text: str) -> str:
-    """followups 2개로 정리·중복 제거"""
-    m = re.search(r"<followups>(.*?)</followups>", text, flags=re.S)
-    if not m:
-        return text
-    uniq, out = set(), []
-    for ln in m.group(1).splitlines():
-        ln = ln.strip()
-        if ln.startswith("-"):
-            key = ln[1:].strip().lower()
-            if key and key not in uniq:
-                uniq.add(key)
-                out.append(ln)
-        if len(out) >= 2:
-            break
-    newblk = "<followups>\n" + ("\n".join(out) if out else "- 다른 점도 도와드릴까요?") + "\n</followups>"
-    return text[:m.start()] + newblk + text[m.end():]
-
 @app.get("/debug/llm_status")
 def debug_llm_status():
     """LLM 설정과 간단한 테스트를 수행합니다."""
@@ -597,6 +677,108 @@ def debug_model_info():
             "model_loaded_successfully": False
         }
 
+@app.get("/debug/cache_stats")
+def debug_cache_stats():
+    """캐시 hit/miss/eviction 통계"""
+    return {
+        "embedding": retriever.embed_cache.stats(),
+        "retrieval": {**retriever.result_cache.stats(), "generation": retriever.generation},
+        "answer": answer_cache.stats(),
+        "rerank": retriever.reranker.cache.stats() if retriever.reranker is not None else {},
+        "history": memory.stats() if hasattr(memory, "stats") else {},
+    }
+
+@app.get("/debug/intent_stats")
+def debug_intent_stats():
+    """의도별 건수, retrieval 생략 횟수와 추정 절감 시간"""
+    return route_stats.stats()
+
+@app.get("/debug/keywords")
+def debug_keywords(q: str = ""):
+    """guard 키워드 파일/오토마톤 상태, q 를 주면 매칭 결과"""
+    out = get_matcher().stats()
+    if q:
+        out["hits"] = match_keywords(q)
+    return out
+
+@app.post("/debug/keywords/reload")
+def debug_keywords_reload():
+    """키워드 파일을 즉시 다시 로드 (평소에는 mtime 변경을 자동 감지)"""
+    try:
+        return {"ok": True, "keywords": get_matcher().reload()}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"keywords reload failed: {e}")
+
+@app.get("/debug/runtime")
+async def debug_runtime(reset: bool = False):
+    """서버 포화도: 진행 중인 chat 수, retrieval executor / anyio threadpool 사용량, 이벤트 루프 지연, LLM 동시 요청"""
+    import anyio
+    import resource
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    llm_obj = llm._obj  # 아직 생성 전이면 만들지 않음
+    return {
+        "provider": settings.llm_provider,
+        "chat": chat_load.stats(reset_peak=reset),
+        "retrieval_executor": executor_stats(reset_max=reset),
+        "anyio_threadpool": {"borrowed": limiter.borrowed_tokens, "total": limiter.total_tokens},
+        "event_loop_lag": loop_lag.stats(reset_max=reset),
+        "llm": {n: {"inflight": p["inflight"], "max_concurrency": p["max_concurrency"]}
+                for n, p in llm_obj.router.stats()["providers"].items()} if llm_obj is not None else None,
+        "threads": threading.active_count(),
+        "maxrss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text format — 단계별 지연 히스토그램, 의도/fallback 카운터, 캐시 hit/miss, 포화도 gauge"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def _collect_runtime():
+    """스크레이프 시점에 기존 stats() 를 읽어 내보냄 (요청 경로에는 기록 비용 없음)"""
+    caches = {"answer": answer_cache.stats()}
+    ret = retriever._obj  # 아직 로드 전이면 만들지 않음
+    if ret is not None:
+        caches["embedding"] = ret.embed_cache.stats()
+        caches["retrieval"] = ret.result_cache.stats()
+        if ret.reranker is not None:
+            caches["rerank"] = ret.reranker.cache.stats()
+    for name, st in caches.items():
+        yield "rag_cache_hits_total", "counter", {"cache": name}, st["hits"]
+        yield "rag_cache_misses_total", "counter", {"cache": name}, st["misses"]
+    yield "rag_chat_inflight", "gauge", {}, chat_load.inflight
+    ex = executor_stats()
+    yield "rag_retrieval_executor_queued", "gauge", {}, ex["queued"]
+    yield "rag_retrieval_executor_active", "gauge", {}, ex["active"]
+    yield "rag_event_loop_lag_ms", "gauge", {}, loop_lag.ewma_ms
+    llm_obj = llm._obj
+    router = getattr(llm_obj, "router", None) if llm_obj is not None else None
+    if router is not None:
+        yield "rag_llm_hedges_total", "counter", {}, router.hedges
+        yield "rag_llm_failovers_total", "counter", {}, router.failovers
+
+metrics.register_collector(_collect_runtime)
+
+@app.get("/debug/llm_providers")
+def debug_llm_providers():
+    """provider 별 TTFT / 서킷 상태 / 동시 요청 수, hedge·failover 횟수"""
+    return llm.router.stats()
+
+@app.get("/debug/embed_batcher")
+def debug_embed_batcher():
+    """쿼리 임베딩 배처 상태 (큐 깊이, 배치 크기 분포)"""
+    qe = retriever.query_embedder
+    if not hasattr(qe, "stats"):
+        return {"enabled": False}
+    return {"enabled": True, **qe.stats()}
+
+@app.get("/debug/reranker")
+def debug_reranker():
+    """리랭커 backend / cascade 생략 비율 / 배치 크기 분포"""
+    rr = retriever.reranker
+    if rr is None:
+        return {"enabled": False}
+    return {"enabled": True, **rr.stats()}
+
 @app.post("/debug/rebuild_dense")
 def debug_rebuild_dense(batch_size: int = 256):
     try:
@@ -605,6 +787,14 @@ def debug_rebuild_dense(batch_size: int = 256):
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
+@app.post("/debug/compact_index")
+def debug_compact_index():
+    """증분 delta/tombstone 을 base 인덱스로 합침"""
+    try:
+        return {"status": "ok", **retriever.compact_index()}
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
 @app.get("/debug/index_status")
 def debug_index_status(q: str = "상품 등록 절차", k: int = 3):
     try:
@@ -634,11 +824,27 @@ def debug_index_status(q: str = "상품 등록 절차", k: int = 3):
         "chroma_count": chroma_count,
         "bm25_loaded": bm25_loaded,
         "doc_map_size": doc_map_size,
+        "sparse": retriever._bm25.stats() if retriever._bm25 is not None else None,
+        "fusion": retriever.fusion.describe(),
         "dense_ok": dense_ok,
         "sample_query": q,
         "preview": preview,
     }
 
+@app.get("/debug/retention")
+def debug_retention():
+    """messages 테이블 크기 / 보존 정책 실행 결과"""
+    try:
+        return retention.metrics()
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+@app.post("/debug/retention/run")
+def debug_retention_run():
+    if not retention.enabled:
+        return {"status": "disabled"}
+    return {"status": "ok", **retention.run_once()}
+
 @app.get("/conversations/{conversation_id}")
 def get_history(conversation_id: str):
     rows = memory.fetch(conversation_id, limit=50)
@@ -1,8 +1,19 @@
 import sqlite3
+import asyncio
+import atexit
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from functools import partial
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 from datetime import datetime
 from .config import settings
+from .batching import MicroBatcher
+from .cache import LRUCache
+
+log = logging.getLogger(__name__)
 
 DDL = """
 CREATE TABLE IF NOT EXISTS messages (
@@ -15,6 +26,16 @@ CREATE TABLE IF NOT EXISTS messages (
 CREATE INDEX IF NOT EXISTS idx_messages_conv ON messages(conversation_id, ts);
 """
 
+def format_turns(msgs) -> str:
+    parts = []
+    for role, content in msgs:
+        if role == "user":
+            parts.append(f"사용자: {content}")
+        elif role == "assistant":
+            parts.append(f"도우미: {content}")
+    return "\n".join(parts)
+
+
 class ConversationMemory:
     def __init__(self, db_path: Optional[str] = None):
         self.db_path = db_path or settings.sqlite_path
@@ -48,7 +69,7 @@ class ConversationMemory:
         try:
             cur = con.cursor()
             cur.execute(
-                "SELECT role, content FROM messages WHERE conversation_id=? ORDER BY ts DESC LIMIT ?",
+                "SELECT role, content FROM messages WHERE conversation_id=? ORDER BY ts DESC, id DESC LIMIT ?",
                 (conversation_id, limit),
             )
             rows = cur.fetchall()
@@ -58,11 +79,219 @@ class ConversationMemory:
             con.close()
 
     def format_as_chat(self, conversation_id: str, limit: int = 12) -> str:
-        msgs = self.fetch(conversation_id, limit)
-        parts = []
-        for role, content in msgs:
-            if role == "user":
-                parts.append(f"사용자: {content}")
-            elif role == "assistant":
-                parts.append(f"도우미: {content}")
-        return "\n".join(parts)
+        return format_turns(self.fetch(conversation_id, limit))
+
+
+class PooledConversationMemory(ConversationMemory):
+    """
+    SQLite 메모리 (WAL + 스레드별 영속 연결 + write-behind 배치 쓰기)
+    - add 는 큐에 넣고 바로 반환 → 배처 스레드가 모아서 한 트랜잭션으로 INSERT
+    - 아직 커밋되지 않은 메시지는 pending 에 보관 → fetch 가 자기 쓰기를 항상 읽음
+    - 같은 초(ts)에 쌓인 메시지는 id 로 순서 보장
+    """
+    def __init__(self, db_path: Optional[str] = None):
+        self._local = threading.local()
+        self._lock = threading.Lock()  # pending 조회 ↔ 커밋 후 pending 제거를 원자적으로
+        self._pending: Dict[str, List[Tuple[int, str, str, str]]] = {}
+        self._seq = 0
+        self._last: Optional[Future] = None
+        super().__init__(db_path)
+        self._batcher = MicroBatcher(
+            self._write_batch,
+            max_batch=settings.memory_write_batch,
+            max_wait_ms=settings.memory_write_wait_ms,
+            name="memory-writer",
+        )
+        atexit.register(self.flush)
+
+    def _con(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.db_path, timeout=settings.sqlite_busy_timeout_ms / 1000.0)
+            con.execute("PRAGMA journal_mode=WAL")
+            sync = settings.sqlite_synchronous.upper()
+            con.execute(f"PRAGMA synchronous={sync if sync in ('OFF', 'NORMAL', 'FULL', 'EXTRA') else 'NORMAL'}")
+            con.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+            self._local.con = con
+        return con
+
+    def _init(self):
+        con = self._con()
+        for stmt in DDL.strip().split(";"):
+            if stmt.strip():
+                con.execute(stmt)
+        con.commit()
+
+    def add(self, conversation_id: str, role: str, content: str) -> Future:
+        ts = datetime.utcnow().isoformat(timespec="seconds")
+        with self._lock:
+            self._seq += 1
+            row = (self._seq, role, content, ts)
+            self._pending.setdefault(conversation_id, []).append(row)
+            self._last = self._batcher.submit((conversation_id, row))
+            return self._last
+
+    def _write_batch(self, items: List[Tuple[str, Tuple[int, str, str, str]]]) -> List[None]:
+        con = self._con()
+        params = [(conv_id, role, content, ts) for conv_id, (_, role, content, ts) in items]
+        # 커밋과 pending 제거를 같은 락 안에서 → fetch 가 중복/누락 없이 읽음
+        with self._lock:
+            try:
+                with con:  # 한 트랜잭션
+                    con.executemany(
+                        "INSERT INTO messages (conversation_id, role, content, ts) VALUES (?,?,?,?)", params
+                    )
+            finally:
+                # 실패 시에도 pending 에서 제거 (배처가 로그를 남기고 Future 에 예외 전달)
+                for conv_id, row in items:
+                    rows = self._pending.get(conv_id)
+                    if rows is None:
+                        continue
+                    try:
+                        rows.remove(row)
+                    except ValueError:
+                        pass
+                    if not rows:
+                        del self._pending[conv_id]
+        return [None] * len(items)
+
+    def fetch(self, conversation_id: str, limit: int = 12) -> List[Tuple[str, str]]:
+        with self._lock:
+            pending = [(role, content) for _, role, content, _ in self._pending.get(conversation_id, ())]
+            if len(pending) >= limit:
+                return pending[-limit:]
+            cur = self._con().execute(
+                "SELECT role, content FROM messages WHERE conversation_id=? ORDER BY ts DESC, id DESC LIMIT ?",
+                (conversation_id, limit - len(pending)),
+            )
+            rows = cur.fetchall()
+        rows.reverse()
+        return rows + pending
+
+    def flush(self, timeout: Optional[float] = 10.0) -> None:
+        """큐에 남은 쓰기가 커밋될 때까지 대기 (배처는 FIFO → 마지막 Future 만 확인)"""
+        last = self._last
+        if last is None:
+            return
+        try:
+            last.result(timeout=timeout)
+        except Exception as e:
+            log.warning(f"[memory] flush 실패: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            pending = sum(len(v) for v in self._pending.values())
+        return {"backend": "pooled", "pending": pending, "writer": self._batcher.stats()}
+
+
+class _Window:
+    __slots__ = ("turns", "texts")
+
+    def __init__(self, rows, size: int):
+        self.turns = deque(rows, maxlen=size)
+        self.texts: Dict[int, str] = {}  # limit -> format_as_chat 결과
+
+
+class CachedConversationMemory:
+    """
+    최근 대화 창(hot window) 캐시 — SQLite 는 그대로 영속 저장소
+    - 대화별 최근 window 턴 + 포맷된 히스토리 문자열을 메모리에 보관 (대화 단위 LRU + idle TTL)
+    - add 는 저장소에 쓰고 캐시된 창에 이어 붙임, fetch/format_as_chat 은 디스크를 읽지 않음
+    - 캐시에 없는(cold) 대화나 window 보다 긴 조회는 저장소에서 읽음
+    같은 대화는 한 worker 가 처리한다고 가정합니다(다른 worker 의 쓰기는 idle TTL 후 반영).
+    """
+    _STRIPES = 64
+
+    def __init__(self, memory: ConversationMemory, window: int = 12, maxsize: int = 4096, idle_ttl_s: float = 1800.0):
+        self.memory = memory
+        self.window = max(1, window)
+        self.cache = LRUCache(maxsize=maxsize, ttl_s=idle_ttl_s)
+        # 대화별 add ↔ cold 로드 직렬화 (스트라이프 락)
+        self._locks = [threading.Lock() for _ in range(self._STRIPES)]
+
+    def __getattr__(self, name):
+        return getattr(self.memory, name)
+
+    def _lock_for(self, conversation_id: str) -> threading.Lock:
+        return self._locks[hash(conversation_id) % self._STRIPES]
+
+    def _window(self, conversation_id: str) -> _Window:
+        # 호출자가 대화 락을 잡은 상태
+        w = self.cache.get(conversation_id)
+        if w is None:
+            w = _Window(self.memory.fetch(conversation_id, self.window), self.window)
+        self.cache.put(conversation_id, w)  # idle TTL 갱신
+        return w
+
+    def add(self, conversation_id: str, role: str, content: str):
+        with self._lock_for(conversation_id):
+            res = self.memory.add(conversation_id, role, content)
+            w = self.cache.get(conversation_id)
+            if w is not None:
+                w.turns.append((role, content))
+                w.texts.clear()
+                self.cache.put(conversation_id, w)
+        return res
+
+    def fetch(self, conversation_id: str, limit: int = 12) -> List[Tuple[str, str]]:
+        if limit > self.window:
+            return self.memory.fetch(conversation_id, limit)
+        with self._lock_for(conversation_id):
+            turns = list(self._window(conversation_id).turns)
+        return turns[-limit:] if limit > 0 else []
+
+    def format_as_chat(self, conversation_id: str, limit: int = 12) -> str:
+        if limit > self.window:
+            return self.memory.format_as_chat(conversation_id, limit)
+        with self._lock_for(conversation_id):
+            w = self._window(conversation_id)
+            text = w.texts.get(limit)
+            if text is None:
+                turns = list(w.turns)
+                text = w.texts[limit] = format_turns(turns[-limit:] if limit > 0 else [])
+        return text
+
+    def evict(self, conversation_id: str) -> None:
+        self.cache.pop(conversation_id)
+
+    def stats(self) -> Dict[str, object]:
+        inner = self.memory.stats() if hasattr(self.memory, "stats") else {}
+        return {**inner, "hot_window": {**self.cache.stats(), "window": self.window}}
+
+
+def make_memory(db_path: Optional[str] = None):
+    """MEMORY_BACKEND: pooled(기본) | sqlite(호출마다 연결, 즉시 커밋) + 선택적 hot window 캐시"""
+    if settings.memory_backend == "sqlite":
+        memory = ConversationMemory(db_path)
+    else:
+        memory = PooledConversationMemory(db_path)
+    if settings.history_cache_size > 0:
+        memory = CachedConversationMemory(
+            memory, window=settings.history_window,
+            maxsize=settings.history_cache_size, idle_ttl_s=settings.history_cache_ttl_s,
+        )
+    return memory
+
+
+class AsyncConversationMemory:
+    """
+    ConversationMemory 의 async 래퍼
+    - SQLite 호출은 전용 단일 스레드에서 순서대로 실행 (이벤트 루프 비블로킹)
+    - 단일 스레드이므로 add 직후 fetch 가 자기 쓰기를 항상 읽음
+    """
+    def __init__(self, memory: Optional[ConversationMemory] = None):
+        self.memory = memory or make_memory()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory")
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def add(self, conversation_id: str, role: str, content: str):
+        return await self._run(lambda: self.memory.add(conversation_id, role, content))
+
+    async def fetch(self, conversation_id: str, limit: int = 12) -> List[Tuple[str, str]]:
+        return await self._run(lambda: self.memory.fetch(conversation_id, limit))
+
+    async def format_as_chat(self, conversation_id: str, limit: int = 12) -> str:
+        return await self._run(lambda: self.memory.format_as_chat(conversation_id, limit))
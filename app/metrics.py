@@ -0,0 +1,170 @@
+# app/metrics.py
+"""
+경량 계측 (Prometheus text format, 외부 의존성 없음)
+- Counter / Histogram: 라벨 값 조합별 누적, 기록은 lock + bisect 한 번 (수 µs)
+- timer(hist, **labels): with 블록 / 데코레이터 겸용 스테이지 타이머
+- register_collector(fn): 스크레이프 시점에 캐시 통계 등을 읽어 내보냄 (요청 경로 비용 0)
+- render(): /metrics 응답 본문
+METRICS_ENABLED=false 면 기록을 건너뜀
+"""
+from __future__ import annotations
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+import threading
+import time
+from .config import settings
+
+# 초 단위 — 1ms 미만 BM25 부터 수 초 LLM 스트림까지
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["_Metric"] = []
+_collectors: List[Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]] = []
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if not settings.metrics_enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {v:g}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # [버킷별 개수..., +Inf 개수, 합]
+
+    def observe(self, value: float, **labels) -> None:
+        if not settings.metrics_enabled:
+            return
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            s[i] += 1
+            s[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(s)) for k, s in self._series.items()]
+        out = []
+        for key, s in items:
+            cum = 0.0
+            for b, n in zip(self.buckets, s):
+                cum += n
+                le = 'le="%g"' % b
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {cum:g}")
+            cum += s[len(self.buckets)]
+            le = 'le="+Inf"'
+            out.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {cum:g}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {s[-1]:.6f}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {cum:g}")
+        return out
+
+
+class timer:
+    """with timer(STAGE_SECONDS, stage="bm25"): ...  /  @timer(STAGE_SECONDS, stage="bm25")"""
+    __slots__ = ("hist", "labels", "t0")
+
+    def __init__(self, hist: Histogram, **labels):
+        self.hist = hist
+        self.labels = labels
+        self.t0 = 0.0
+
+    def __enter__(self) -> "timer":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.hist.observe(time.perf_counter() - self.t0, **self.labels)
+
+    def __call__(self, fn):
+        hist, labels = self.hist, self.labels
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - t0, **labels)
+        return wrapper
+
+
+def register_collector(fn: Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]) -> None:
+    """fn() → [(이름, 타입(counter/gauge), 라벨 dict, 값)] — 스크레이프 때마다 호출"""
+    _collectors.append(fn)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for m in _registry:
+        lines.append(f"# HELP {m.name} {m.doc}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        lines.extend(m.render())
+    families: Dict[str, Tuple[str, List[str]]] = {}  # 같은 이름의 샘플은 한 블록으로 모음
+    for fn in _collectors:
+        try:
+            samples = list(fn())
+        except Exception:
+            continue
+        for name, kind, labels, value in samples:
+            fam = families.setdefault(name, (kind, []))
+            fam[1].append(f"{name}{_fmt_labels(list(labels), list(labels.values()))} {float(value):g}")
+    for name, (kind, samples) in families.items():
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+# ---------------- 공용 메트릭 ----------------
+STAGE_SECONDS = Histogram("rag_stage_seconds", "retrieve/chat 단계별 소요 시간(초)", ["stage"])
+LLM_TTFT_SECONDS = Histogram("rag_llm_ttft_seconds", "LLM 첫 토큰까지 시간(초, provider 별)", ["provider"])
+CHAT_TTFT_SECONDS = Histogram("rag_chat_ttft_seconds", "/chat/stream 요청 시작부터 첫 토큰 전송까지(초)", ["intent"])
+CHAT_STREAM_SECONDS = Histogram("rag_chat_stream_seconds", "/chat/stream 요청 시작부터 스트림 종료까지(초)", ["intent"])
+INTENTS = Counter("rag_intent_total", "의도별 요청 수", ["intent"])
+RETRIEVAL_SKIPPED = Counter("rag_retrieval_skipped_total", "키워드 라우팅으로 retrieval 을 생략한 요청 수")
+FALLBACKS = Counter("rag_fallback_total", "fallback 발생 수", ["kind"])
@@ -0,0 +1,178 @@
+# app/postprocess.py
+"""
+LLM 출력 스트리밍 후처리 (토큰 스트림을 한 번만 훑는 상태 기계)
+- lead     : 도입부의 페르소나 줄(안녕하세요 / 상담사입니다 ...)을 줄 단위로 버림
+- body     : 그대로 통과 — 태그가 걸칠 수 있는 '<...' 꼬리만 잠시 보류
+- followups: 첫 <followups> 블록의 불릿을 도착하는 대로 중복 제거, 최대 2개
+- citations: <citations> 블록을 리트리버 기반 인용으로 교체 (없으면 마지막에 추가)
+클라이언트로 보낸 텍스트를 이어 붙인 것(text)이 그대로 저장/캐시됩니다.
+"""
+from __future__ import annotations
+from typing import List
+import re
+
+_PERSONA = re.compile(r"(상담사입니다|전문가입니다|도와드리겠습니다)", re.I)
+_FUP_OPEN, _FUP_CLOSE = "<followups>", "</followups>"
+_CIT_OPEN, _CIT_CLOSE = "<citations>", "</citations>"
+MAX_FOLLOWUPS = 2
+DEFAULT_FOLLOWUP = "- 다른 점도 도와드릴까요?"
+
+
+def _is_persona(line: str) -> bool:
+    return line.strip().startswith("안녕하세요") or bool(_PERSONA.search(line))
+
+
+def _partial_tag_start(buf: str, tags) -> int:
+    """buf 끝이 tags 중 하나의 앞부분일 수 있으면 그 시작 위치, 아니면 -1"""
+    i = buf.rfind("<")
+    while i >= 0:
+        tail = buf[i:]
+        if any(t.startswith(tail) for t in tags):
+            return i
+        i = buf.rfind("<", 0, i)
+    return -1
+
+
+class AnswerFilter:
+    def __init__(self, citations: str):
+        self.citations = citations
+        self.state = "lead"
+        self._buf = ""
+        self._ws = ""            # 보류 중인 후행 공백 (최종 결과는 strip 된 형태)
+        self._out: List[str] = []
+        self._fup_done = False   # 첫 followups 블록만 정리
+        self._fup_seen: set = set()
+        self._fup_count = 0
+        self._cit_done = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._out)
+
+    def feed(self, delta: str) -> str:
+        self._buf += delta
+        pieces: List[str] = []
+        self._run(pieces, final=False)
+        return self._emit(pieces)
+
+    def finish(self) -> str:
+        pieces: List[str] = []
+        self._run(pieces, final=True)
+        if self.state == "followups":
+            self._close_followups(pieces)
+        out = self._emit(pieces)
+        if not self._cit_done:
+            self._ws = ""
+            tail = "\n\n" + self.citations  # 본문이 비어도 기존 후처리와 같은 형태
+            self._out.append(tail)
+            out += tail
+        return out
+
+    # ---------------- 내부 ----------------
+    def _emit(self, pieces: List[str]) -> str:
+        s = "".join(pieces)
+        if not s:
+            return ""
+        s = self._ws + s
+        if not self._out:
+            s = s.lstrip()
+        body = s.rstrip()
+        self._ws = s[len(body):]
+        if body:
+            self._out.append(body)
+        return body
+
+    def _run(self, pieces: List[str], final: bool) -> None:
+        while True:
+            before = (self.state, len(self._buf))
+            getattr(self, "_" + self.state)(pieces, final)
+            if (self.state, len(self._buf)) == before:
+                return
+
+    def _lead(self, pieces, final):
+        while True:
+            nl = self._buf.find("\n")
+            if nl < 0:
+                if final and self._buf and _is_persona(self._buf):
+                    self._buf = ""
+                elif final and self._buf:
+                    self.state = "body"
+                return
+            line = self._buf[:nl]
+            if _is_persona(line):
+                self._buf = self._buf[nl + 1:]
+                continue
+            self.state = "body"
+            return
+
+    def _body(self, pieces, final):
+        tags = [_CIT_OPEN] if self._fup_done else [_FUP_OPEN, _CIT_OPEN]
+        hits = [(self._buf.find(t), t) for t in tags]
+        hits = [(i, t) for i, t in hits if i >= 0]
+        if hits:
+            i, tag = min(hits)
+            pieces.append(self._buf[:i])
+            self._buf = self._buf[i + len(tag):]
+            if tag == _FUP_OPEN:
+                pieces.append(_FUP_OPEN + "\n")
+                self.state = "followups"
+            else:
+                pieces.append(self.citations)
+                self._cit_done = True
+                self.state = "citations"
+            return
+        cut = len(self._buf) if final else _partial_tag_start(self._buf, tags)
+        if cut < 0:
+            cut = len(self._buf)
+        pieces.append(self._buf[:cut])
+        self._buf = self._buf[cut:]
+
+    def _followup_line(self, pieces, line: str) -> None:
+        ln = line.strip()
+        if not ln.startswith("-") or self._fup_count >= MAX_FOLLOWUPS:
+            return
+        key = ln[1:].strip().lower()
+        if key and key not in self._fup_seen:
+            self._fup_seen.add(key)
+            self._fup_count += 1
+            pieces.append(ln + "\n")
+
+    def _close_followups(self, pieces) -> None:
+        if self._buf:
+            for line in self._buf.splitlines():
+                self._followup_line(pieces, line)
+            self._buf = ""
+        if not self._fup_count:
+            pieces.append(DEFAULT_FOLLOWUP + "\n")
+        pieces.append(_FUP_CLOSE)
+        self._fup_done = True
+        self.state = "body"
+
+    def _followups(self, pieces, final):
+        j = self._buf.find(_FUP_CLOSE)
+        if j >= 0:
+            block, self._buf = self._buf[:j], self._buf[j + len(_FUP_CLOSE):]
+            for line in block.splitlines():
+                self._followup_line(pieces, line)
+            if not self._fup_count:
+                pieces.append(DEFAULT_FOLLOWUP + "\n")
+            pieces.append(_FUP_CLOSE)
+            self._fup_done = True
+            self.state = "body"
+            return
+        nl = self._buf.rfind("\n")
+        if nl >= 0:
+            for line in self._buf[:nl].splitlines():
+                self._followup_line(pieces, line)
+            self._buf = self._buf[nl + 1:]
+
+    def _citations(self, pieces, final):
+        j = self._buf.find(_CIT_CLOSE)
+        if j >= 0:
+            self._buf = self._buf[j + len(_CIT_CLOSE):]
+            self.state = "body"
+            return
+        # 닫는 태그가 걸칠 수 있는 꼬리만 남기고 버림
+        keep = len(_CIT_CLOSE) - 1
+        if len(self._buf) > keep:
+            self._buf = self._buf[-keep:]
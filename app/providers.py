@@ -0,0 +1,359 @@
+# app/providers.py
+"""
+LLM provider 계층 (async 스트리밍)
+- Provider: provider 별 동시 요청 제한(세마포어) + 서킷 브레이커 + TTFT 기록
+- ProviderRouter: 주 provider 로 요청하고
+  · hedge_after_ms 안에 첫 토큰이 없으면 다른 provider 에 같은 요청을 하나 더 보냄(hedging)
+  · 첫 토큰 전에 실패하면 다른 provider 로 넘김(failover), 브레이커가 열린 provider 는 건너뜀
+  · 먼저 첫 이벤트를 낸 쪽만 끝까지 스트리밍하고 나머지는 취소
+이벤트 형식은 LLM.astream_events 와 같음: ("token", 텍스트) / ("tool", 툴 결과 dict)
+"""
+from __future__ import annotations
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+from openai import AsyncOpenAI
+from .config import settings
+from .metrics import LLM_TTFT_SECONDS
+
+log = logging.getLogger(__name__)
+
+Event = Tuple[str, Any]
+
+
+class CircuitBreaker:
+    """연속 실패 failures 회 → open, reset_s 후 half-open(시험 요청 1개만 허용) → 성공 시 closed"""
+    def __init__(self, failures: int = 5, reset_s: float = 30.0):
+        self.failures = max(1, failures)
+        self.reset_s = reset_s
+        self.state = "closed"
+        self.consecutive = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.probing = False  # half-open 시험 요청이 진행 중
+
+    def allow(self) -> bool:
+        """요청을 보내도 되는지 — half-open 에서는 True 를 한 번만 반환 (시험 요청 자리를 차지함)"""
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_s:
+            self.state = "half_open"
+        if self.state == "open":
+            return False
+        if self.state == "half_open":
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def release_probe(self) -> None:
+        """시험 요청이 결과 없이 취소된 경우 다음 요청이 시험할 수 있게 자리 반환"""
+        self.probing = False
+
+    def record_success(self) -> None:
+        self.consecutive = 0
+        self.state = "closed"
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.consecutive += 1
+        self.probing = False
+        if self.state == "half_open" or self.consecutive >= self.failures:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.consecutive, "trips": self.trips,
+                "probing": self.probing}
+
+
+class LatencyWindow:
+    """최근 maxlen 개 지연(ms)의 p50/p95/p99"""
+    def __init__(self, maxlen: int = 1024):
+        self.samples: deque = deque(maxlen=maxlen)
+        self.count = 0
+
+    def add(self, ms: float) -> None:
+        self.samples.append(ms)
+        self.count += 1
+
+    def stats(self) -> Dict[str, Any]:
+        xs = sorted(self.samples)
+        if not xs:
+            return {"count": 0}
+        pick = lambda q: round(xs[min(len(xs) - 1, int(q * len(xs)))], 1)
+        return {"count": self.count, "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(xs[-1], 1)}
+
+
+class Provider:
+    name = "base"
+
+    def __init__(self, max_concurrency: int = 32):
+        self.max_concurrency = max(1, max_concurrency)
+        self.sem = asyncio.Semaphore(self.max_concurrency)
+        self.breaker = CircuitBreaker(settings.llm_breaker_failures, settings.llm_breaker_reset_s)
+        self.ttft = LatencyWindow()
+        self.inflight = 0
+        self.requests = self.errors = 0
+
+    async def _stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[Event]:
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[Event]:
+        async with self.sem:  # 대기 시간도 TTFT 에 포함 → 포화되면 hedge 가 발동
+            self.inflight += 1
+            self.requests += 1
+            gen = self._stream(messages)
+            try:
+                async for event in gen:
+                    yield event
+            finally:
+                self.inflight -= 1
+                await gen.aclose()  # 취소/중단 시 upstream 스트림도 바로 닫음
+
+    def record_failure(self, exc: BaseException) -> None:
+        self.errors += 1
+        self.breaker.record_failure()
+        log.warning(f"[llm:{self.name}] 실패 ({self.breaker.state}): {exc!r}")
+
+    async def warmup(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency, "inflight": self.inflight,
+            "requests": self.requests, "errors": self.errors,
+            "breaker": self.breaker.stats(), "ttft_ms": self.ttft.stats(),
+        }
+
+
+class OpenAIProvider(Provider):
+    name = "openai"
+
+    def __init__(self, aclient: AsyncOpenAI, model: str, max_concurrency: int = 32):
+        super().__init__(max_concurrency)
+        self.aclient = aclient
+        self.model = model
+
+    async def _stream(self, messages):
+        stream = await self.aclient.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.3,
+            top_p=0.9,
+            max_tokens=700,
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield "token", delta
+
+    async def warmup(self) -> None:
+        try:
+            await self.aclient.models.retrieve(self.model)
+        except Exception as e:
+            log.warning(f"[openai] warmup 실패: {e}")
+
+
+class GeminiProvider(Provider):
+    name = "gemini"
+
+    def __init__(self, gemini, max_concurrency: int = 32):
+        super().__init__(max_concurrency)
+        self.gemini = gemini  # GeminiLLM (worker 당 1개)
+
+    def _stream(self, messages):
+        return self.gemini.astream_events(messages)
+
+    async def warmup(self) -> None:
+        await self.gemini.warmup()
+
+
+class StubProvider(Provider):
+    name = "stub"
+
+    def __init__(self, stub, max_concurrency: int = 1024):
+        super().__init__(max_concurrency)
+        self.stub = stub  # StubLLM
+
+    def _stream(self, messages):
+        return self.stub.astream_events(messages)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "stub": self.stub.stats()}
+
+
+class _Attempt:
+    """provider 하나에 대한 요청 — 첫 이벤트를 task 로 기다림"""
+    def __init__(self, provider: Provider, messages: List[Dict[str, str]], hedged: bool):
+        self.provider = provider
+        self.hedged = hedged
+        self.started = time.perf_counter()
+        self.gen = provider.stream(messages)
+        self.task = asyncio.ensure_future(self.gen.__anext__())
+
+    async def abandon(self) -> None:
+        if not self.task.done():
+            self.provider.breaker.release_probe()  # 결과 없이 끝남 → 성공/실패로 세지 않음
+        self.task.cancel()
+        try:
+            await self.task
+        except BaseException:
+            pass
+        try:
+            await self.gen.aclose()
+        except BaseException:
+            pass
+
+
+class ProviderRouter:
+    def __init__(self, providers: List[Provider], hedge_after_ms: float = 0.0, first_token_timeout_ms: float = 0.0):
+        self.providers = providers  # 우선순위 순서 (첫 번째가 주 provider)
+        self.hedge_after = max(0.0, hedge_after_ms) / 1000.0
+        self.first_token_timeout = max(0.0, first_token_timeout_ms) / 1000.0
+        self.hedges = self.hedge_wins = self.failovers = 0
+        self.ttft = LatencyWindow()
+
+    async def warmup(self) -> None:
+        await asyncio.gather(*(p.warmup() for p in self.providers), return_exceptions=True)
+
+    @staticmethod
+    def _next_allowed(queue: List[Provider]) -> Optional[Provider]:
+        """queue 에서 브레이커가 허용하는 다음 provider (실제로 요청할 때만 allow() 호출 → half-open 시험 자리 보존)"""
+        while queue:
+            p = queue.pop(0)
+            if p.breaker.allow():
+                return p
+        return None
+
+    async def _first_event(self, messages) -> Tuple[_Attempt, Optional[Event], List[_Attempt]]:
+        """(승자, 첫 이벤트 또는 None(빈 응답), 정리할 나머지 시도)"""
+        queue = list(self.providers)
+        first_provider = self._next_allowed(queue)
+        if first_provider is None:
+            raise RuntimeError("사용 가능한 LLM provider 없음 (모든 서킷 open)")
+        start = round_start = time.perf_counter()  # round_start: 현재 주 시도 시작 (타임아웃/hedge 기준)
+        live: List[_Attempt] = [_Attempt(first_provider, messages, hedged=False)]
+        last_exc: Optional[BaseException] = None
+        try:
+            while True:
+                if not live:
+                    nxt = self._next_allowed(queue)
+                    if nxt is None:
+                        raise last_exc or RuntimeError("LLM 응답 없음")
+                    self.failovers += 1
+                    round_start = time.perf_counter()
+                    live.append(_Attempt(nxt, messages, hedged=False))
+                now = time.perf_counter()
+                timeout = None
+                if self.first_token_timeout > 0:
+                    timeout = max(0.0, round_start + self.first_token_timeout - now)
+                can_hedge = queue and self.hedge_after > 0 and not any(a.hedged for a in live)
+                if can_hedge:
+                    wait_hedge = max(0.0, round_start + self.hedge_after - now)
+                    timeout = wait_hedge if timeout is None else min(timeout, wait_hedge)
+                done, _ = await asyncio.wait([a.task for a in live], timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if self.first_token_timeout > 0 and time.perf_counter() - round_start >= self.first_token_timeout:
+                        # 멈춘 시도는 실패로 기록(브레이커에 반영)하고 남은 provider 로 넘김
+                        last_exc = asyncio.TimeoutError(f"첫 토큰 타임아웃 ({self.first_token_timeout * 1000:.0f}ms)")
+                        for a in live:
+                            a.provider.record_failure(last_exc)
+                            await a.abandon()
+                        live = []
+                        continue
+                    if can_hedge:
+                        nxt = self._next_allowed(queue)
+                        if nxt is not None:
+                            self.hedges += 1
+                            live.append(_Attempt(nxt, messages, hedged=True))
+                    continue
+                for a in list(live):
+                    if a.task not in done:
+                        continue
+                    exc = a.task.exception()
+                    if exc is None or isinstance(exc, StopAsyncIteration):
+                        live.remove(a)
+                        first = None if exc is not None else a.task.result()
+                        now = time.perf_counter()
+                        a.provider.ttft.add((now - a.started) * 1000.0)
+                        LLM_TTFT_SECONDS.observe(now - a.started, provider=a.provider.name)
+                        self.ttft.add((now - start) * 1000.0)  # 사용자 기준 (hedge 대기 포함)
+                        return a, first, live
+                    a.provider.record_failure(exc)
+                    last_exc = exc
+                    live.remove(a)
+        except BaseException:
+            for a in live:
+                await a.abandon()
+            raise
+
+    async def astream_events(self, messages: List[Dict[str, str]]) -> AsyncIterator[Event]:
+        winner, first, losers = await self._first_event(messages)
+        for a in losers:
+            await a.abandon()
+        if winner.hedged:
+            self.hedge_wins += 1
+        if first is None:
+            winner.provider.breaker.record_success()
+            return
+        try:
+            yield first
+            async for event in winner.gen:
+                yield event
+        except (GeneratorExit, asyncio.CancelledError):
+            winner.provider.breaker.release_probe()
+            raise
+        except Exception as e:
+            # 토큰을 이미 보낸 뒤라 다른 provider 로 넘기지 않음
+            winner.provider.record_failure(e)
+            raise
+        finally:
+            await winner.gen.aclose()
+        winner.provider.breaker.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "order": [p.name for p in self.providers],
+            "hedge_after_ms": self.hedge_after * 1000.0,
+            "hedges": self.hedges, "hedge_wins": self.hedge_wins, "failovers": self.failovers,
+            "ttft_ms": self.ttft.stats(),
+            "providers": {p.name: p.stats() for p in self.providers},
+        }
+
+
+def build_router(llm) -> ProviderRouter:
+    """LLM 인스턴스의 주 provider 클라이언트를 재사용하고, 키가 있으면 다른 provider 를 failover/hedge 대상으로 추가"""
+    from .llm_gemini import GeminiLLM
+
+    def make(name: str) -> Optional[Provider]:
+        if name == "openai":
+            aclient = getattr(llm, "aclient", None) or AsyncOpenAI(api_key=settings.openai_api_key)
+            return OpenAIProvider(aclient, settings.openai_chat_model, settings.llm_max_concurrency_openai)
+        if name == "gemini":
+            gemini = getattr(llm, "gemini", None) or GeminiLLM()
+            return GeminiProvider(gemini, settings.llm_max_concurrency_gemini)
+        if name == "stub":
+            return StubProvider(llm.stub)
+        return None
+
+    keys = {"openai": settings.openai_api_key, "gemini": settings.gemini_api_key}
+    providers = [make(llm.provider)]
+    if settings.llm_failover and llm.provider != "stub":  # 부하 테스트가 실제 provider 로 새지 않도록
+        for name in ("openai", "gemini"):
+            if name != llm.provider and keys[name]:
+                try:
+                    providers.append(make(name))
+                except Exception as e:
+                    log.warning(f"[llm] 보조 provider({name}) 초기화 실패: {e}")
+    return ProviderRouter(
+        [p for p in providers if p is not None],
+        hedge_after_ms=settings.llm_hedge_after_ms,
+        first_token_timeout_ms=settings.llm_first_token_timeout_ms,
+    )
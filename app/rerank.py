@@ -0,0 +1,220 @@
+# app/rerank.py
+"""
+리랭커 계층 (cross-encoder)
+- cascade : 융합 점수 1·2위 차이가 skip_margin 이상이면 리랭킹 생략 (융합 순위 그대로)
+- 길이 제한: 후보 본문을 max_tokens 토큰 예산으로 자름 (문자 수로 먼저 자르고 토크나이저 max_length 로 마무리)
+- 배칭   : 동시에 들어온 요청들의 (query, passage) 쌍을 MicroBatcher 로 모아 compute 한 번에 처리
+- 점수 캐시: (정규화 쿼리, doc_id, 인덱스 generation) → 점수, 캐시에 없는 쌍만 모델로 보냄
+- backend: "flag"(FlagEmbedding, GPU 일 때만 fp16) / "onnx"(int8 양자화 ONNX, CPU)
+
+ONNX 모델 준비 (예):
+  optimum-cli export onnx --model BAAI/bge-reranker-v2-m3 --task text-classification onnx/reranker
+  optimum-cli onnxruntime quantize --onnx_model onnx/reranker --avx2 -o onnx/reranker-int8
+  → RERANKER_BACKEND=onnx RERANKER_ONNX_PATH=onnx/reranker-int8
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+import threading
+from .batching import MicroBatcher
+from .cache import LRUCache, normalize_query
+from .config import settings
+
+log = logging.getLogger(__name__)
+
+# Optional backends
+try:
+    from FlagEmbedding import FlagReranker  # pip install FlagEmbedding
+except Exception:
+    FlagReranker = None  # optional dependency
+
+try:
+    import onnxruntime as ort  # pip install onnxruntime
+except Exception:
+    ort = None  # optional dependency
+
+# 토큰 예산 → 문자 수 (한국어는 XLM-R 토크나이저 기준 1토큰 ≈ 1~2자, 영문/URL ≈ 4자)
+# 토크나이저가 남길 본문은 자르지 않도록 여유 있게 자르고, 정확한 자르기는 토크나이저 max_length 가 함
+CHARS_PER_TOKEN = 6
+
+Pair = Tuple[str, str]
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return text
+    return text[: max_tokens * CHARS_PER_TOKEN]
+
+
+def _use_fp16(value: str) -> bool:
+    if value.lower() in ("1", "true", "yes"):
+        return True
+    if value.lower() in ("0", "false", "no"):
+        return False
+    try:
+        import torch
+        return bool(torch.cuda.is_available())  # CPU fp16 은 느리거나 미지원
+    except Exception:
+        return False
+
+
+class FlagBackend:
+    name = "flag"
+
+    def __init__(self, model: str, max_tokens: int, fp16: bool):
+        if FlagReranker is None:
+            raise RuntimeError("FlagEmbedding 이 설치되어 있지 않습니다.")
+        self.model = FlagReranker(model, use_fp16=fp16)
+        self.max_tokens = max_tokens
+        self.fp16 = fp16
+
+    def score(self, pairs: List[Pair]) -> List[float]:
+        scores = self.model.compute_score([list(p) for p in pairs], max_length=self.max_tokens)
+        if not isinstance(scores, list):  # 쌍이 1개면 float 반환
+            scores = [scores]
+        return [float(s) for s in scores]
+
+
+class OnnxBackend:
+    """optimum 으로 export/양자화한 cross-encoder (model*.onnx + tokenizer 파일이 있는 디렉토리)"""
+    name = "onnx"
+
+    def __init__(self, path: str, max_tokens: int, threads: int = 0):
+        if ort is None:
+            raise RuntimeError("onnxruntime 이 설치되어 있지 않습니다.")
+        from transformers import AutoTokenizer
+        root = Path(path)
+        candidates = sorted(root.glob("*quantized*.onnx")) or sorted(root.glob("*.onnx"))
+        if not candidates:
+            raise FileNotFoundError(f"ONNX 모델 파일 없음: {root}")
+        opts = ort.SessionOptions()
+        if threads > 0:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(candidates[0]), opts, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(str(root))
+        self.max_tokens = max_tokens
+        self.model_file = candidates[0].name
+
+    def score(self, pairs: List[Pair]) -> List[float]:
+        enc = self.tokenizer(
+            [q for q, _ in pairs], [p for _, p in pairs],
+            padding=True, truncation="only_second", max_length=self.max_tokens, return_tensors="np",
+        )
+        feeds = {k: v for k, v in enc.items() if k in self.input_names}
+        logits = self.session.run(None, feeds)[0]
+        return [float(x) for x in logits.reshape(len(pairs), -1)[:, 0]]
+
+
+class Reranker:
+    def __init__(self, backend, skip_margin: float = 0.0, batch: bool = True,
+                 max_batch: int = 8, max_wait_ms: float = 3.0,
+                 cache_size: int = 0, cache_ttl_s: float = 0.0):
+        self.backend = backend
+        self.skip_margin = skip_margin
+        self.cache = LRUCache(maxsize=cache_size, ttl_s=cache_ttl_s)  # 0 이면 캐시 안 함
+        self._lock = threading.Lock()
+        self.calls = self.skipped = self.pairs = 0
+        self.batcher = None
+        if batch:
+            self.batcher = MicroBatcher(self._score_many, max_batch=max_batch,
+                                        max_wait_ms=max_wait_ms, name="rerank-batcher")
+
+    def _score_many(self, requests: List[List[Pair]]) -> List[List[float]]:
+        """여러 요청의 쌍을 한 번에 점수화한 뒤 요청별로 나눔"""
+        flat = [p for pairs in requests for p in pairs]
+        scores = self.backend.score(flat)
+        out, i = [], 0
+        for pairs in requests:
+            out.append(scores[i:i + len(pairs)])
+            i += len(pairs)
+        return out
+
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        pairs = [(query, truncate(t, self.backend.max_tokens)) for t in texts]
+        with self._lock:
+            self.pairs += len(pairs)
+        if self.batcher is not None:
+            return self.batcher.run(pairs)
+        return self.backend.score(pairs)
+
+    def rerank(self, query: str, candidates: Sequence[Tuple[str, float, str]],
+               generation: int = 0) -> Optional[Dict[str, float]]:
+        """
+        candidates: 융합 점수 내림차순 [(doc_id, fused_score, text)]
+        generation: 인덱스 generation — 문서가 바뀌면 이전 점수를 쓰지 않음
+        반환: {doc_id: rerank 점수}, cascade 로 생략하면 None
+        """
+        with self._lock:
+            self.calls += 1
+        if len(candidates) < 2:
+            return None
+        if self.skip_margin > 0 and candidates[0][1] - candidates[1][1] >= self.skip_margin:
+            with self._lock:
+                self.skipped += 1
+            return None
+        nq = normalize_query(query)
+        out: Dict[str, float] = {}
+        missing = []
+        for doc_id, _, text in candidates:
+            cached = self.cache.get((nq, doc_id, generation)) if self.cache.maxsize else None
+            if cached is None:
+                missing.append((doc_id, text))
+            else:
+                out[doc_id] = cached
+        if missing:
+            scores = self.score(query, [text for _, text in missing])
+            for (doc_id, _), s in zip(missing, scores):
+                out[doc_id] = s
+                self.cache.put((nq, doc_id, generation), s)
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = {
+                "backend": self.backend.name,
+                "max_tokens": self.backend.max_tokens,
+                "skip_margin": self.skip_margin,
+                "calls": self.calls,
+                "skipped": self.skipped,
+                "skip_rate": round(self.skipped / self.calls, 4) if self.calls else 0.0,
+                "pairs_scored": self.pairs,
+            }
+        if self.cache.maxsize:
+            # hits = 모델로 보내지 않고 재사용한 (query, doc) 쌍 수
+            out["cache"] = self.cache.stats()
+        if self.batcher is not None:
+            out["batcher"] = self.batcher.stats()
+        return out
+
+
+def build_backend(backend: Optional[str] = None, max_tokens: Optional[int] = None):
+    backend = (backend or settings.reranker_backend).lower()
+    max_tokens = settings.rerank_max_tokens if max_tokens is None else max_tokens
+    if backend == "onnx":
+        return OnnxBackend(settings.reranker_onnx_path, max_tokens, settings.reranker_onnx_threads)
+    if backend == "flag":
+        return FlagBackend(settings.reranker_model, max_tokens, _use_fp16(settings.reranker_fp16))
+    raise ValueError(f"Unsupported reranker backend: {backend}")
+
+
+def build_reranker() -> Optional[Reranker]:
+    """설정대로 리랭커 생성 — 꺼져 있거나 백엔드를 못 올리면 None (리랭킹 없이 융합 점수 사용)"""
+    if not settings.enable_reranker:
+        return None
+    try:
+        backend = build_backend()
+    except Exception as e:
+        log.warning(f"[rerank] 리랭커 로드 실패 ({settings.reranker_backend}): {e}")
+        return None
+    log.info(f"[rerank] backend={backend.name} max_tokens={backend.max_tokens} skip_margin={settings.rerank_skip_margin}")
+    return Reranker(
+        backend,
+        skip_margin=settings.rerank_skip_margin,
+        batch=settings.rerank_batch_enabled,
+        max_batch=settings.rerank_batch_max_size,
+        max_wait_ms=settings.rerank_batch_max_wait_ms,
+        cache_size=settings.rerank_cache_size,
+        cache_ttl_s=settings.rerank_cache_ttl_s,
+    )
@@ -0,0 +1,219 @@
+# app/retention.py
+"""
+대화 메모리 보존 정책 (messages 테이블)
+- TTL: 마지막 메시지가 ttl_days 보다 오래된 대화는 통째로 삭제
+- max_turns: 대화별 최근 max_turns 개만 남기고 오래된 메시지 삭제
+- 삭제는 chunk_size 단위의 짧은 트랜잭션으로 나눠 실행 (다른 쓰기를 오래 막지 않음)
+- archive_dir 지정 시 삭제 전에 gzip JSONL 로 내보냄
+- 삭제 후 incremental_vacuum 으로 빈 페이지 반환 + 테이블 크기 지표 제공
+  (auto_vacuum=INCREMENTAL 인 DB 에서만 동작 — 기존 DB 전환은 전체 VACUUM 이 필요하므로
+   scripts/vacuum_memory.py 로 1회 실행하거나 RETENTION_CONVERT_VACUUM=true 로 백그라운드 스레드에서 실행)
+"""
+from __future__ import annotations
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import gzip
+import json
+import logging
+import sqlite3
+import threading
+import time
+from .config import settings
+
+log = logging.getLogger(__name__)
+
+
+class RetentionEngine:
+    def __init__(self, db_path: Optional[str] = None, memory=None,
+                 ttl_days: float = 0.0, max_turns: int = 0, chunk_size: int = 500,
+                 archive_dir: str = "", vacuum_pages: int = 1000, convert_vacuum: bool = False):
+        self.db_path = db_path or settings.sqlite_path
+        self.memory = memory  # hot window 캐시 무효화용 (evict 가 있으면 호출)
+        self.ttl_days = ttl_days
+        self.max_turns = max_turns
+        self.chunk_size = max(1, chunk_size)
+        self.archive_dir = Path(archive_dir) if archive_dir else None
+        self.vacuum_pages = vacuum_pages
+        self.convert_vacuum = convert_vacuum
+        self.last_run: Dict[str, Any] = {}
+        self.totals = {"runs": 0, "deleted_expired": 0, "deleted_trimmed": 0, "archived": 0}
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._archive_path: Optional[Path] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_days > 0 or self.max_turns > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.db_path, timeout=settings.sqlite_busy_timeout_ms / 1000.0)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        return con
+
+    def ensure_incremental_vacuum(self) -> bool:
+        """
+        auto_vacuum=INCREMENTAL 로 전환 (기존 DB 는 1회 VACUUM 필요 → 실행 중 DB 전체에 배타 락)
+        요청 경로/시작 훅에서 부르지 말 것 — 유지보수 스크립트나 retention 스레드에서만
+        반환: 이번에 전환했으면 True
+        """
+        con = self._connect()
+        try:
+            if con.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return False
+            start = time.perf_counter()
+            log.info("[retention] auto_vacuum=INCREMENTAL 설정 (1회 VACUUM)")
+            con.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            con.execute("VACUUM")
+            log.info(f"[retention] VACUUM 완료 ({(time.perf_counter() - start) * 1000:.0f}ms)")
+            return True
+        finally:
+            con.close()
+
+    # ---------------- 삭제 ----------------
+    def _archive(self, rows: List[Tuple]) -> None:
+        if not self.archive_dir or not rows:
+            return
+        if self._archive_path is None:
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+            self._archive_path = self.archive_dir / f"messages-{stamp}.jsonl.gz"
+        with gzip.open(self._archive_path, "at", encoding="utf-8") as f:
+            for _id, conv_id, role, content, ts in rows:
+                f.write(json.dumps(
+                    {"id": _id, "conversation_id": conv_id, "role": role, "content": content, "ts": ts},
+                    ensure_ascii=False,
+                ) + "\n")
+        self.totals["archived"] += len(rows)
+
+    def _delete_chunked(self, con: sqlite3.Connection, select_sql: str, params: tuple) -> int:
+        """select_sql 로 고른 메시지를 chunk 단위로 (보관 후) 삭제"""
+        deleted = 0
+        while not self._stop.is_set():
+            rows = con.execute(
+                f"SELECT id, conversation_id, role, content, ts FROM messages WHERE id IN ({select_sql}) LIMIT ?",
+                (*params, self.chunk_size),
+            ).fetchall()
+            if not rows:
+                break
+            self._archive(rows)
+            with con:
+                con.executemany("DELETE FROM messages WHERE id=?", [(r[0],) for r in rows])
+            deleted += len(rows)
+            if len(rows) < self.chunk_size:
+                break
+            time.sleep(0.01)  # 다른 writer 에게 양보
+        return deleted
+
+    def _expire(self, con: sqlite3.Connection) -> Tuple[int, List[str]]:
+        cutoff = (datetime.utcnow() - timedelta(days=self.ttl_days)).isoformat(timespec="seconds")
+        convs = [r[0] for r in con.execute(
+            "SELECT conversation_id FROM messages GROUP BY conversation_id HAVING MAX(ts) < ?", (cutoff,)
+        )]
+        deleted = 0
+        for conv_id in convs:
+            deleted += self._delete_chunked(
+                con, "SELECT id FROM messages WHERE conversation_id=? AND ts < ?", (conv_id, cutoff)
+            )
+        return deleted, convs
+
+    def _trim(self, con: sqlite3.Connection) -> Tuple[int, List[str]]:
+        convs = [r[0] for r in con.execute(
+            "SELECT conversation_id FROM messages GROUP BY conversation_id HAVING COUNT(*) > ?", (self.max_turns,)
+        )]
+        deleted = 0
+        for conv_id in convs:
+            deleted += self._delete_chunked(
+                con,
+                "SELECT id FROM messages WHERE conversation_id=? ORDER BY ts DESC, id DESC LIMIT -1 OFFSET ?",
+                (conv_id, self.max_turns),
+            )
+        return deleted, convs
+
+    def run_once(self) -> Dict[str, Any]:
+        if not self._run_lock.acquire(blocking=False):
+            return {"status": "busy"}
+        start = time.perf_counter()
+        try:
+            self._archive_path = None
+            con = self._connect()
+            try:
+                expired = trimmed = 0
+                evict: List[str] = []
+                if self.ttl_days > 0:
+                    expired, convs = self._expire(con)
+                    evict += convs
+                if self.max_turns > 0:
+                    trimmed, convs = self._trim(con)
+                    evict += convs
+                if expired or trimmed:
+                    # executescript: sqlite3_exec 로 끝까지 실행 (execute 는 1 step → 1 페이지만 반환)
+                    con.executescript(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)});")
+            finally:
+                con.close()
+            # 만료/정리된 대화의 hot window 캐시 제거 (다음 조회 시 저장소에서 다시 읽음)
+            if self.memory is not None and hasattr(self.memory, "evict"):
+                for conv_id in evict:
+                    self.memory.evict(conv_id)
+            self.totals["runs"] += 1
+            self.totals["deleted_expired"] += expired
+            self.totals["deleted_trimmed"] += trimmed
+            self.last_run = {
+                "at": datetime.utcnow().isoformat(timespec="seconds"),
+                "deleted_expired": expired, "deleted_trimmed": trimmed,
+                "conversations": len(set(evict)),
+                "archive": str(self._archive_path) if self._archive_path else None,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+            }
+            if expired or trimmed:
+                log.info(f"[retention] 삭제 완료: {self.last_run}")
+            return self.last_run
+        finally:
+            self._run_lock.release()
+
+    # ---------------- 스케줄링 ----------------
+    def start(self, interval_s: float) -> None:
+        if self._thread is not None or not self.enabled:
+            return
+
+        def loop():
+            if self.convert_vacuum:
+                # opt-in: 시작을 막지 않도록 백그라운드에서 (다른 worker 가 이미 전환했으면 건너뜀)
+                try:
+                    self.ensure_incremental_vacuum()
+                except sqlite3.Error as e:
+                    log.warning(f"[retention] auto_vacuum 설정 실패: {e}")
+            while not self._stop.wait(interval_s):
+                try:
+                    self.run_once()
+                except Exception as e:
+                    log.warning(f"[retention] 실행 실패: {e}")
+
+        self._thread = threading.Thread(target=loop, name="retention", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # ---------------- 지표 ----------------
+    def metrics(self) -> Dict[str, Any]:
+        con = self._connect()
+        try:
+            page_size = con.execute("PRAGMA page_size").fetchone()[0]
+            page_count = con.execute("PRAGMA page_count").fetchone()[0]
+            freelist = con.execute("PRAGMA freelist_count").fetchone()[0]
+            rows, convs, oldest = con.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT conversation_id), MIN(ts) FROM messages"
+            ).fetchone()
+            auto_vacuum = con.execute("PRAGMA auto_vacuum").fetchone()[0]
+        finally:
+            con.close()
+        return {
+            "enabled": self.enabled, "ttl_days": self.ttl_days, "max_turns": self.max_turns,
+            "messages": rows, "conversations": convs, "oldest_ts": oldest,
+            "db_bytes": page_size * page_count, "free_bytes": page_size * freelist,
+            "auto_vacuum": {0: "none", 1: "full", 2: "incremental"}.get(auto_vacuum, auto_vacuum),
+            "last_run": self.last_run, "totals": self.totals,
+        }
@@ -1,27 +1,35 @@
 # app/retriever.py
 from __future__ import annotations
-from typing import List, Dict, Any, Tuple, Optional
+from typing import Callable, List, Dict, Any, Tuple, Optional
 import chromadb
 from chromadb.config import Settings as ChromaSettings
-from rank_bm25 import BM25Okapi
-from rapidfuzz import process, fuzz
-import pickle, json
+import pickle, shutil
 from pathlib import Path
 from .embeddings import LocalEmbedder
+from .batching import BatchingEmbedder
+from .cache import EmbeddingCache, LRUCache, normalize_query
+from .sparse import SparseBM25, tokenize
+from .docstore import DocStore
+from .index_builder import replace_dir
+from .sparse_index import MutableSparseIndex, index_lock
+from .rerank import build_reranker
+from .title_index import TitleIndex
+from .fusion import build_fusion
+from .metrics import STAGE_SECONDS, FALLBACKS, timer
 from .config import settings
 from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 import logging
+import threading
+import time
 
 log = logging.getLogger(__name__)
 
-# Optional reranker (FlagEmbedding)
-try:
-    from FlagEmbedding import FlagReranker  # pip install FlagEmbedding
-except Exception:
-    FlagReranker = None  # optional dependency
-
+# 구버전(pickle) 인덱스 파일 — 로드 시 INDEX_DIR 포맷으로 마이그레이션
 BM25_PKL = "bm25.pkl"
 DOCS_PKL = "bm25_docs.pkl"
+# mmap 인덱스: {INDEX_DIR}/bm25 (SparseBM25), {INDEX_DIR}/docs (DocStore), {INDEX_DIR}/delta.jsonl (증분 저널)
+INDEX_DIR = "sparse_index"
 
 class Retriever:
     def __init__(self, chroma_path: Optional[str] = None):
@@ -35,6 +43,15 @@ class Retriever:
         
         # 로컬 임베딩만 사용
         self.embedder = LocalEmbedder(model_name=settings.local_embed_model, device=settings.local_embed_device)
+        # 쿼리 임베딩 경로: 동시 요청을 배치로 묶음 (인덱싱은 self.embedder 직접 사용)
+        self.query_embedder = self.embedder
+        if settings.embed_batch_enabled:
+            self.query_embedder = BatchingEmbedder(
+                self.embedder,
+                max_batch=settings.embed_batch_max_size,
+                max_wait_ms=settings.embed_batch_max_wait_ms,
+                timeout_s=settings.embed_batch_timeout_s,
+            )
         
         # ChromaDB 임베딩 함수 정의
         class ChromaEmbeddingFunction:
@@ -53,6 +70,12 @@ class Retriever:
             metadata={"hnsw:space": "cosine"}
         )
         self.embed_dim = self.embedder.dim
+        # 반복 질문의 bge-m3 forward 생략 (모델명/차원이 키 namespace → 모델 교체 시 무효화)
+        self.embed_cache = EmbeddingCache(
+            model_name=self.embedder.model_name, dim=self.embed_dim,
+            maxsize=settings.embed_cache_size, ttl_s=settings.embed_cache_ttl_s,
+            store_path=settings.embed_cache_path,
+        )
         
         # 차원 불일치 Fail Fast 가드
         try:
@@ -69,16 +92,30 @@ class Retriever:
             log.error(f"[INDEX] 차원 검증 실패: {e}")
             self.dense_ok = False
 
-        # Optional reranker
-        self.reranker = None
-        if settings.enable_reranker and FlagReranker is not None:
-            try:
-                self.reranker = FlagReranker(settings.reranker_model, use_fp16=True)
-            except Exception:
-                self.reranker = None
-
-        self._bm25, self._bm25_lookup = self._load_bm25()
-        self._doc_map = self._load_docs()
+        # 하이브리드 점수 융합 (legacy / rrf / minmax / zscore, 리랭크 점수 보정)
+        self.fusion = build_fusion()
+        log.info(f"[INDEX] fusion={self.fusion.describe()}")
+
+        # Optional reranker (cascade / 길이 제한 / 요청 간 배칭, flag 또는 onnx backend)
+        self.reranker = build_reranker()
+
+        # _bm25: MutableSparseIndex (base mmap + 증분 delta), _doc_map: 그 문서 뷰
+        self._bm25, self._doc_map = self._load_index()
+        self._last_refresh = time.monotonic()
+
+        # 인덱스 generation: upsert/reset/rebuild 마다 증가 → 결과 캐시 키에 포함
+        self.generation = 0
+        self._generation_listeners: List[Callable[[], None]] = []  # 예: 답변 캐시 비우기
+        self.result_cache = LRUCache(maxsize=settings.result_cache_size, ttl_s=settings.result_cache_ttl_s)
+        # fuzzy fallback 제목 인덱스 (generation 이 바뀌면 다음 fallback 때 다시 구축)
+        self._title_index: Optional[TitleIndex] = None
+        self._title_lock = threading.Lock()
+
+        # parallel 모드: dense/sparse 단계를 동시에 실행할 전용 풀 (요청당 최대 2개 사용)
+        self._stage_pool = ThreadPoolExecutor(
+            max_workers=max(2, settings.retrieval_workers * 2),
+            thread_name_prefix="retrieve-stage",
+        )
 
     # ---------------- Ingestion ----------------
     def reset(self):
@@ -107,13 +144,16 @@ class Retriever:
         for p in [Path(self.chroma_path)/BM25_PKL, Path(self.chroma_path)/DOCS_PKL]:
             if p.exists():
                 p.unlink()
-        self._bm25, self._bm25_lookup = None, None
-        self._doc_map = {}
+        with index_lock(Path(self.chroma_path)/INDEX_DIR):
+            shutil.rmtree(Path(self.chroma_path)/INDEX_DIR, ignore_errors=True)
+        self._bm25, self._doc_map = None, {}
+        self._bump_generation()
 
     def upsert(self, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         docs: [{id, text, title, url, category}]
-        로컬 임베딩으로 Chroma 업서트 + BM25 구축
+        로컬 임베딩으로 Chroma 업서트 + BM25 반영
+        - 인덱스가 없으면 전체 구축, 있으면 delta 로 증분 반영 (같은 id 는 교체)
         """
         ids = [d["id"] for d in docs]
         # BGE 권장: passage 접두어
@@ -138,36 +178,93 @@ class Retriever:
         self.collection.upsert(ids=ids, metadatas=metadatas, documents=texts, embeddings=embeddings)
         print("[index] Chroma 업서트 완료")
 
-        # 3) BM25 인덱스 & 로컬 문서맵 저장
-        print("[index] BM25 토크나이즈...")
-        tokenized = [self._tokenize(d["text"]) for d in tqdm(docs, desc="BM25 토크나이즈", unit="doc")]
-        bm25 = BM25Okapi(tokenized)
-        lookup = {i: ids[i] for i in range(len(ids))}
-        with open(Path(self.chroma_path) / BM25_PKL, "wb") as f:
-            pickle.dump({"bm25": bm25, "lookup": lookup}, f)
-        self._bm25, self._bm25_lookup = bm25, lookup
-
-        print("[index] 문서 맵 저장...")
-        doc_map = {
-            d["id"]: {
-                "id": d["id"], "text": d["text"],
-                "title": d.get("title",""), "url": d.get("url",""), "category": d.get("category","")
-            } for d in docs
-        }
-        with open(Path(self.chroma_path) / DOCS_PKL, "wb") as f:
-            pickle.dump(doc_map, f)
-        self._doc_map = doc_map
+        # 3) BM25 인덱스 & 로컬 문서맵
+        if self._bm25 is None:
+            print("[index] BM25 토크나이즈...")
+            tokenized = [self._tokenize(d["text"]) for d in tqdm(docs, desc="BM25 토크나이즈", unit="doc")]
+            bm25 = SparseBM25.build(tokenized)
+
+            print("[index] BM25/문서 맵 저장...")
+            self._write_index(bm25, docs)
+            self._bm25, self._doc_map = self._load_index()
+            sparse_mode = "full"
+        else:
+            print(f"[index] BM25/문서 맵 증분 반영: {len(docs)}개 문서")
+            self._bm25.apply(upserts=docs)
+            self._maybe_compact()
+            sparse_mode = "incremental"
+        self._bump_generation()
 
         print("[index] 인덱싱 완료")
-        return {"ingested": len(docs), "mode": "dense+bm25", "embedding_ok": True}
-
-    def _load_bm25(self):
-        path = Path(self.chroma_path) / BM25_PKL
-        if path.exists():
-            with open(path, "rb") as f:
-                d = pickle.load(f)
-                return d["bm25"], d["lookup"]
-        return None, None
+        return {"ingested": len(docs), "mode": "dense+bm25", "sparse_mode": sparse_mode, "embedding_ok": True}
+
+    def delete(self, ids: List[str]) -> Dict[str, Any]:
+        """Chroma / BM25 / 문서맵에서 함께 삭제"""
+        ids = [str(i) for i in ids]
+        if not ids:
+            return {"deleted": 0}
+        self.collection.delete(ids=ids)
+        if self._bm25 is not None:
+            self._bm25.apply(deletes=ids)
+            self._maybe_compact()
+        self._bump_generation()
+        print(f"[index] 삭제 완료: {len(ids)}개 문서")
+        return {"deleted": len(ids)}
+
+    def _maybe_compact(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """delta/tombstone 이 임계치를 넘으면 base 재구축"""
+        if self._bm25 is None:
+            return None
+        if not force and not self._bm25.needs_compaction(settings.sparse_compact_ratio, settings.sparse_compact_min_ops):
+            return None
+        start = time.perf_counter()
+        stats = self._bm25.compact()
+        print(f"[index] sparse 인덱스 compaction 완료: {stats} ({(time.perf_counter() - start) * 1000:.0f}ms)")
+        return stats
+
+    def compact_index(self) -> Dict[str, Any]:
+        stats = self._maybe_compact(force=True) or {}
+        self._bump_generation()
+        return stats
+
+    def _write_index(self, bm25: SparseBM25, docs: List[Dict[str, Any]]):
+        """tmp 디렉토리에 쓴 뒤 교체 — 다른 worker 가 열어둔 mmap 은 기존 inode 를 계속 사용"""
+        root = Path(self.chroma_path) / INDEX_DIR
+        tmp = root.with_name(INDEX_DIR + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        bm25.save(tmp / "bm25")
+        DocStore.write(tmp / "docs", docs)
+        with index_lock(root):  # 다른 worker 의 저널 쓰기와 교체가 겹치지 않도록
+            replace_dir(tmp, root)
+
+    def _load_index(self):
+        root = Path(self.chroma_path) / INDEX_DIR
+        if not MutableSparseIndex.exists(root):
+            if not self._migrate_legacy_index():
+                return None, {}
+        index = MutableSparseIndex(root)
+        return index, index.docs
+
+    def _migrate_legacy_index(self) -> bool:
+        """bm25.pkl / bm25_docs.pkl → mmap 포맷 (1회)"""
+        bm25_path = Path(self.chroma_path) / BM25_PKL
+        docs_path = Path(self.chroma_path) / DOCS_PKL
+        if not bm25_path.exists():
+            return False
+        log.info("[INDEX] pickle 인덱스를 mmap 포맷으로 변환합니다")
+        with open(bm25_path, "rb") as f:
+            d = pickle.load(f)
+        doc_map = {}
+        if docs_path.exists():
+            with open(docs_path, "rb") as f:
+                doc_map = pickle.load(f)
+        bm25, lookup = d["bm25"], d["lookup"]
+        if not isinstance(bm25, SparseBM25):
+            # 구버전 인덱스(rank_bm25.BM25Okapi) → posting list 로 변환
+            bm25 = SparseBM25.from_okapi(bm25)
+        docs = [doc_map.get(lookup[i]) or {"id": lookup[i]} for i in range(len(bm25))]
+        self._write_index(bm25, docs)
+        return True
 
     def _detect_index_dim(self) -> int | None:
         """인덱스 차원 감지 - 실제 저장된 벡터에서 읽기"""
@@ -180,85 +277,101 @@ class Retriever:
             log.warning(f"[INDEX] 차원 감지 실패: {e}")
         return None
 
-    def _load_docs(self) -> Dict[str, Any]:
-        path = Path(self.chroma_path) / DOCS_PKL
-        if path.exists():
-            with open(path, "rb") as f:
-                return pickle.load(f)
-        return {}
-
-    # ---------------- Retrieval ----------------
-    def retrieve(self, query: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
-        k = k or settings.top_k
-        candidate_k = max(k, settings.rerank_top_k)
-
-        fused: Dict[str, float] = {}
+    def _maybe_refresh(self):
+        """다른 worker 가 반영한 증분 변경/compaction 을 주기적으로 확인"""
+        now = time.monotonic()
+        if now - self._last_refresh < settings.index_refresh_interval_s:
+            return
+        self._last_refresh = now
+        try:
+            if self._bm25 is None:
+                if MutableSparseIndex.exists(Path(self.chroma_path) / INDEX_DIR):
+                    self._bm25, self._doc_map = self._load_index()
+                    self._bump_generation()
+            elif self._bm25.refresh():
+                self._bump_generation()
+        except Exception as e:
+            log.warning(f"[INDEX] 인덱스 갱신 확인 실패: {e}")
 
-        # 1) Dense retrieval (Chroma)
-        if self.dense_ok:
+    def _bump_generation(self):
+        """인덱스 내용이 바뀌었음을 표시 — 이전 generation 의 캐시 결과는 더 이상 쓰지 않음"""
+        self.generation += 1
+        self.result_cache.clear()
+        for fn in list(self._generation_listeners):
             try:
-                # BGE 권장: query 접두어 + 직접 임베딩 사용
-                qvec = self.embedder.embed_one("query: " + query)
-                dense_results = self.collection.query(
-                    query_embeddings=[qvec],
-                    n_results=candidate_k,
-                    include=["metadatas", "documents", "distances"]
-                )
-                if dense_results["ids"] and dense_results["ids"][0]:
-                    for i, doc_id in enumerate(dense_results["ids"][0]):
-                        # Chroma는 거리 반환 → 유사도로 변환 (1 - 거리)
-                        distance = dense_results["distances"][0][i]
-                        score = 1.0 - distance
-                        fused[doc_id] = fused.get(doc_id, 0.0) + (score * settings.hybrid_dense_weight)
+                fn()
             except Exception as e:
-                print(f"[retrieve] Dense 검색 실패: {e}")
+                log.warning(f"[INDEX] generation listener 실패: {e}")
 
-        # 2) Sparse retrieval (BM25)
-        if self._bm25:
-            try:
-                tokenized_query = self._tokenize(query)
-                bm25_scores = self._bm25.get_scores(tokenized_query)
-                # Top-k BM25 결과
-                top_indices = sorted(range(len(bm25_scores)), key=lambda i: bm25_scores[i], reverse=True)[:candidate_k]
-                for idx in top_indices:
-                    if bm25_scores[idx] > 0:
-                        doc_id = self._bm25_lookup[idx]
-                        # BM25 점수 정규화 (0~1 범위로)
-                        normalized_score = min(bm25_scores[idx] / 10.0, 1.0)
-                        fused[doc_id] = fused.get(doc_id, 0.0) + (normalized_score * (1.0 - settings.hybrid_dense_weight))
-            except Exception as e:
-                print(f"[retrieve] BM25 검색 실패: {e}")
+    def on_generation_change(self, fn: Callable[[], None]) -> None:
+        """인덱스가 바뀔 때마다 fn() 호출 (retriever 밖의 파생 캐시 무효화용)"""
+        self._generation_listeners.append(fn)
+
+    # ---------------- Retrieval ----------------
+    def retrieve(self, query: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        k = k or settings.top_k
+        self._maybe_refresh()
+        key = (normalize_query(query), k, self.fusion.cache_key, self.generation)
+        cached = self.result_cache.get(key)
+        if cached is None:
+            with timer(STAGE_SECONDS, stage="retrieve"):
+                cached, complete = self._retrieve(query, k)
+            if complete:  # 타임아웃/오류로 빠진 단계가 있으면 캐시하지 않음 (일시 장애 결과 고정 방지)
+                self.result_cache.put(key, cached)
+        # 호출자가 결과 dict 를 수정해도 캐시가 오염되지 않도록 복사본 반환
+        return [dict(r) for r in cached]
+
+    def _retrieve(self, query: str, k: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """(결과, 모든 단계 완료 여부)"""
+        candidate_k = max(k, settings.retrieval_candidate_k or settings.rerank_top_k)
+
+        # 1) Dense (Chroma) + 2) Sparse (BM25) — 서로 독립이므로 parallel 모드에서는 동시 실행
+        # complete=False: 타임아웃/예외로 결과가 빠진 단계가 있음 → 결과 캐시에 넣지 않음
+        if settings.parallel_retrieval:
+            dense_hits, sparse_hits, complete = self._run_stages_parallel(query, candidate_k)
+        else:
+            dense_hits, dense_ok = self._stage("dense", self._dense_hits, query, candidate_k)
+            sparse_hits, sparse_ok = self._stage("sparse", self._sparse_hits, query, candidate_k)
+            complete = dense_ok and sparse_ok
+
+        with timer(STAGE_SECONDS, stage="fusion"):
+            fused: Dict[str, float] = self.fusion.fuse(dense_hits, sparse_hits)
 
         # 3) Fuzzy search (fallback)
         if not fused and self._doc_map:
+            FALLBACKS.inc(kind="fuzzy")
             try:
-                # 제목 기반 fuzzy search
-                titles = [(doc_id, doc["title"]) for doc_id, doc in self._doc_map.items()]
-                matches = process.extract(query, [t[1] for t in titles], limit=candidate_k, scorer=fuzz.partial_ratio)
-                for choice, score, idx in matches:  # ✅ 올바른 언패킹
-                    if score > 50:  # 50% 이상 매치
-                        doc_id = titles[idx][0]
-                        fused[doc_id] = max(fused.get(doc_id, 0.0), score / 100.0)
+                # 제목 기반 fuzzy search (50% 초과 매치)
+                with timer(STAGE_SECONDS, stage="fuzzy"):
+                    matches = self._get_title_index().search(
+                        query, candidate_k, score_cutoff=50,
+                        max_candidates=settings.fuzzy_max_candidates,
+                        prefilter_min=settings.fuzzy_prefilter_min,
+                    )
+                for doc_id, score in matches:
+                    fused[doc_id] = max(fused.get(doc_id, 0.0), score / 100.0)
             except Exception as e:
                 print(f"[retrieve] Fuzzy 검색 실패: {e}")
+                complete = False
 
         # 4) Reranking (optional)
         if self.reranker and fused:
             try:
                 # 상위 후보들만 rerank
-                top_candidates = sorted(fused.items(), key=lambda x: x[1], reverse=True)[:settings.rerank_top_k]
-                if len(top_candidates) > 1:
-                    pairs = [(query, self._doc_map[doc_id]["text"]) for doc_id, _ in top_candidates]
-                    rerank_scores = self.reranker.compute_score(pairs)
-                    # Rerank 점수로 업데이트
-                    for i, (doc_id, _) in enumerate(top_candidates):
-                        if i < len(rerank_scores):
-                            fused[doc_id] = rerank_scores[i]
+                top_candidates = self.fusion.top(fused, settings.rerank_top_k)
+                candidates = [(doc_id, score, self._doc_map[doc_id]["text"]) for doc_id, score in top_candidates]
+                with timer(STAGE_SECONDS, stage="rerank"):
+                    rerank_scores = self.reranker.rerank(query, candidates, generation=self.generation)
+                if rerank_scores:
+                    # Rerank 점수로 업데이트 (1·2위 차이가 크면 생략 → 융합 점수 유지)
+                    fused = self.fusion.apply_rerank(fused, rerank_scores)
             except Exception as e:
+                FALLBACKS.inc(kind="rerank_error")
                 print(f"[retrieve] Reranking 실패: {e}")
+                complete = False
 
         # 5) 결과 정렬 및 반환
-        sorted_results = sorted(fused.items(), key=lambda x: x[1], reverse=True)[:k]
+        sorted_results = self.fusion.top(fused, k)
         results = []
         for doc_id, score in sorted_results:
             if doc_id in self._doc_map:
@@ -272,7 +385,100 @@ class Retriever:
                     "score": score
                 })
 
-        return results
+        return results, complete
+
+    def _get_title_index(self) -> TitleIndex:
+        index = self._title_index
+        if index is not None and index.generation == self.generation:
+            return index
+        with self._title_lock:
+            index = self._title_index
+            if index is None or index.generation != self.generation:
+                generation = self.generation
+                start = time.perf_counter()
+                index = TitleIndex.build(self._doc_map.items(), generation)
+                self._title_index = index
+                log.info(f"[INDEX] 제목 인덱스 구축: {len(index)}개 ({(time.perf_counter() - start) * 1000:.0f}ms)")
+        return index
+
+    def embed_query(self, query: str) -> List[float]:
+        """쿼리 임베딩 (캐시 우선)"""
+        qvec = self.embed_cache.get(query)
+        if qvec is None:
+            # BGE 권장: query 접두어 + 직접 임베딩 사용
+            with timer(STAGE_SECONDS, stage="embed"):
+                qvec = self.query_embedder.embed_one("query: " + query)
+            self.embed_cache.put(query, qvec)
+        return qvec
+
+    def _dense_search(self, query: str, candidate_k: int) -> List[Tuple[str, float]]:
+        """Dense 후보: (doc_id, 1 - cosine distance) — 실패하면 빈 목록"""
+        return self._stage("dense", self._dense_hits, query, candidate_k)[0]
+
+    def _sparse_search(self, query: str, candidate_k: int) -> List[Tuple[str, float]]:
+        """BM25 후보: (doc_id, raw bm25 score) — 실패하면 빈 목록"""
+        return self._stage("sparse", self._sparse_hits, query, candidate_k)[0]
+
+    @staticmethod
+    def _stage(name: str, fn, query: str, candidate_k: int) -> Tuple[List[Tuple[str, float]], bool]:
+        """(후보, 성공 여부) — 예외는 삼키고 빈 후보로 대체"""
+        try:
+            return fn(query, candidate_k), True
+        except Exception as e:
+            print(f"[retrieve] {name} 검색 실패: {e}")
+            FALLBACKS.inc(kind=f"{name}_error")
+            return [], False
+
+    def _dense_hits(self, query: str, candidate_k: int) -> List[Tuple[str, float]]:
+        if not self.dense_ok:
+            return []
+        hits = []
+        qvec = self.embed_query(query)
+        with timer(STAGE_SECONDS, stage="chroma"):
+            dense_results = self.collection.query(
+                query_embeddings=[qvec],
+                n_results=candidate_k,
+                include=["metadatas", "documents", "distances"]
+            )
+        if dense_results["ids"] and dense_results["ids"][0]:
+            for i, doc_id in enumerate(dense_results["ids"][0]):
+                # Chroma는 거리 반환 → 유사도로 변환 (1 - 거리)
+                distance = dense_results["distances"][0][i]
+                hits.append((doc_id, 1.0 - distance))
+        return hits
+
+    def _sparse_hits(self, query: str, candidate_k: int) -> List[Tuple[str, float]]:
+        if not self._bm25:
+            return []
+        tokenized_query = self._tokenize(query)
+        # Top-k BM25 결과 (매칭 문서만 점수 계산, delta/tombstone 반영)
+        with timer(STAGE_SECONDS, stage="bm25"):
+            return self._bm25.top_k(tokenized_query, candidate_k)
+
+    def _run_stages_parallel(self, query: str, candidate_k: int):
+        """dense/sparse 를 stage 풀에서 동시에 실행 — 단계별 타임아웃 초과/예외 시 해당 결과는 버림"""
+        stages = {
+            "dense": (self._dense_hits, settings.dense_timeout_ms),
+            "sparse": (self._sparse_hits, settings.sparse_timeout_ms),
+        }
+        start = time.perf_counter()
+        futures = {
+            name: self._stage_pool.submit(self._stage, name, fn, query, candidate_k)
+            for name, (fn, _) in stages.items()
+        }
+        out, complete = {}, True
+        for name, fut in futures.items():
+            timeout_ms = stages[name][1]
+            remaining = timeout_ms / 1000.0 - (time.perf_counter() - start)
+            try:
+                out[name], ok = fut.result(timeout=max(0.0, remaining))
+                complete = complete and ok
+            except FuturesTimeout:
+                print(f"[retrieve] {name} 단계 타임아웃({timeout_ms}ms) — 결과 제외")
+                FALLBACKS.inc(kind=f"{name}_timeout")
+                out[name] = []
+                complete = False
+        return out["dense"], out["sparse"], complete
 
     def rebuild_dense_from_docmap(self, batch_size: int = 256) -> Dict[str, Any]:
         if not self._doc_map:
@@ -315,6 +521,8 @@ class Retriever:
                 flush()
         flush()
 
+        self._bump_generation()
+
         return {
             "chroma_count": self.collection.count(),
             "doc_map_size": len(self._doc_map),
@@ -324,11 +532,4 @@ class Retriever:
 
     @staticmethod
     def _tokenize(text: str) -> List[str]:
-        # Korean-friendly simple character bi/tri-gram tokenizer
-        s = "".join(str(text).split())
-        if not s:
-            return []
-        grams = []
-        grams += [s[i:i+2] for i in range(len(s)-1)]  # bi-gram
-        grams += [s[i:i+3] for i in range(len(s)-2)]  # tri-gram
-        return grams
+        return tokenize(text)
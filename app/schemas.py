@@ -20,6 +20,9 @@ class IndexRequest(BaseModel):
     pkl_path: str = Field(..., description="Path to final_result.pkl")
     reset: bool = Field(default=False, description="Whether to wipe existing vector store")
 
+class IndexDeleteRequest(BaseModel):
+    ids: List[str] = Field(..., description="Document IDs to remove from Chroma / BM25 / doc map")
+
 class Message(BaseModel):
     role: str
     content: str
@@ -0,0 +1,196 @@
+# app/sparse.py
+"""
+BM25 스파스 인덱스 (CSR posting list)
+- rank_bm25.BM25Okapi 와 동일한 점수식(k1, b, epsilon)을 사용
+- 쿼리 토큰이 등장하는 문서의 posting 만 훑어서 점수를 누적
+- top-k 는 전체 정렬 대신 argpartition 으로 선택
+- 디스크 포맷: npy 배열 + meta.json (pickle 없음), np.load(mmap_mode="r") 로 열어
+  여러 worker 가 OS 페이지 캐시를 공유
+"""
+from __future__ import annotations
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+import numpy as np
+
+FORMAT_VERSION = 1
+_ARRAYS = ("vocab", "indptr", "indices", "tfs", "doc_len", "idf")
+
+
+def tokenize(text: str) -> List[str]:
+    # Korean-friendly simple character bi/tri-gram tokenizer
+    s = "".join(str(text).split())
+    if not s:
+        return []
+    grams = []
+    grams += [s[i:i+2] for i in range(len(s)-1)]  # bi-gram
+    grams += [s[i:i+3] for i in range(len(s)-2)]  # tri-gram
+    return grams
+
+
+def calc_idf(df: np.ndarray, corpus_size: int, epsilon: float) -> np.ndarray:
+    # rank_bm25.BM25Okapi._calc_idf 와 동일: 음수 idf 는 epsilon * 평균 idf 로 대체
+    idf = np.log(corpus_size - df + 0.5) - np.log(df + 0.5)
+    if idf.size:
+        eps = epsilon * float(idf.mean())
+        idf = np.where(idf < 0, eps, idf)
+    return idf.astype(np.float32)
+
+
+def write_meta(path: Path, corpus_size: int, avgdl: float, k1: float, b: float, epsilon: float) -> None:
+    meta = {
+        "format": FORMAT_VERSION, "corpus_size": corpus_size, "avgdl": avgdl,
+        "k1": k1, "b": b, "epsilon": epsilon,
+    }
+    (path / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+
+class SparseBM25:
+    def __init__(self, vocab: np.ndarray, indptr: np.ndarray, indices: np.ndarray,
+                 tfs: np.ndarray, doc_len: np.ndarray,
+                 k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25,
+                 idf: Optional[np.ndarray] = None, avgdl: Optional[float] = None):
+        self.vocab = vocab            # 정렬된 token 배열 (row = posting list 번호)
+        self.indptr = indptr          # int64[V+1]
+        self.indices = indices        # int32[nnz]  문서 번호
+        self.tfs = tfs                # float32[nnz] 토큰 빈도
+        self.doc_len = doc_len        # float32[N]
+        self.k1, self.b, self.epsilon = k1, b, epsilon
+        self.corpus_size = int(doc_len.shape[0])
+        if avgdl is None:
+            avgdl = float(doc_len.mean()) if self.corpus_size else 0.0
+        self.avgdl = avgdl
+        self.idf = idf if idf is not None else self._calc_idf(np.diff(indptr))
+
+    # ---------------- Build ----------------
+    @classmethod
+    def build(cls, tokenized_docs: Sequence[Sequence[str]], **params) -> "SparseBM25":
+        vocab: Dict[str, int] = {}
+        rows: List[np.ndarray] = []
+        cols: List[np.ndarray] = []
+        vals: List[np.ndarray] = []
+        doc_len = np.zeros(len(tokenized_docs), dtype=np.float32)
+
+        for doc_idx, tokens in enumerate(tokenized_docs):
+            doc_len[doc_idx] = len(tokens)
+            if not tokens:
+                continue
+            counts = Counter(tokens)
+            rows.append(np.fromiter((vocab.setdefault(t, len(vocab)) for t in counts), dtype=np.int64, count=len(counts)))
+            cols.append(np.full(len(counts), doc_idx, dtype=np.int32))
+            vals.append(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+
+        if rows:
+            row = np.concatenate(rows)
+            col = np.concatenate(cols)
+            val = np.concatenate(vals)
+        else:
+            row = np.zeros(0, dtype=np.int64)
+            col = np.zeros(0, dtype=np.int32)
+            val = np.zeros(0, dtype=np.float32)
+
+        # vocab 을 정렬해 row 번호를 다시 매김 → 조회는 searchsorted
+        tokens = np.array(list(vocab), dtype=str) if vocab else np.zeros(0, dtype="<U1")
+        sort = np.argsort(tokens, kind="stable")
+        remap = np.empty(len(sort), dtype=np.int64)
+        remap[sort] = np.arange(len(sort))
+        row = remap[row]
+
+        # token 기준 정렬 (문서 순서는 stable 하게 유지)
+        order = np.argsort(row, kind="stable")
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row, minlength=len(vocab)), out=indptr[1:])
+        return cls(tokens[sort], indptr, col[order], val[order], doc_len, **params)
+
+    @classmethod
+    def from_okapi(cls, bm25) -> "SparseBM25":
+        """기존 bm25.pkl(rank_bm25.BM25Okapi) 을 변환"""
+        tokenized = [[t for t, c in freqs.items() for _ in range(c)] for freqs in bm25.doc_freqs]
+        return cls.build(tokenized, k1=bm25.k1, b=bm25.b, epsilon=bm25.epsilon)
+
+    def _calc_idf(self, df: np.ndarray) -> np.ndarray:
+        return calc_idf(df, self.corpus_size, self.epsilon)
+
+    # ---------------- Persistence ----------------
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(path / f"{name}.npy", np.ascontiguousarray(getattr(self, name)), allow_pickle=False)
+        write_meta(path, self.corpus_size, self.avgdl, self.k1, self.b, self.epsilon)
+
+    @classmethod
+    def load(cls, path: str | Path, mmap: bool = True) -> "SparseBM25":
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 sparse 인덱스 포맷: {meta.get('format')}")
+        mode = "r" if mmap else None
+        arrs = {name: np.load(path / f"{name}.npy", mmap_mode=mode, allow_pickle=False) for name in _ARRAYS}
+        return cls(arrs["vocab"], arrs["indptr"], arrs["indices"], arrs["tfs"], arrs["doc_len"],
+                   k1=meta["k1"], b=meta["b"], epsilon=meta["epsilon"],
+                   idf=arrs["idf"], avgdl=meta["avgdl"])
+
+    @staticmethod
+    def exists(path: str | Path) -> bool:
+        return (Path(path) / "meta.json").exists()
+
+    # ---------------- Scoring ----------------
+    def _rows(self, tokens: Sequence[str]) -> np.ndarray:
+        """token → posting row (없으면 -1)"""
+        if not len(tokens) or not len(self.vocab):
+            return np.full(len(tokens), -1, dtype=np.int64)
+        q = np.array(tokens, dtype=str)
+        pos = np.searchsorted(self.vocab, q)
+        pos = np.minimum(pos, len(self.vocab) - 1)
+        return np.where(self.vocab[pos] == q, pos, -1)
+
+    def _accumulate(self, query_tokens: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """쿼리 토큰의 posting 만 모아 (문서 번호, 점수) 를 반환"""
+        docs, weights = [], []
+        counts = Counter(query_tokens)
+        toks = list(counts)
+        for tok, row in zip(toks, self._rows(toks)):
+            if row < 0:
+                continue
+            qf = counts[tok]
+            s, e = self.indptr[row], self.indptr[row + 1]
+            d = self.indices[s:e]
+            tf = self.tfs[s:e]
+            denom = tf + self.k1 * (1.0 - self.b + self.b * self.doc_len[d] / self.avgdl)
+            docs.append(d)
+            weights.append((qf * self.idf[row]) * tf * (self.k1 + 1.0) / denom)
+        if not docs:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        docs_cat = np.concatenate(docs)
+        w_cat = np.concatenate(weights)
+        if len(docs_cat) * 8 > self.corpus_size:
+            # posting 이 많으면 dense 누적이 정렬(np.unique)보다 빠름
+            dense = np.bincount(docs_cat, weights=w_cat, minlength=self.corpus_size)
+            uniq = np.flatnonzero(dense)
+            return uniq, dense[uniq]
+        uniq, inv = np.unique(docs_cat, return_inverse=True)
+        scores = np.bincount(inv, weights=w_cat, minlength=len(uniq))
+        return uniq, scores
+
+    def get_scores(self, query_tokens: Iterable[str]) -> np.ndarray:
+        """BM25Okapi.get_scores 호환 (전체 문서 점수)"""
+        out = np.zeros(self.corpus_size, dtype=np.float64)
+        docs, scores = self._accumulate(query_tokens)
+        out[docs] = scores
+        return out
+
+    def top_k(self, query_tokens: Iterable[str], k: int) -> List[Tuple[int, float]]:
+        """점수 > 0 인 상위 k개 (문서 번호, 점수) — 내림차순"""
+        docs, scores = self._accumulate(query_tokens)
+        if k <= 0 or not len(docs):
+            return []
+        if len(docs) > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+            docs, scores = docs[part], scores[part]
+        order = np.argsort(-scores, kind="stable")
+        return [(int(docs[i]), float(scores[i])) for i in order if scores[i] > 0]
+
+    def __len__(self) -> int:
+        return self.corpus_size
@@ -0,0 +1,325 @@
+# app/sparse_index.py
+"""
+증분 갱신 가능한 sparse 인덱스 (mmap base + 메모리 delta)
+- base   : SparseBM25 + DocStore (mmap, 불변)
+- delta  : 추가/수정된 문서의 posting (메모리), 문서 빈도(df) 유지
+- tomb   : 삭제/대체된 base row 집합 (+ 해당 토큰 df 차감)
+- 변경 내역은 {root}/delta.jsonl 저널에 append → 재시작/다른 worker 는 저널을 재생
+- delta/tombstone 이 커지면 compaction 으로 base 를 다시 만들고 저널을 비움
+- 저널 쓰기/compaction 은 {root}.lock 으로 직렬화 — root 디렉토리는 compaction 때 통째로 교체되므로
+  lock 파일은 그 밖에 둠 (교체된 디렉토리의 저널에 쓰면 변경이 유실됨)
+delta 가 없으면 base 의 점수와 동일하고, delta 가 있을 때 IDF/avgdl 은 활성 문서 기준으로 계산합니다
+(음수 IDF 대체값의 평균 IDF 만 base 기준 근사).
+"""
+from __future__ import annotations
+from collections import Counter, defaultdict
+from collections.abc import Mapping
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import json
+import math
+import os
+import shutil
+import threading
+import numpy as np
+from .sparse import SparseBM25, tokenize
+from .docstore import DocStore
+from .index_builder import IndexBuilder
+
+try:
+    import fcntl  # 여러 worker 가 같은 저널에 쓰는 경우 직렬화 (POSIX)
+except Exception:
+    fcntl = None
+
+JOURNAL = "delta.jsonl"
+
+
+@contextmanager
+def index_lock(root: str | Path):
+    """{root}.lock 배타 잠금 — root 교체(compaction/전체 재구축)와 저널 쓰기를 직렬화"""
+    root = Path(root)
+    root.parent.mkdir(parents=True, exist_ok=True)
+    f = open(root.with_name(root.name + ".lock"), "ab")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+    finally:
+        f.close()  # close 시 flock 해제
+
+
+class _DocMapView(Mapping):
+    """base DocStore 위에 delta/tombstone 을 덮어쓴 doc_id → 문서 뷰"""
+    def __init__(self, index: "MutableSparseIndex"):
+        self._ix = index
+
+    def __getitem__(self, doc_id: str) -> Dict[str, Any]:
+        ix = self._ix
+        with ix._lock:  # compaction 중 base 교체와 섞이지 않도록
+            j = ix.delta_ids.get(doc_id)
+            if j is not None:
+                return ix.delta_rows[j][0]
+            row = ix.base_docs.row_of(doc_id) if isinstance(doc_id, str) else -1
+            if row < 0 or row in ix.tomb:
+                raise KeyError(doc_id)
+            return ix.base_docs.get_row(row)
+
+    def __contains__(self, doc_id: object) -> bool:
+        try:
+            self[doc_id]
+            return True
+        except KeyError:
+            return False
+
+    def __iter__(self) -> Iterator[str]:
+        for doc_id, _ in self.items():
+            yield doc_id
+
+    def __len__(self) -> int:
+        return self._ix.n_active
+
+    def items(self):
+        ix = self._ix
+        tomb = set(ix.tomb)
+        for row in range(ix.n_base):
+            if row not in tomb:
+                yield ix.base_docs.id_at(row), ix.base_docs.get_row(row)
+        for entry in list(ix.delta_rows):
+            if entry is not None:
+                yield entry[0]["id"], entry[0]
+
+    def values(self):
+        for _, doc in self.items():
+            yield doc
+
+
+class MutableSparseIndex:
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self._lock = threading.RLock()
+        self.docs = _DocMapView(self)
+        self._open()
+
+    @staticmethod
+    def exists(root: str | Path) -> bool:
+        root = Path(root)
+        return SparseBM25.exists(root / "bm25") and DocStore.exists(root / "docs")
+
+    def _signature(self):
+        st = os.stat(self.root / "bm25" / "meta.json")
+        return (st.st_ino, st.st_mtime_ns)
+
+    def _open(self):
+        with self._lock:
+            self.base = SparseBM25.load(self.root / "bm25")
+            self.base_docs = DocStore(self.root / "docs")
+            self.n_base = len(self.base)
+            self._sig = self._signature()
+            self._avg_idf: Optional[float] = None
+            self.tomb: set = set()
+            self.tomb_df: Counter = Counter()
+            self.delta_rows: List[Optional[Tuple[Dict[str, Any], Counter, int]]] = []
+            self.delta_ids: Dict[str, int] = {}
+            self.delta_postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+            self.delta_df: Counter = Counter()
+            self.n_active = self.n_base
+            self.total_len = self.base.avgdl * self.n_base
+            self._journal_pos = 0
+            self._replay()
+
+    def __len__(self) -> int:
+        return self.n_active
+
+    # ---------------- 변경 적용 ----------------
+    def _remove(self, doc_id: str) -> None:
+        j = self.delta_ids.pop(doc_id, None)
+        if j is not None:
+            _, tokens, length = self.delta_rows[j]
+            self.delta_rows[j] = None
+            for t in tokens:
+                self.delta_postings[t].pop(j, None)
+                self.delta_df[t] -= 1
+            self.n_active -= 1
+            self.total_len -= length
+            return
+        row = self.base_docs.row_of(doc_id)
+        if row < 0 or row in self.tomb:
+            return
+        self.tomb.add(row)
+        for t in set(tokenize(self.base_docs.get_row(row).get("text", ""))):
+            self.tomb_df[t] += 1
+        self.n_active -= 1
+        self.total_len -= float(self.base.doc_len[row])
+
+    def _add(self, doc: Dict[str, Any]) -> None:
+        self._remove(doc["id"])
+        tokens = Counter(tokenize(doc.get("text", "")))
+        length = sum(tokens.values())
+        j = len(self.delta_rows)
+        self.delta_rows.append((doc, tokens, length))
+        self.delta_ids[doc["id"]] = j
+        for t, c in tokens.items():
+            self.delta_postings[t][j] = c
+            self.delta_df[t] += 1
+        self.n_active += 1
+        self.total_len += length
+
+    def _apply_op(self, op: Dict[str, Any]) -> None:
+        if op.get("op") == "upsert":
+            self._add(op["doc"])
+        elif op.get("op") == "delete":
+            self._remove(op["id"])
+
+    def _replay(self) -> bool:
+        """저널에서 아직 반영하지 않은 줄을 적용"""
+        path = self.root / JOURNAL
+        if not path.exists() or path.stat().st_size <= self._journal_pos:
+            return False
+        with open(path, "rb") as f:
+            f.seek(self._journal_pos)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # 쓰는 중인 마지막 줄은 다음에
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._apply_op(json.loads(line))
+        self._journal_pos += end
+        return end > 0
+
+    def _sync(self) -> None:
+        """잠금을 잡은 뒤 호출 — 다른 worker 가 root 를 교체했으면 다시 열고, 아니면 저널만 재생"""
+        if self._signature() != self._sig:
+            self._open()
+        else:
+            self._replay()
+
+    def apply(self, upserts: Sequence[Dict[str, Any]] = (), deletes: Sequence[str] = ()) -> Dict[str, int]:
+        ops = [{"op": "upsert", "doc": {k: d.get(k, "") for k in ("id", "text", "title", "url", "category")}} for d in upserts]
+        ops += [{"op": "delete", "id": doc_id} for doc_id in deletes]
+        with self._lock, index_lock(self.root):
+            self._sync()  # 다른 worker 가 쓴 내용 / compaction 결과 먼저 반영
+            # 잠금 이후에 열어야 현재 root 의 저널에 씀
+            with open(self.root / JOURNAL, "ab") as f:
+                f.write(b"".join(json.dumps(op, ensure_ascii=False).encode("utf-8") + b"\n" for op in ops))
+                f.flush()
+                os.fsync(f.fileno())
+                for op in ops:
+                    self._apply_op(op)
+                self._journal_pos = f.tell()
+        return {"upserted": len(upserts), "deleted": len(deletes)}
+
+    def refresh(self) -> bool:
+        """다른 worker 의 변경(저널 추가 / compaction) 반영. 변경이 있으면 True"""
+        with self._lock:
+            try:
+                if self._signature() != self._sig:
+                    self._open()
+                    return True
+            except FileNotFoundError:
+                return False
+            return self._replay()
+
+    # ---------------- Compaction ----------------
+    def delta_size(self) -> int:
+        return len(self.delta_ids) + len(self.tomb)
+
+    def needs_compaction(self, ratio: float, min_ops: int) -> bool:
+        return self.delta_size() > max(min_ops, ratio * self.n_base)
+
+    def compact(self, chunk_size: int = 2048) -> Dict[str, Any]:
+        """활성 문서로 base 를 다시 만들고 저널을 비움 (IndexBuilder: 메모리 = vocab + 청크)"""
+        with self._lock, index_lock(self.root):
+            self._sync()
+            work_dir = self.root.with_name(self.root.name + ".compact")
+            shutil.rmtree(work_dir, ignore_errors=True)
+            builder = IndexBuilder(work_dir)
+            it = iter(self.docs.values())
+            i = 0
+            while True:
+                chunk = list(islice(it, chunk_size))
+                if not chunk:
+                    break
+                builder.write_chunk(i, chunk, [tokenize(d.get("text", "")) for d in chunk])
+                i += 1
+            stats = builder.finalize(self.root, k1=self.base.k1, b=self.base.b, epsilon=self.base.epsilon)
+            builder.cleanup()
+            self._open()
+        return stats
+
+    # ---------------- Scoring ----------------
+    def _average_idf(self) -> float:
+        # BM25Okapi 의 음수 IDF 대체값(epsilon * 평균 IDF) — base vocab 기준
+        if self._avg_idf is None:
+            df = np.diff(self.base.indptr)
+            n = self.n_base
+            self._avg_idf = float((np.log(n - df + 0.5) - np.log(df + 0.5)).mean()) if df.size else 0.0
+        return self._avg_idf
+
+    def top_k(self, query_tokens: Iterable[str], k: int) -> List[Tuple[str, float]]:
+        """점수 > 0 인 상위 k개 (doc_id, 점수)"""
+        with self._lock:
+            if not self.delta_rows and not self.tomb:
+                return [(self.base_docs.id_at(r), s) for r, s in self.base.top_k(query_tokens, k)]
+            return self._top_k_with_delta(query_tokens, k)
+
+    def _top_k_with_delta(self, query_tokens: Iterable[str], k: int) -> List[Tuple[str, float]]:
+        base = self.base
+        n = self.n_active
+        if n <= 0 or k <= 0:
+            return []
+        avgdl = self.total_len / n if self.total_len > 0 else 1.0
+        k1, b = base.k1, base.b
+        eps = base.epsilon * self._average_idf()
+
+        counts = Counter(query_tokens)
+        toks = list(counts)
+        rows = base._rows(toks)
+        base_docs, base_w = [], []
+        delta_scores: Dict[int, float] = defaultdict(float)
+        for tok, row in zip(toks, rows):
+            df = self.delta_df.get(tok, 0) - self.tomb_df.get(tok, 0)
+            if row >= 0:
+                s, e = int(base.indptr[row]), int(base.indptr[row + 1])
+                df += e - s
+            if df <= 0:
+                continue
+            idf = math.log(n - df + 0.5) - math.log(df + 0.5)
+            if idf < 0:
+                idf = eps
+            w = counts[tok] * idf
+            if row >= 0:
+                d = base.indices[s:e]
+                tf = base.tfs[s:e]
+                base_docs.append(d)
+                base_w.append(w * tf * (k1 + 1.0) / (tf + k1 * (1.0 - b + b * base.doc_len[d] / avgdl)))
+            for j, tf in self.delta_postings.get(tok, {}).items():
+                length = self.delta_rows[j][2]
+                delta_scores[j] += w * tf * (k1 + 1.0) / (tf + k1 * (1.0 - b + b * length / avgdl))
+
+        cand_ids: List[str] = []
+        cand_scores: List[float] = []
+        if base_docs:
+            d = np.concatenate(base_docs)
+            uniq, inv = np.unique(d, return_inverse=True)
+            sc = np.bincount(inv, weights=np.concatenate(base_w), minlength=len(uniq))
+            if self.tomb:
+                keep = ~np.isin(uniq, np.fromiter(self.tomb, dtype=np.int64, count=len(self.tomb)))
+                uniq, sc = uniq[keep], sc[keep]
+            if len(uniq) > k:
+                part = np.argpartition(-sc, k - 1)[:k]
+                uniq, sc = uniq[part], sc[part]
+            cand_ids += [self.base_docs.id_at(int(r)) for r in uniq]
+            cand_scores += sc.tolist()
+        for j, s in delta_scores.items():
+            cand_ids.append(self.delta_rows[j][0]["id"])
+            cand_scores.append(s)
+        order = sorted(range(len(cand_ids)), key=lambda i: cand_scores[i], reverse=True)[:k]
+        return [(cand_ids[i], float(cand_scores[i])) for i in order if cand_scores[i] > 0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_docs": self.n_base, "active_docs": self.n_active,
+            "delta_docs": len(self.delta_ids), "tombstones": len(self.tomb),
+            "journal_bytes": self._journal_pos,
+        }
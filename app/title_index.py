@@ -0,0 +1,76 @@
+# app/title_index.py
+"""
+fuzzy fallback 용 제목 인덱스 (인덱스 generation 마다 한 번 구축)
+- 제목 배열 + 글자 bigram → 제목 번호 posting (공백 제거 + casefold 기준)
+- 검색: 제목이 많으면 쿼리 bigram 을 많이 공유하는 상위 max_candidates 개만 남긴 뒤
+  rapidfuzz process.cdist(partial_ratio, workers=-1) 로 점수 계산
+- 점수는 기존 fallback 과 같음 (partial_ratio / 원문 제목)
+"""
+from __future__ import annotations
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Set, Tuple
+import numpy as np
+from rapidfuzz import process, fuzz
+
+
+def _grams(text: str) -> Set[str]:
+    s = "".join(str(text).split()).casefold()
+    return {s[i:i + 2] for i in range(len(s) - 1)}
+
+
+class TitleIndex:
+    def __init__(self, ids: List[str], titles: List[str], generation: int = 0):
+        self.ids = ids
+        self.titles = titles
+        self.generation = generation
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for i, title in enumerate(titles):
+            for g in _grams(title):
+                postings[g].append(i)
+        self.postings = {g: np.asarray(rows, dtype=np.int32) for g, rows in postings.items()}
+
+    @classmethod
+    def build(cls, items: Iterable[Tuple[str, Dict[str, Any]]], generation: int = 0) -> "TitleIndex":
+        ids, titles = [], []
+        for doc_id, doc in items:
+            ids.append(doc_id)
+            titles.append(str(doc.get("title", "") or ""))
+        return cls(ids, titles, generation)
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def _candidates(self, query: str, max_candidates: int, prefilter_min: int) -> np.ndarray:
+        """partial_ratio 를 계산할 제목 번호 — 적으면 전부, 많으면 bigram 공유 수 상위만"""
+        n = len(self.titles)
+        grams = _grams(query)
+        if n <= prefilter_min or not grams:
+            return np.arange(n, dtype=np.int32)
+        hit = [self.postings[g] for g in grams if g in self.postings]
+        if not hit:
+            return np.empty(0, dtype=np.int32)
+        counts = np.bincount(np.concatenate(hit), minlength=n)
+        rows = np.flatnonzero(counts)
+        if len(rows) > max_candidates:
+            top = np.argpartition(-counts[rows], max_candidates - 1)[:max_candidates]
+            rows = np.sort(rows[top])
+        return rows.astype(np.int32)
+
+    def search(self, query: str, limit: int, score_cutoff: float = 50.0,
+               max_candidates: int = 1024, prefilter_min: int = 2000) -> List[Tuple[str, float]]:
+        """[(doc_id, partial_ratio)] — score_cutoff 초과, 점수 내림차순 (동점은 제목 순서)"""
+        if not self.titles or limit <= 0:
+            return []
+        rows = self._candidates(query, max_candidates, prefilter_min)
+        if len(rows) == 0:
+            return []
+        titles = [self.titles[i] for i in rows]
+        scores = process.cdist([query], titles, scorer=fuzz.partial_ratio, workers=-1, dtype=np.float64)[0]
+        keep = np.flatnonzero(scores > score_cutoff)
+        if len(keep) == 0:
+            return []
+        order = keep[np.argsort(-scores[keep], kind="stable")][:limit]
+        return [(self.ids[rows[i]], float(scores[i])) for i in order]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"titles": len(self.titles), "grams": len(self.postings), "generation": self.generation}
@@ -27,8 +27,9 @@ def sse_post(url, payload, timeout=60):
                     obj = json.loads(data)
                 except Exception:
                     continue
-                if obj.get("type") == "chunk":
-                    chunks.append(obj.get("text", ""))
+                # 서버는 {"type": "token", "content": ...} 로 보냄 (done/tool 이벤트의 data 는 무시)
+                if obj.get("type") == "token":
+                    chunks.append(obj.get("content", ""))
         return "".join(chunks)
 
 def get_index_status(base_url, q, k=3):
@@ -0,0 +1,110 @@
+import argparse, json, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.config import settings  # noqa: E402
+
+"""
+리랭커 벤치마크: 현재 리랭커(FlagEmbedding, 512 토큰, cascade 없음)를 기준으로
+새 설정(backend / 토큰 예산 / cascade margin / 배칭)의 recall@k 와 지연을 비교
+- 후보: 리랭커를 끈 Retriever 의 융합 상위 RERANK_TOP_K 문서 (서비스와 같은 후보)
+- recall@k = |새 설정 top-k ∩ 기준 top-k| / k, top1 = 1위 일치 비율
+- 배칭 효과는 --concurrency 로 동시에 요청을 보내 처리량으로 확인
+
+예) python scripts/bench_rerank.py --backend onnx --onnx-path onnx/reranker-int8 --max-tokens 256 --margin 0.2
+"""
+
+def load_queries(path, limit):
+    with open(path, encoding="utf-8") as f:
+        qs = [ln.strip() for ln in f if ln.strip()]
+    return qs[:limit] if limit else qs
+
+def pct(xs, q):
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 1) if xs else 0.0
+
+def run(reranker, queries, candidates, concurrency):
+    """질의별 (순위 doc_id 목록, 지연 ms), 전체 소요 초"""
+    def one(i):
+        t0 = time.perf_counter()
+        cands = candidates[i]
+        scores = reranker.rerank(queries[i], cands)
+        order = [d for d, _, _ in cands]
+        if scores:
+            order = sorted(order, key=lambda d: scores[d], reverse=True)
+        return order, (time.perf_counter() - t0) * 1000.0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        out = list(pool.map(one, range(len(queries))))
+    return out, time.perf_counter() - start
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", default="eval_queries_ko.txt")
+    ap.add_argument("--limit", type=int, default=0)
+    ap.add_argument("--k", type=int, default=settings.top_k)
+    ap.add_argument("--backend", default=settings.reranker_backend, choices=["flag", "onnx"])
+    ap.add_argument("--onnx-path", default=settings.reranker_onnx_path)
+    ap.add_argument("--max-tokens", type=int, default=settings.rerank_max_tokens)
+    ap.add_argument("--margin", type=float, default=settings.rerank_skip_margin)
+    ap.add_argument("--no-batch", action="store_true")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--out", default="", help="결과 JSON 저장 경로")
+    args = ap.parse_args()
+
+    # 후보 생성용 Retriever 는 리랭커 없이 로드
+    settings.enable_reranker = False
+    from app.retriever import Retriever
+    from app.rerank import Reranker, FlagBackend, build_backend
+
+    queries = load_queries(args.queries, args.limit)
+    retriever = Retriever()
+    candidates = []
+    for q in queries:
+        docs = retriever.retrieve(q, k=settings.rerank_top_k)
+        candidates.append([(d["id"], d["score"], d["text"]) for d in docs])
+    print(f"[bench] 질의 {len(queries)}개, 후보 평균 {sum(map(len, candidates)) / max(1, len(queries)):.1f}개")
+
+    # 기준: 기존 경로와 같은 설정 (fp16 요청, 512 토큰, cascade/배칭 없음, 동시성 1)
+    base = Reranker(FlagBackend(settings.reranker_model, 512, fp16=True), skip_margin=0.0, batch=False)
+    base_out, base_s = run(base, queries, candidates, 1)
+
+    settings.reranker_onnx_path = args.onnx_path
+    new = Reranker(
+        build_backend(args.backend, args.max_tokens),
+        skip_margin=args.margin,
+        batch=not args.no_batch,
+        max_batch=settings.rerank_batch_max_size,
+        max_wait_ms=settings.rerank_batch_max_wait_ms,
+    )
+    new_out, new_s = run(new, queries, candidates, args.concurrency)
+
+    k = args.k
+    recalls, top1 = [], 0
+    for (ref, _), (got, _) in zip(base_out, new_out):
+        ref_k = set(ref[:k])
+        if ref_k:
+            recalls.append(len(ref_k & set(got[:k])) / len(ref_k))
+        if ref and got and ref[0] == got[0]:
+            top1 += 1
+
+    def lat(out, secs):
+        ms = [m for _, m in out]
+        return {"p50_ms": pct(ms, 0.50), "p95_ms": pct(ms, 0.95), "qps": round(len(ms) / secs, 2) if secs else 0.0}
+
+    report = {
+        "queries": len(queries),
+        "k": k,
+        f"recall@{k}": round(sum(recalls) / len(recalls), 4) if recalls else 0.0,
+        "top1_agreement": round(top1 / len(queries), 4) if queries else 0.0,
+        "baseline": {"backend": "flag", "max_tokens": 512, **lat(base_out, base_s)},
+        "candidate": {**new.stats(), "concurrency": args.concurrency, **lat(new_out, new_s)},
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import argparse, json, resource, sys, time, tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.config import settings  # noqa: E402
+from app.cache import normalize_query  # noqa: E402
+
+"""
+오프라인 retrieval 벤치마크 (서버 없이 Retriever 를 직접 호출)
+- 품질: leg 별(dense / bm25 / fuzzy / fused / reranked) recall@k, MRR
+- 지연: 단계별(embed / dense / bm25 / fuzzy / fusion / rerank / retrieve) p50/p95/p99
+- 메모리: tracemalloc 파이썬 힙 peak, 프로세스 maxrss
+- 결과 JSON 을 --baseline 과 비교해 품질 하락/지연 증가를 표시 (--fail-on-regression 이면 exit 1)
+
+라벨 파일(JSONL, 한 줄에 한 질의):
+  {"query": "미성년자도 스마트스토어를 개설할 수 있나요?", "relevant_ids": ["..."], "relevant_titles": ["..."]}
+  relevant_ids / relevant_titles 중 하나만 있어도 됨 (제목은 정확히 일치)
+라벨 초안 만들기 (eval_queries_ko.txt 의 질의 + 현재 융합 상위 후보 → 사람이 정답만 남기기):
+  python scripts/bench_retrieval.py --make-labels eval_retrieval_labels.jsonl
+
+예) python scripts/bench_retrieval.py --labels eval_retrieval_labels.jsonl --out bench.json --baseline bench_base.json
+"""
+
+LEGS = ["dense", "bm25", "fuzzy", "fused", "reranked"]
+STAGES = ["embed", "dense", "bm25", "fuzzy", "fusion", "rerank", "retrieve"]
+
+def pct(xs, q):
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 2) if xs else None
+
+def timed(fn, *a, **kw):
+    t0 = time.perf_counter()
+    out = fn(*a, **kw)
+    return out, (time.perf_counter() - t0) * 1000.0
+
+def load_labels(path):
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for ln in f:
+            if ln.strip():
+                rows.append(json.loads(ln))
+    return rows
+
+def relevant_ids(row, doc_map, title_to_ids):
+    ids = set(map(str, row.get("relevant_ids") or []))
+    for t in row.get("relevant_titles") or []:
+        ids.update(title_to_ids.get(t, []))
+    return {i for i in ids if i in doc_map}
+
+def run_legs(r, q, n):
+    """한 질의에 대해 각 leg 의 순위 목록과 단계별 지연(ms)"""
+    lat, ranked = {}, {}
+    # retrieve: 캐시(결과/쿼리 임베딩/리랭크 점수)를 비운 end-to-end
+    r.result_cache.clear()
+    r.embed_cache.lru.pop(normalize_query(q))
+    if r.reranker is not None:
+        r.reranker.cache.clear()
+    _, lat["retrieve"] = timed(r.retrieve, q, n)
+    # 이하 단계별 — embed 는 모델 forward 만, dense 는 (캐시된 임베딩으로) Chroma 검색만
+    _, lat["embed"] = timed(r.query_embedder.embed_one, "query: " + q)
+    dense, lat["dense"] = timed(r._dense_search, q, n)
+    sparse, lat["bm25"] = timed(r._sparse_search, q, n)
+    fuzzy, lat["fuzzy"] = timed(lambda: r._get_title_index().search(
+        q, n, score_cutoff=50, max_candidates=settings.fuzzy_max_candidates,
+        prefilter_min=settings.fuzzy_prefilter_min))
+    fused, lat["fusion"] = timed(r.fusion.fuse, dense, sparse)
+    ranked["dense"] = [d for d, _ in sorted(dense, key=lambda x: x[1], reverse=True)]
+    ranked["bm25"] = [d for d, _ in sorted(sparse, key=lambda x: x[1], reverse=True)]
+    ranked["fuzzy"] = [d for d, _ in fuzzy]
+    ranked["fused"] = [d for d, _ in r.fusion.top(fused, n)]
+    reranked = ranked["fused"]
+    if r.reranker is not None and fused:
+        top = r.fusion.top(fused, settings.rerank_top_k)
+        cands = [(d, s, r._doc_map[d]["text"]) for d, s in top if d in r._doc_map]
+        r.reranker.cache.clear()
+        scores, lat["rerank"] = timed(r.reranker.rerank, q, cands, r.generation)
+        if scores:
+            reranked = [d for d, _ in r.fusion.top(r.fusion.apply_rerank(fused, scores), n)]
+    ranked["reranked"] = reranked
+    return ranked, lat
+
+def quality(ranked_rows, ks):
+    out = {}
+    for leg in LEGS:
+        rows = [(ranked[leg], rel) for ranked, rel in ranked_rows if rel]
+        if not rows:
+            continue
+        m = {}
+        for k in ks:
+            m[f"recall@{k}"] = round(sum(len(set(rk[:k]) & rel) / len(rel) for rk, rel in rows) / len(rows), 4)
+        rr = []
+        for rk, rel in rows:
+            rank = next((i for i, d in enumerate(rk, start=1) if d in rel), None)
+            rr.append(1.0 / rank if rank else 0.0)
+        m["mrr"] = round(sum(rr) / len(rr), 4)
+        out[leg] = m
+    return out
+
+def diff(report, base, recall_tol, latency_tol):
+    """(변화 목록, 회귀 목록) — 품질은 절대값 하락, 지연은 p95 비율 증가로 판단"""
+    changes, regressions = [], []
+    for leg, ms in report["quality"].items():
+        for name, v in ms.items():
+            old = base.get("quality", {}).get(leg, {}).get(name)
+            if old is None:
+                continue
+            d = round(v - old, 4)
+            changes.append(f"quality.{leg}.{name}: {old} → {v} ({d:+})")
+            if d < -recall_tol:
+                regressions.append(changes[-1])
+    for stage, ls in report["latency_ms"].items():
+        old = base.get("latency_ms", {}).get(stage, {}).get("p95")
+        new = ls.get("p95")
+        if not old or new is None:
+            continue
+        ratio = new / old
+        changes.append(f"latency_ms.{stage}.p95: {old} → {new} (x{ratio:.2f})")
+        if ratio > 1.0 + latency_tol:
+            regressions.append(changes[-1])
+    return changes, regressions
+
+def make_labels(r, queries_path, out_path, n):
+    queries = [ln.strip() for ln in Path(queries_path).read_text(encoding="utf-8").splitlines() if ln.strip()]
+    with open(out_path, "w", encoding="utf-8") as f:
+        for q in queries:
+            docs = r.retrieve(q, k=n)
+            f.write(json.dumps({
+                "query": q,
+                "relevant_ids": [d["id"] for d in docs],
+                "candidates": [d["title"] for d in docs],  # 참고용 — 정답이 아닌 id 는 지우세요
+            }, ensure_ascii=False) + "\n")
+    print(f"[bench] 라벨 초안 {len(queries)}개 → {out_path}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--labels", default="eval_retrieval_labels.jsonl")
+    ap.add_argument("--queries", default="eval_queries_ko.txt", help="--make-labels 입력")
+    ap.add_argument("--make-labels", default="", help="라벨 초안 JSONL 경로")
+    ap.add_argument("--k", default="1,3,5,10")
+    ap.add_argument("--repeat", type=int, default=1, help="지연 측정을 위해 질의 세트 반복")
+    ap.add_argument("--out", default="bench_retrieval.json")
+    ap.add_argument("--baseline", default="")
+    ap.add_argument("--recall-tol", type=float, default=0.01)
+    ap.add_argument("--latency-tol", type=float, default=0.2)
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args()
+
+    ks = sorted({int(x) for x in args.k.split(",") if x})
+    n = max(max(ks), settings.top_k)
+
+    settings.embed_cache_path = ""  # worker 공유 임베딩 캐시는 쓰지 않음 (지연 측정 왜곡)
+    tracemalloc.start()
+    from app.retriever import Retriever
+    r, load_ms = timed(Retriever)
+    if args.make_labels:
+        make_labels(r, args.queries, args.make_labels, n)
+        return
+
+    labels = load_labels(args.labels)
+    doc_map = r._doc_map
+    title_to_ids = {}
+    for doc_id, doc in doc_map.items():
+        title_to_ids.setdefault(doc.get("title", ""), []).append(doc_id)
+
+    lat = {s: [] for s in STAGES}
+    ranked_rows = []
+    for it in range(max(1, args.repeat)):
+        for row in labels:
+            ranked, l = run_legs(r, row["query"], n)
+            for s, v in l.items():
+                lat[s].append(v)
+            if it == 0:
+                ranked_rows.append((ranked, relevant_ids(row, doc_map, title_to_ids)))
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report = {
+        "queries": len(labels),
+        "labeled": sum(1 for _, rel in ranked_rows if rel),
+        "config": {
+            "fusion": r.fusion.describe(),
+            "reranker": r.reranker.stats() if r.reranker is not None else None,
+            "top_k": settings.top_k, "rerank_top_k": settings.rerank_top_k,
+            "candidate_k": settings.retrieval_candidate_k or settings.rerank_top_k,
+            "docs": len(doc_map), "generation": r.generation,
+        },
+        "quality": quality(ranked_rows, ks),
+        "latency_ms": {
+            s: {"count": len(v), "mean": round(sum(v) / len(v), 2), "p50": pct(v, 0.50), "p95": pct(v, 0.95), "p99": pct(v, 0.99)}
+            for s, v in lat.items() if v
+        },
+        "memory": {
+            "tracemalloc_peak_mb": round(heap_peak / 1024 / 1024, 1),
+            "maxrss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "retriever_load_ms": round(load_ms, 1),
+        },
+    }
+    Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    print(f"[bench] 결과 저장: {args.out}")
+
+    if args.baseline:
+        base = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        changes, regressions = diff(report, base, args.recall_tol, args.latency_tol)
+        print("\n[bench] baseline 대비:")
+        for c in changes:
+            print("  " + c)
+        if regressions:
+            print(f"\n[bench] 회귀 {len(regressions)}건:")
+            for c in regressions:
+                print("  ✗ " + c)
+            if args.fail_on_regression:
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
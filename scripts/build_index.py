@@ -1,15 +1,33 @@
-import argparse, os, requests
+import argparse, os, sys, json, resource, requests
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
 from pathlib import Path
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.sparse import tokenize  # noqa: E402
+from app.index_builder import IndexBuilder  # noqa: E402
+from app.sparse_index import index_lock  # noqa: E402
+
 """
-오프라인 전처리 인덱서
-- 입력 pkl에서 문서 로드
-- (옵션) 로컬 임베딩(bge-m3 등)으로 임베딩 생성
-- Chroma에 업서트 또는 파일로 임베딩 저장
+오프라인 전처리 인덱서 (스트리밍 파이프라인)
+- 입력에서 문서를 청크 단위로 읽기
+  · .jsonl / .csv : 줄(행) 단위로 스트리밍 → peak 메모리가 코퍼스 크기와 무관
+  · .pkl          : pickle 특성상 전체를 한 번 메모리에 올림 (이후 단계만 청크 단위)
+    대용량이면 jsonl 로 한 번 변환해 두고 사용: --to-jsonl data/corpus.jsonl
+- BM25 토크나이즈는 멀티프로세스로 (청크 단위, in-flight 개수 제한)
+- (옵션) 로컬 임베딩(bge-m3 등)으로 배치 임베딩 → Chroma 에 제한된 크기로 업서트
+  (임베딩 입력에만 "passage: " 접두어, Chroma 에는 원문 저장)
+- 청크마다 체크포인트 기록 → 중단 후 재실행 시 이어서 진행
+- 마지막에 sparse 인덱스/문서 저장소를 병합 (Retriever 의 sparse_index 포맷)
 """
 
-def normalize_to_docs(obj):
+CHECKPOINT = "build_checkpoint.json"
+WORK_DIR = "sparse_index.build"
+INDEX_DIR = "sparse_index"  # app.retriever.INDEX_DIR 과 동일
+
+def iter_docs(obj):
     if isinstance(obj, pd.DataFrame):
         df = obj
     elif isinstance(obj, list):
@@ -40,27 +58,110 @@ def normalize_to_docs(obj):
     for col in ["question","answer","url","title","category"]:
         if col not in df.columns: df[col] = ""
 
-    docs = []
     for i, row in df.iterrows():
-        _id = str(row.get("id") or row.get("url") or f"doc-{i}")
-        q = str(row.get("question",""))
-        a = str(row.get("answer",""))
-        title = str(row.get("title","")) or q[:40]
-        url = str(row.get("url",""))
-        cat = str(row.get("category",""))
-        text = (q+"\n"+a).strip()
-        if text:
-            docs.append({"id":_id,"text":text,"title":title,"url":url,"category":cat})
-    return docs
+        doc = row_to_doc(row, i)
+        if doc:
+            yield doc
+
+def row_to_doc(row, i):
+    _id = str(row.get("id") or row.get("url") or f"doc-{i}")
+    q = str(row.get("question","") or "")
+    a = str(row.get("answer","") or "")
+    title = str(row.get("title","") or "") or q[:40]
+    url = str(row.get("url","") or "")
+    cat = str(row.get("category","") or "")
+    text = (q+"\n"+a).strip()
+    if text:
+        return {"id":_id,"text":text,"title":title,"url":url,"category":cat}
+    return None
+
+def iter_source(path, csv_chunk=10000):
+    """입력 파일 → 문서 스트림 (jsonl/csv 는 스트리밍, pkl 은 전체 로드)"""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".jsonl":
+        with open(path, encoding="utf-8") as f:
+            i = 0
+            for ln in f:
+                if not ln.strip():
+                    continue
+                doc = row_to_doc(json.loads(ln), i)
+                i += 1
+                if doc:
+                    yield doc
+    elif suffix == ".csv":
+        i = 0
+        for df in pd.read_csv(path, chunksize=csv_chunk, dtype=str, keep_default_na=False):
+            for row in df.to_dict("records"):
+                doc = row_to_doc(row, i)
+                i += 1
+                if doc:
+                    yield doc
+    else:
+        yield from iter_docs(pd.read_pickle(path))
+
+def to_jsonl(path, out_path):
+    """pkl → jsonl 한 번 변환 (이후 실행은 스트리밍)"""
+    n = 0
+    with open(out_path, "w", encoding="utf-8") as f:
+        for d in iter_source(path):
+            f.write(json.dumps({"id": d["id"], "question": d["text"], "title": d["title"],
+                                "url": d["url"], "category": d["category"]}, ensure_ascii=False) + "\n")
+            n += 1
+    print(f"Converted {n} docs → {out_path}")
+
+def normalize_to_docs(obj):
+    return list(iter_docs(obj))
+
+def iter_chunks(it, size):
+    it = iter(it)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def tokenize_chunk(docs):
+    return docs, [tokenize(d["text"]) for d in docs]
+
+def bounded_imap(pool, fn, iterable, window):
+    """Pool.imap 은 입력을 미리 전부 소비하므로, in-flight 작업 수를 window 로 제한"""
+    pending = deque()
+    for item in iterable:
+        pending.append(pool.apply_async(fn, (item,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+def load_checkpoint(path, source, chunk_size):
+    if not path.exists():
+        return 0
+    ck = json.loads(path.read_text(encoding="utf-8"))
+    if ck.get("source") != source or ck.get("chunk_size") != chunk_size:
+        raise SystemExit(f"체크포인트({path})가 다른 입력/청크 크기로 만들어졌습니다. --restart 로 처음부터 다시 실행하세요.")
+    return int(ck.get("chunks_done", 0))
+
+def save_checkpoint(path, source, chunk_size, chunks_done, docs_done):
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({
+        "source": source, "chunk_size": chunk_size,
+        "chunks_done": chunks_done, "docs_done": docs_done,
+    }), encoding="utf-8")
+    os.replace(tmp, path)
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--pkl", required=True, help="Path or URL to final_result.pkl")
+    ap.add_argument("--pkl", required=True, help="Path or URL to final_result.pkl (.jsonl / .csv are streamed)")
+    ap.add_argument("--to-jsonl", default="", help="Convert the input to JSONL and exit")
     ap.add_argument("--out_chroma", default="data/chroma", help="Chroma path to persist")
     ap.add_argument("--use_local", action="store_true", help="Use local embeddings (sentence-transformers)")
     ap.add_argument("--model", default="BAAI/bge-m3", help="Local embedding model name")
     ap.add_argument("--device", default="cpu", help="Embedding device: cpu|mps|cuda")
     ap.add_argument("--batch", type=int, default=16, help="Embedding batch size")
+    ap.add_argument("--chunk", type=int, default=512, help="Docs per pipeline chunk (checkpoint unit)")
+    ap.add_argument("--upsert_batch", type=int, default=256, help="Max docs per Chroma upsert call")
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1), help="Tokenizer processes")
+    ap.add_argument("--restart", action="store_true", help="Ignore checkpoint and rebuild from scratch")
     args = ap.parse_args()
 
     path = args.pkl
@@ -71,35 +172,70 @@ def main():
         Path("final_result.pkl").write_bytes(r.content)
         path = "final_result.pkl"
 
-    obj = pd.read_pickle(path)
-    docs = normalize_to_docs(obj)
-    print(f"Docs: {len(docs)}")
+    if args.to_jsonl:
+        to_jsonl(path, args.to_jsonl)
+        return
+
+    out = Path(args.out_chroma)
+    out.mkdir(parents=True, exist_ok=True)
+    ck_path = out / CHECKPOINT
+    builder = IndexBuilder(out / WORK_DIR)
+    if args.restart:
+        ck_path.unlink(missing_ok=True)
+        builder.cleanup()
+        builder = IndexBuilder(out / WORK_DIR)
+    source = str(Path(path).resolve())
+    chunks_done = load_checkpoint(ck_path, source, args.chunk)
+    # 체크포인트 이후에 spill 만 남은 청크는 Chroma 업서트 여부를 알 수 없으므로 다시 처리
+    if chunks_done:
+        print(f"Resume: {chunks_done} chunks already done")
 
-    # Build embeddings
-    vectors = None
+    model = None
     if args.use_local:
         from sentence_transformers import SentenceTransformer
-        import numpy as np
-        m = SentenceTransformer(args.model, device=args.device)
-        texts = [d["text"] for d in docs]
-        vecs = m.encode(
-            texts,
-            batch_size=max(1, args.batch),
-            show_progress_bar=True,
-            normalize_embeddings=True,
-        )
-        vectors = [v.tolist() for v in vecs]
-
-    # Upsert to Chroma
+        model = SentenceTransformer(args.model, device=args.device)
+
     import chromadb
     from chromadb.config import Settings as ChromaSettings
     client = chromadb.PersistentClient(path=args.out_chroma, settings=ChromaSettings(allow_reset=False))
     col = client.get_or_create_collection(name="smartstore_faq", metadata={"hnsw:space":"cosine"})
-    ids = [d["id"] for d in docs]
-    metadatas = [{"title":d.get("title",""),"url":d.get("url",""),"category":d.get("category","")} for d in docs]
-    texts = [d["text"] for d in docs]
-    col.upsert(ids=ids, metadatas=metadatas, documents=texts, embeddings=vectors)
+
+    chunks = iter_chunks(iter_source(path), max(1, args.chunk))
+    todo = islice(chunks, chunks_done, None)  # 완료된 청크는 토크나이즈/임베딩 생략
+
+    docs_done = chunks_done * args.chunk
+    with Pool(processes=max(1, args.workers)) as pool:
+        for i, (docs, tokenized) in enumerate(bounded_imap(pool, tokenize_chunk, todo, window=2 * args.workers), start=chunks_done):
+            for s in range(0, len(docs), max(1, args.upsert_batch)):
+                part = docs[s:s + args.upsert_batch]
+                part_texts = [d["text"] for d in part]
+                vectors = None
+                if model is not None:
+                    # BGE 권장: passage 접두어는 임베딩 입력에만
+                    vecs = model.encode(
+                        ["passage: " + t for t in part_texts],
+                        batch_size=max(1, args.batch),
+                        show_progress_bar=False,
+                        normalize_embeddings=True,
+                    )
+                    vectors = [v.tolist() for v in vecs]
+                col.upsert(
+                    ids=[d["id"] for d in part],
+                    metadatas=[{"title":d.get("title",""),"url":d.get("url",""),"category":d.get("category","")} for d in part],
+                    documents=part_texts,
+                    embeddings=vectors,
+                )
+            builder.write_chunk(i, docs, tokenized)
+            docs_done += len(docs)
+            save_checkpoint(ck_path, source, args.chunk, i + 1, docs_done)
+            print(f"[chunk {i}] docs={docs_done} maxrss={resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024}MB")
+
     print("Chroma upsert done.")
+    with index_lock(out / INDEX_DIR):  # 실행 중인 서버의 저널 쓰기와 교체가 겹치지 않도록
+        stats = builder.finalize(out / INDEX_DIR)
+    print(f"Sparse index built: {stats}")
+    builder.cleanup()
+    ck_path.unlink(missing_ok=True)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,192 @@
+import argparse, asyncio, itertools, json, time, uuid
+from pathlib import Path
+import httpx
+
+"""
+/chat/stream 부하 테스트 (asyncio SSE 클라이언트 N 개)
+- 서버는 LLM_PROVIDER=stub 으로 띄우면 쿼터 없이 측정 가능
+    LLM_PROVIDER=stub LLM_STUB_TTFT_MS=300 LLM_STUB_TOKENS_PER_S=50 LLM_STUB_ERROR_RATE=0.01 \\
+      ANSWER_CACHE_ENABLED=false RESULT_CACHE_SIZE=0 uvicorn app.main:app --workers 2
+  질문 파일을 반복하므로 캐시를 켜 두면 두 번째 바퀴부터는 캐시 재생만 측정됨
+  → 답변/결과 캐시를 끄고, --unique 로 질문마다 번호를 붙여 임베딩/리랭크 캐시도 피함
+- 실행 전후 /debug/cache_stats 의 hits/misses 차이를 함께 보고 (캐시가 결과에 섞였는지 확인)
+- 클라이언트 측: 처리량(req/s), 첫 토큰/전체 시간 p50/p95/p99, 오류율
+- 서버 측: 실행 중 /debug/runtime 을 주기적으로 읽어 최대 포화도(진행 중 chat, executor 대기열/대기 시간,
+  anyio threadpool, 이벤트 루프 지연) 보고
+
+예) python scripts/loadtest.py --concurrency 32 --duration 60 --unique --out loadtest.json
+"""
+
+def pct(xs, q):
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 1) if xs else None
+
+def summary(xs):
+    return {"p50": pct(xs, 0.50), "p95": pct(xs, 0.95), "p99": pct(xs, 0.99),
+            "mean": round(sum(xs) / len(xs), 1) if xs else None}
+
+async def one_request(client, base, message, timeout):
+    """(첫 토큰 ms, 전체 ms, 오류 종류 또는 None)"""
+    t0 = time.perf_counter()
+    ttft = None
+    payload = {"conversation_id": f"load-{uuid.uuid4().hex[:12]}", "message": message}
+    try:
+        async with client.stream("POST", f"{base}/chat/stream", json=payload, timeout=timeout) as r:
+            if r.status_code != 200:
+                return None, (time.perf_counter() - t0) * 1000.0, f"http_{r.status_code}"
+            done = False
+            async for line in r.aiter_lines():
+                if line.startswith("event: done"):
+                    done = True
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    obj = json.loads(line[5:].strip())
+                except Exception:
+                    continue
+                if obj.get("type") == "token":
+                    if ttft is None:
+                        ttft = (time.perf_counter() - t0) * 1000.0
+                    if str(obj.get("content", "")).startswith("[server error]"):
+                        return ttft, (time.perf_counter() - t0) * 1000.0, "server_error"
+            total = (time.perf_counter() - t0) * 1000.0
+            return ttft, total, None if done else "incomplete"
+    except httpx.TimeoutException:
+        return ttft, (time.perf_counter() - t0) * 1000.0, "timeout"
+    except Exception as e:
+        return ttft, (time.perf_counter() - t0) * 1000.0, type(e).__name__
+
+async def poll_runtime(client, base, interval, samples, stop):
+    while not stop.is_set():
+        try:
+            r = await client.get(f"{base}/debug/runtime", params={"reset": "true"}, timeout=5)
+            samples.append(r.json())
+        except Exception:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+async def cache_stats(client, base):
+    try:
+        r = await client.get(f"{base}/debug/cache_stats", timeout=5)
+        return r.json()
+    except Exception:
+        return {}
+
+def cache_delta(before, after):
+    """캐시별 실행 중 hits/misses 증가량 (worker 가 여러 개면 응답한 worker 기준)"""
+    out = {}
+    for name, st in after.items():
+        if not isinstance(st, dict) or "hits" not in st:
+            continue
+        prev = before.get(name) if isinstance(before.get(name), dict) else {}
+        hits = st["hits"] - prev.get("hits", 0)
+        misses = st.get("misses", 0) - prev.get("misses", 0)
+        out[name] = {"hits": hits, "misses": misses,
+                     "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0}
+    return out
+
+def saturation(samples):
+    """폴링 구간별 값 중 최댓값"""
+    def mx(path):
+        vals = []
+        for s in samples:
+            v = s
+            for k in path:
+                v = v.get(k) if isinstance(v, dict) else None
+            if isinstance(v, (int, float)):
+                vals.append(v)
+        return max(vals) if vals else None
+    return {
+        "samples": len(samples),
+        "chat_inflight_peak": mx(["chat", "peak"]),
+        "executor_queued_max": mx(["retrieval_executor", "queued"]),
+        "executor_active_max": mx(["retrieval_executor", "active"]),
+        "executor_queue_wait_ms_max": mx(["retrieval_executor", "queue_wait_ms_max"]),
+        "anyio_threadpool_borrowed_max": mx(["anyio_threadpool", "borrowed"]),
+        "event_loop_lag_ms_max": mx(["event_loop_lag", "max_ms"]),
+        "threads_max": mx(["threads"]),
+        "maxrss_mb": mx(["maxrss_mb"]),
+    }
+
+async def run(args):
+    queries = [ln.strip() for ln in Path(args.queries).read_text(encoding="utf-8").splitlines() if ln.strip()]
+    cycle = itertools.cycle(queries)
+    counter = itertools.count(1)
+
+    def next_message():
+        q = next(cycle)
+        return f"{q} ({next(counter)})" if args.unique else q
+
+    limits = httpx.Limits(max_connections=args.concurrency + 4, max_keepalive_connections=args.concurrency + 4)
+    results = []
+    async with httpx.AsyncClient(limits=limits) as client:
+        caches_before = await cache_stats(client, args.base)
+        samples, stop = [], asyncio.Event()
+        poller = asyncio.ensure_future(poll_runtime(client, args.base, args.poll_interval, samples, stop))
+        start = time.perf_counter()
+        deadline = start + args.duration if args.duration > 0 else None
+        remaining = [args.requests]
+
+        async def worker(i):
+            await asyncio.sleep(args.ramp * i / max(1, args.concurrency))  # 점진적 증가
+            while True:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                if deadline is None:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                results.append(await one_request(client, args.base, next_message(), args.timeout))
+
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await poller
+        caches_after = await cache_stats(client, args.base)
+
+    errors = {}
+    for _, _, err in results:
+        if err:
+            errors[err] = errors.get(err, 0) + 1
+    ok = [r for r in results if r[2] is None]
+    report = {
+        "base": args.base,
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "requests": len(results),
+        "rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "ok_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else 0.0,
+        "errors": errors,
+        "ttft_ms": summary([t for t, _, _ in ok if t is not None]),
+        "total_ms": summary([t for _, t, _ in ok]),
+        "server": saturation(samples),
+        "unique_messages": args.unique,
+        "cache": cache_delta(caches_before, caches_after),
+    }
+    return report
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://127.0.0.1:8000")
+    ap.add_argument("--queries", default="eval_queries_ko.txt")
+    ap.add_argument("--concurrency", type=int, default=16, help="동시 SSE 클라이언트 수")
+    ap.add_argument("--duration", type=float, default=30.0, help="초 (0 이면 --requests 만큼)")
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--ramp", type=float, default=2.0, help="클라이언트를 이 시간(초)에 걸쳐 시작")
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--poll-interval", type=float, default=1.0)
+    ap.add_argument("--unique", action="store_true", help="질문마다 번호를 붙여 임베딩/결과/리랭크 캐시 hit 방지")
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
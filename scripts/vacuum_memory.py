@@ -0,0 +1,31 @@
+import argparse, sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.config import settings  # noqa: E402
+from app.retention import RetentionEngine  # noqa: E402
+
+"""
+대화 메모리 DB 를 auto_vacuum=INCREMENTAL 로 1회 전환 (유지보수용)
+- 전체 VACUUM 을 실행하므로 DB 크기만큼 시간이 걸리고 그동안 다른 쓰기는 막힘
+  → 서비스를 내린 상태(또는 트래픽이 적은 시간)에 한 번 실행
+- 전환 후에는 retention 이 삭제 뒤 incremental_vacuum 으로 빈 페이지를 조금씩 반환
+
+예) python scripts/vacuum_memory.py --db data/memory.db
+"""
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=settings.sqlite_path)
+    args = ap.parse_args()
+
+    engine = RetentionEngine(db_path=args.db)
+    before = engine.metrics()
+    converted = engine.ensure_incremental_vacuum()
+    after = engine.metrics()
+    print(f"[vacuum] {args.db}: auto_vacuum {before['auto_vacuum']} → {after['auto_vacuum']}"
+          f"{'' if converted else ' (이미 전환됨)'}, "
+          f"db {before['db_bytes'] // 1024}KB → {after['db_bytes'] // 1024}KB")
+
+if __name__ == "__main__":
+    main()
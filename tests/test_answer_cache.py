@@ -0,0 +1,22 @@
+import numpy as np
+
+from app.cache import SemanticAnswerCache
+
+
+def test_scope_must_match_exactly():
+    cache = SemanticAnswerCache(threshold=0.9, maxsize=8, ttl_s=0)
+    q = np.array([1.0, 0.0, 0.0])
+    cache.put(q, ["b", "a"], "A 대화의 답변", scope=(0, "hist-a"))
+    assert cache.get(q, ["a", "b"], scope=(0, "hist-a")) == "A 대화의 답변"
+    assert cache.get(q, ["a", "b"], scope=(0, "hist-b")) is None  # 다른 대화 히스토리
+    assert cache.get(q, ["a", "b"], scope=(1, "hist-a")) is None  # 인덱스 generation 변경
+    assert cache.get(q, ["a", "c"], scope=(0, "hist-a")) is None
+
+
+def test_similarity_threshold_and_clear():
+    cache = SemanticAnswerCache(threshold=0.95, maxsize=8, ttl_s=0)
+    cache.put(np.array([1.0, 0.0]), ["a"], "답변")
+    assert cache.get(np.array([1.0, 0.01]), ["a"]) == "답변"
+    assert cache.get(np.array([1.0, 1.0]), ["a"]) is None
+    cache.clear()
+    assert cache.get(np.array([1.0, 0.0]), ["a"]) is None
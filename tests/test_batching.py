@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+import pytest
+
+from app.batching import BatchingEmbedder, MicroBatcher
+
+
+def test_results_are_routed_to_each_caller():
+    batcher = MicroBatcher(lambda items: [x * 10 for x in items], max_batch=8, max_wait_ms=20)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(batcher.run, range(50)))
+    assert results == [x * 10 for x in range(50)]
+    stats = batcher.stats()
+    assert stats["items"] == 50 and stats["max_batch_size"] <= 8
+
+
+def test_short_result_list_fails_every_caller():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(4)]
+    for fut in futures:
+        with pytest.raises(RuntimeError, match="결과 개수 불일치"):
+            fut.result(timeout=2)
+
+
+def test_exception_is_propagated_and_batcher_keeps_running():
+    calls = []
+
+    def fn(items):
+        calls.append(list(items))
+        if len(calls) == 1:
+            raise ValueError("boom")
+        return items
+
+    batcher = MicroBatcher(fn, max_batch=4, max_wait_ms=0)
+    with pytest.raises(ValueError, match="boom"):
+        batcher.run("a", timeout=2)
+    assert batcher.run("b", timeout=2) == "b"
+
+
+def test_run_times_out_when_fn_hangs():
+    release = threading.Event()
+    def fn(items):
+        release.wait()
+        return items
+
+    batcher = MicroBatcher(fn, max_wait_ms=0, timeout_s=0.05)
+    try:
+        with pytest.raises(FuturesTimeout):
+            batcher.run("x")
+    finally:
+        release.set()
+
+
+def test_batching_embedder_uses_one_encode_per_batch():
+    class Embedder:
+        dim, model_name = 2, "fake"
+        calls = 0
+
+        def embed(self, texts, show_progress_bar=True):
+            Embedder.calls += 1
+            return [[float(len(t)), 0.0] for t in texts]
+
+    emb = BatchingEmbedder(Embedder(), max_batch=32, max_wait_ms=30)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        vecs = list(pool.map(emb.embed_one, ["a", "bb", "ccc", "dddd"] * 2))
+    assert [v[0] for v in vecs] == [1.0, 2.0, 3.0, 4.0] * 2
+    assert Embedder.calls < 8
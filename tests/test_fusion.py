@@ -0,0 +1,108 @@
+import json
+import random
+
+import pytest
+
+from app.fusion import MODES, Fusion, FusionWeights
+
+CALIBRATED = [m for m in MODES if m != "legacy"]
+
+
+def legs(seed, n=30):
+    rng = random.Random(seed)
+    ids = [f"d{i}" for i in range(n)]
+    dense = [(d, rng.uniform(-0.2, 1.0)) for d in rng.sample(ids, rng.randint(0, n))]
+    sparse = [(d, rng.uniform(0.0, 40.0)) for d in rng.sample(ids, rng.randint(0, n))]
+    return dense, sparse
+
+
+def weights(dense=0.3):
+    return FusionWeights(dense=dense, sparse=1.0 - dense, rrf_k=60.0, rerank_scale=0.8, rerank_bias=-0.5)
+
+
+@pytest.mark.parametrize("mode", CALIBRATED)
+@pytest.mark.parametrize("seed", range(10))
+def test_calibrated_scores_are_in_unit_range(mode, seed):
+    f = Fusion(mode, weights())
+    dense, sparse = legs(seed)
+    fused = f.fuse(dense, sparse)
+    assert set(fused) == {d for d, _ in dense} | {d for d, _ in sparse}
+    assert all(0.0 <= s <= 1.0 for s in fused.values())
+    rng = random.Random(seed)
+    top = f.top(fused, 5)
+    reranked = f.apply_rerank(fused, {d: rng.uniform(-10, 10) for d, _ in top})
+    assert all(0.0 <= s <= 1.0 for s in reranked.values())
+
+
+@pytest.mark.parametrize("mode", ["rrf", "minmax"])
+def test_top_of_every_leg_scores_one(mode):
+    f = Fusion(mode, weights())
+    fused = f.fuse([("a", 0.9), ("b", 0.5), ("c", 0.1)], [("a", 12.0), ("c", 3.0)])
+    assert fused["a"] == pytest.approx(1.0)
+    assert fused["a"] > fused["b"] and fused["a"] > fused["c"]
+
+
+@pytest.mark.parametrize("mode", CALIBRATED)
+@pytest.mark.parametrize("seed", range(10))
+def test_non_reranked_candidates_stay_below_in_fused_order(mode, seed):
+    f = Fusion(mode, weights())
+    dense, sparse = legs(seed)
+    fused = f.fuse(dense, sparse)
+    if len(fused) < 4:
+        return
+    top = [d for d, _ in f.top(fused, 3)]
+    rng = random.Random(seed)
+    out = f.apply_rerank(fused, {d: rng.uniform(-10, 10) for d in top})
+    rest = [d for d in fused if d not in top]
+    floor = min(out[d] for d in top)
+    assert all(out[d] <= floor for d in rest)
+    assert all(out[d] < floor for d in rest if fused[d] < 1.0)
+    # 리랭크되지 않은 후보끼리는 융합 점수 순서 유지
+    for a in rest:
+        for b in rest:
+            if fused[a] > fused[b]:
+                assert out[a] >= out[b]
+
+
+def test_legacy_keeps_old_formula_and_raw_rerank_scores():
+    f = Fusion("legacy", FusionWeights(dense=0.2, sparse=0.8))
+    dense = [("a", 0.9), ("b", 0.4)]
+    sparse = [("a", 5.0), ("c", 25.0)]
+    fused = f.fuse(dense, sparse)
+    assert fused == pytest.approx({
+        "a": 0.9 * 0.2 + min(5.0 / 10.0, 1.0) * 0.8,
+        "b": 0.4 * 0.2,
+        "c": min(25.0 / 10.0, 1.0) * 0.8,
+    })
+    out = f.apply_rerank(fused, {"a": -3.5, "c": 7.0})
+    assert out == pytest.approx({"a": -3.5, "b": 0.4 * 0.2, "c": 7.0})
+    assert f.apply_rerank(fused, {}) == fused
+
+
+def test_weights_file_overrides_defaults(tmp_path):
+    path = tmp_path / "w.json"
+    path.write_text(json.dumps({"dense": 0.4, "sparse": 0.6, "rrf_k": 10, "unknown": 1}), encoding="utf-8")
+    w = FusionWeights.load(str(path), dense_weight=0.25)
+    assert (w.dense, w.sparse, w.rrf_k) == (0.4, 0.6, 10.0)
+    assert (w.rerank_scale, w.rerank_bias) == (1.0, 0.0)
+
+
+def test_weights_fall_back_without_or_with_bad_file(tmp_path):
+    w = FusionWeights.load("", dense_weight=0.25)
+    assert (w.dense, w.sparse) == (0.25, 0.75)
+    bad = tmp_path / "bad.json"
+    bad.write_text("{not json", encoding="utf-8")
+    w = FusionWeights.load(str(bad), dense_weight=0.25)
+    assert (w.dense, w.sparse, w.rrf_k) == (0.25, 0.75, 60.0)
+    assert FusionWeights.load(str(tmp_path / "missing.json"), dense_weight=0.25).dense == 0.25
+
+
+def test_cache_key_changes_with_mode_and_weights():
+    a = Fusion("rrf", weights(0.3)).cache_key
+    assert a != Fusion("minmax", weights(0.3)).cache_key
+    assert a != Fusion("rrf", weights(0.4)).cache_key
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        Fusion("max", weights())
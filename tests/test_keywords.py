@@ -0,0 +1,81 @@
+import json
+import os
+import random
+
+import pytest
+
+from app.keywords import DEFAULT_PATH, AhoCorasick, KeywordMatcher
+
+
+def naive(keywords, text):
+    """기존 방식: 카테고리별로 키워드마다 부분 문자열 검사"""
+    t = text.casefold()
+    return {c: {w for w in words if w and w.casefold() in t} for c, words in keywords.items()}
+
+
+def as_sets(hits, keywords):
+    return {c: set(hits.get(c, ())) for c in keywords}
+
+
+def test_overlapping_and_nested_matches():
+    kw = {"a": ["he", "she", "his", "hers"], "b": ["는", "한국어는"]}
+    ac = AhoCorasick(kw)
+    hits = ac.scan("ushers 그리고 한국어는")
+    assert hits["a"] == ["she", "he", "hers"]  # 끝나는 위치 순서, 겹침 포함
+    assert hits["b"] == ["한국어는", "는"]
+
+
+def test_casefold_keeps_original_keyword():
+    ac = AhoCorasick({"smart": ["GPT", "Straße"]})
+    assert ac.scan("gpt 와 STRASSE") == {"smart": ["GPT", "Straße"]}
+
+
+def test_same_word_in_several_categories_and_duplicates():
+    ac = AhoCorasick({"x": ["hi", "hi", ""], "y": ["hi"]})
+    assert ac.scan("hi hi") == {"x": ["hi"], "y": ["hi"]}
+    assert ac.scan("h i") == {}
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_parity_with_naive(seed):
+    rng = random.Random(seed)
+    alphabet = "abAB가나"
+    kw = {c: [
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 8))
+    ] for c in ("c1", "c2", "c3")}
+    ac = AhoCorasick(kw)
+    for _ in range(30):
+        text = "".join(rng.choice(alphabet + " ") for _ in range(rng.randint(0, 40)))
+        assert as_sets(ac.scan(text), kw) == naive(kw, text)
+
+
+def test_shipped_keywords_parity():
+    with open(DEFAULT_PATH, encoding="utf-8") as f:
+        kw = json.load(f)
+    ac = AhoCorasick(kw)
+    samples = [w for words in kw.values() for w in words]
+    for text in samples + ["안녕하세요 도와주세요", "고마워요! 최신 뉴스 알려줘", "", "완전히 무관한 문장"]:
+        assert as_sets(ac.scan(text), kw) == naive(kw, text)
+
+
+def test_matcher_reloads_on_change(tmp_path):
+    path = tmp_path / "kw.json"
+    path.write_text(json.dumps({"greeting": ["hello"]}), encoding="utf-8")
+    m = KeywordMatcher(path, check_interval_s=0)
+    assert m.match("Hello there") == {"greeting": ["hello"]}
+
+    path.write_text(json.dumps({"thanks": ["thanks"]}), encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert m.match("hello, thanks") == {"thanks": ["thanks"]}
+    assert m.stats()["keywords"] == {"thanks": 1}
+
+
+def test_matcher_keeps_automaton_on_bad_file(tmp_path):
+    path = tmp_path / "kw.json"
+    path.write_text(json.dumps({"greeting": ["hello"]}), encoding="utf-8")
+    m = KeywordMatcher(path, check_interval_s=0)
+    path.write_text("{broken", encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert m.match("hello") == {"greeting": ["hello"]}
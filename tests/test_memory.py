@@ -0,0 +1,91 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.memory import CachedConversationMemory, ConversationMemory, PooledConversationMemory
+
+
+class GatedMemory(PooledConversationMemory):
+    """gate 가 열릴 때까지 배치 쓰기를 막음 → pending 상태를 고정해서 검사"""
+
+    def __init__(self, db_path):
+        self.gate = threading.Event()
+        self.batches = []
+        super().__init__(db_path)
+
+    def _write_batch(self, items):
+        self.gate.wait(5)
+        self.batches.append(len(items))
+        return super()._write_batch(items)
+
+
+def test_fetch_reads_own_pending_writes(tmp_path):
+    mem = GatedMemory(str(tmp_path / "m.db"))
+    for i in range(5):
+        mem.add("c1", "user" if i % 2 == 0 else "assistant", f"m{i}")
+    assert mem.stats()["pending"] > 0
+    assert [c for _, c in mem.fetch("c1")] == [f"m{i}" for i in range(5)]
+    assert mem.fetch("c2") == []
+    mem.gate.set()
+    mem.flush()
+    assert mem.stats()["pending"] == 0
+    assert [c for _, c in mem.fetch("c1")] == [f"m{i}" for i in range(5)]
+
+
+def test_fetch_merges_committed_and_pending_in_order(tmp_path):
+    mem = GatedMemory(str(tmp_path / "m.db"))
+    mem.gate.set()
+    for i in range(4):
+        mem.add("c1", "user", f"m{i}")
+    mem.flush()
+    mem.gate.clear()
+    for i in range(4, 7):
+        mem.add("c1", "assistant", f"m{i}")
+    assert [c for _, c in mem.fetch("c1", limit=12)] == [f"m{i}" for i in range(7)]
+    assert [c for _, c in mem.fetch("c1", limit=5)] == [f"m{i}" for i in range(2, 7)]
+    assert [c for _, c in mem.fetch("c1", limit=2)] == ["m5", "m6"]  # pending 만으로 채움
+    mem.gate.set()
+    mem.flush()
+
+
+def test_writes_are_batched_and_persisted(tmp_path):
+    db = str(tmp_path / "m.db")
+    mem = GatedMemory(db)
+    futures = [mem.add("c1", "user", f"m{i}") for i in range(20)]
+    mem.gate.set()
+    mem.flush()
+    assert all(f.done() for f in futures)
+    assert sum(mem.batches) == 20 and len(mem.batches) < 20
+    # 다른 연결(기존 구현)로 읽어도 같은 순서
+    assert [c for _, c in ConversationMemory(db).fetch("c1", limit=50)] == [f"m{i}" for i in range(20)]
+
+
+def test_concurrent_adds_are_all_persisted(tmp_path):
+    db = str(tmp_path / "m.db")
+    mem = PooledConversationMemory(db)
+
+    def worker(n):
+        conv = f"c{n}"
+        for i in range(25):
+            mem.add(conv, "user", f"{conv}-{i}")
+            assert mem.fetch(conv, limit=1) == [("user", f"{conv}-{i}")]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(worker, range(8)))
+    mem.flush()
+    plain = ConversationMemory(db)
+    for n in range(8):
+        assert [c for _, c in plain.fetch(f"c{n}", limit=100)] == [f"c{n}-{i}" for i in range(25)]
+
+
+def test_cached_window_matches_store(tmp_path):
+    db = str(tmp_path / "m.db")
+    pooled = PooledConversationMemory(db)
+    cached = CachedConversationMemory(pooled, window=4)
+    pooled.add("c1", "user", "old")
+    cached.fetch("c1")  # 창을 캐시에 올림
+    for i in range(6):
+        cached.add("c1", "assistant" if i % 2 else "user", f"m{i}")
+    for limit in (1, 3, 4, 8):
+        assert cached.fetch("c1", limit) == pooled.fetch("c1", limit)
+        assert cached.format_as_chat("c1", limit) == pooled.format_as_chat("c1", limit)
+    pooled.flush()
@@ -0,0 +1,95 @@
+import random
+import re
+
+import pytest
+
+from app.postprocess import AnswerFilter
+
+CITATIONS = "<citations>\n- (정산 안내) (https://help.example/1)\n</citations>"
+
+
+# ---- 스트리밍 전 후처리 (전체 버퍼 기준) — AnswerFilter 의 기준 동작 ----
+def _strip_persona(text):
+    lines = text.splitlines()
+    out, started = [], False
+    persona = re.compile(r"(상담사입니다|전문가입니다|도와드리겠습니다)", re.I)
+    for ln in lines:
+        if not started and (ln.strip().startswith("안녕하세요") or persona.search(ln)):
+            continue
+        started = True
+        out.append(ln)
+    return "\n".join(out).strip()
+
+
+def _dedup_followups(text):
+    m = re.search(r"<followups>(.*?)</followups>", text, flags=re.S)
+    if not m:
+        return text
+    uniq, out = set(), []
+    for ln in m.group(1).splitlines():
+        ln = ln.strip()
+        if ln.startswith("-"):
+            key = ln[1:].strip().lower()
+            if key and key not in uniq:
+                uniq.add(key)
+                out.append(ln)
+        if len(out) >= 2:
+            break
+    newblk = "<followups>\n" + ("\n".join(out) if out else "- 다른 점도 도와드릴까요?") + "\n</followups>"
+    return text[:m.start()] + newblk + text[m.end():]
+
+
+def legacy(text, cits=CITATIONS):
+    final = _strip_persona(text)
+    final = _dedup_followups(final)
+    if "<citations>" in final:
+        return re.sub(r"<citations>.*?</citations>", cits, final, flags=re.S)
+    return final + "\n\n" + cits
+
+
+def stream(text, sizes, cits=CITATIONS):
+    f = AnswerFilter(cits)
+    out, i = [], 0
+    for n in sizes:
+        out.append(f.feed(text[i:i + n]))
+        i += n
+    out.append(f.feed(text[i:]))
+    out.append(f.finish())
+    assert "".join(out) == f.text
+    return f.text
+
+
+ANSWERS = [
+    "정산은 매주 수요일에 진행돼요.\n- 정산 관리 메뉴에서 확인\n<followups>\n- 수수료도 알려드릴까요?\n- 수수료도 알려드릴까요?\n- 빠른정산은?\n</followups>\n<citations>\n- (x) (y)\n</citations>",
+    "안녕하세요!\n스마트스토어 상담사입니다.\n\n상품 등록은 상품관리 > 상품 등록에서 해요.\n<followups>\n- 일괄 등록 방법은?\n</followups>",
+    "본문만 있는 답변입니다.   \n\n",
+    "안녕하세요\n도와드리겠습니다\n",
+    "a < b 이고 <b>강조</b> 도 통과\n<followups>\n</followups>\n끝",
+    "답변\n<followups>\n- A\n- a\n- B\n- C\n</followups>\n<citations>\n- 1\n</citations>\n꼬리\n<citations>\n- 2\n</citations>",
+    "- 불릿으로 시작\n<followups>\n-\n- 질문?\n</followups>",
+    "",
+]
+
+
+@pytest.mark.parametrize("text", ANSWERS)
+def test_matches_legacy_single_chunk(text):
+    assert stream(text, []) == legacy(text)
+
+
+@pytest.mark.parametrize("text", ANSWERS)
+def test_matches_legacy_char_by_char(text):
+    assert stream(text, [1] * len(text)) == legacy(text)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_legacy_random_chunks(seed):
+    rng = random.Random(seed)
+    for text in ANSWERS:
+        sizes = [rng.randint(1, 12) for _ in range(len(text))]
+        assert stream(text, sizes) == legacy(text), (seed, text)
+
+
+def test_empty_citations_block_when_no_context():
+    empty = "<citations>\n</citations>"
+    text = "답변\n<citations>\n- (a) (b)\n</citations>"
+    assert stream(text, [3] * 10, cits=empty) == legacy(text, cits=empty)
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from app.llm_stub import StubLLM, StubLLMError
+from app.providers import CircuitBreaker, ProviderRouter, StubProvider
+
+
+def stub(name, ttft_ms=0.0, error_rate=0.0, failures=5):
+    p = StubProvider(StubLLM(ttft_ms=ttft_ms, tokens_per_s=0.0, error_rate=error_rate, tokens=3, jitter=0.0))
+    p.name = name
+    p.breaker = CircuitBreaker(failures=failures, reset_s=60.0)
+    return p
+
+
+def collect(router, messages=None):
+    async def run():
+        return [e async for e in router.astream_events(messages or [])]
+    return asyncio.run(run())
+
+
+def test_failover_on_error_before_first_token():
+    primary, backup = stub("primary", error_rate=1.0), stub("backup")
+    router = ProviderRouter([primary, backup])
+    events = collect(router)
+    assert events and all(kind == "token" for kind, _ in events)
+    assert router.failovers == 1
+    assert primary.errors == 1 and primary.breaker.consecutive == 1
+    assert backup.breaker.state == "closed"
+
+
+def test_all_providers_fail_raises_last_error():
+    router = ProviderRouter([stub("a", error_rate=1.0), stub("b", error_rate=1.0)])
+    with pytest.raises(StubLLMError):
+        collect(router)
+
+
+def test_first_token_timeout_fails_over_and_records_failure():
+    stalled, backup = stub("stalled", ttft_ms=10_000, failures=1), stub("backup")
+    router = ProviderRouter([stalled, backup], first_token_timeout_ms=50)
+    events = collect(router)
+    assert events[0][0] == "token"
+    assert router.failovers == 1
+    assert stalled.errors == 1
+    assert stalled.breaker.state == "open"  # 멈춘 provider 도 브레이커에 반영
+    assert stalled.inflight == 0
+
+
+def test_first_token_timeout_without_backup_raises():
+    stalled = stub("stalled", ttft_ms=10_000)
+    router = ProviderRouter([stalled], first_token_timeout_ms=50)
+    with pytest.raises(asyncio.TimeoutError):
+        collect(router)
+    assert stalled.errors == 1
+
+
+def test_open_breaker_is_skipped():
+    broken, backup = stub("broken", failures=1), stub("backup")
+    broken.breaker.record_failure()
+    router = ProviderRouter([broken, backup])
+    collect(router)
+    assert broken.requests == 0 and backup.requests == 1
+    assert router.failovers == 0
+
+
+def test_hedge_wins_when_primary_is_slow():
+    slow, fast = stub("slow", ttft_ms=10_000), stub("fast")
+    router = ProviderRouter([slow, fast], hedge_after_ms=30)
+    events = collect(router)
+    assert events[0][0] == "token"
+    assert router.hedges == 1 and router.hedge_wins == 1
+    assert slow.inflight == 0 and slow.errors == 0  # 진 쪽은 취소만 (실패로 세지 않음)
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker(failures=1, reset_s=0.0)
+    breaker.record_failure()
+    assert breaker.allow() is True
+    assert breaker.state == "half_open"
+    assert breaker.allow() is False  # 시험 요청이 끝날 때까지 나머지는 차단
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow() is True
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = CircuitBreaker(failures=3, reset_s=0.0)
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.allow() is True
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.probing is False
@@ -0,0 +1,102 @@
+import gzip
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+from app.memory import ConversationMemory
+from app.retention import RetentionEngine
+
+
+def ts(days_ago=0.0, seconds=0):
+    return (datetime.utcnow() - timedelta(days=days_ago) + timedelta(seconds=seconds)).isoformat(timespec="seconds")
+
+
+def make_db(tmp_path, rows):
+    """rows: [(conversation_id, role, content, ts)] — 삽입 순서대로 id 증가"""
+    db = str(tmp_path / "m.db")
+    ConversationMemory(db)  # 스키마 생성
+    con = sqlite3.connect(db)
+    with con:
+        con.executemany("INSERT INTO messages (conversation_id, role, content, ts) VALUES (?,?,?,?)", rows)
+    con.close()
+    return db
+
+
+def all_rows(db):
+    con = sqlite3.connect(db)
+    try:
+        return con.execute("SELECT id, conversation_id, role, content, ts FROM messages ORDER BY id").fetchall()
+    finally:
+        con.close()
+
+
+class EvictSpy:
+    def __init__(self):
+        self.evicted = []
+
+    def evict(self, conv_id):
+        self.evicted.append(conv_id)
+
+
+def test_trim_keeps_newest_max_turns_with_shared_timestamps(tmp_path):
+    same = ts()
+    rows = [("c1", "user", f"m{i}", same) for i in range(12)]
+    # 더 늦은 ts 는 id 와 상관없이 최신 (같은 초 안에서는 id 가 순서)
+    rows.insert(0, ("c1", "assistant", "later-ts-low-id", ts(seconds=30)))
+    rows += [("c2", "user", f"x{i}", same) for i in range(3)]
+    db = make_db(tmp_path, rows)
+    spy = EvictSpy()
+    engine = RetentionEngine(db_path=db, memory=spy, max_turns=5, chunk_size=2)
+    out = engine.run_once()
+
+    left = all_rows(db)
+    c1 = [r[3] for r in left if r[1] == "c1"]
+    assert c1 == ["later-ts-low-id", "m8", "m9", "m10", "m11"]
+    assert [r[3] for r in left if r[1] == "c2"] == ["x0", "x1", "x2"]  # max_turns 이하 대화는 그대로
+    assert out["deleted_trimmed"] == 8 and out["deleted_expired"] == 0
+    assert spy.evicted == ["c1"]
+    # 다시 돌려도 더 지우지 않음
+    assert engine.run_once()["deleted_trimmed"] == 0
+
+
+def test_ttl_keeps_conversations_with_any_recent_message(tmp_path):
+    rows = [
+        ("old", "user", "o1", ts(40)), ("old", "assistant", "o2", ts(35)),
+        ("mixed", "user", "m1", ts(60)), ("mixed", "assistant", "m2", ts(1)),
+        ("new", "user", "n1", ts(0)),
+    ]
+    db = make_db(tmp_path, rows)
+    engine = RetentionEngine(db_path=db, ttl_days=30, chunk_size=1)
+    out = engine.run_once()
+    left = all_rows(db)
+    assert sorted({r[1] for r in left}) == ["mixed", "new"]
+    assert [r[3] for r in left if r[1] == "mixed"] == ["m1", "m2"]  # 오래된 메시지도 함께 유지
+    assert out["deleted_expired"] == 2
+
+
+def test_archive_matches_deleted_rows_across_chunks(tmp_path):
+    rows = [("c1", "user" if i % 2 else "assistant", f"내용 {i}", ts(0, seconds=i)) for i in range(23)]
+    rows += [("gone", "user", f"g{i}", ts(90)) for i in range(7)]
+    db = make_db(tmp_path, rows)
+    before = all_rows(db)
+    engine = RetentionEngine(db_path=db, ttl_days=30, max_turns=4, chunk_size=5,
+                             archive_dir=str(tmp_path / "archive"))
+    out = engine.run_once()
+
+    remaining = all_rows(db)
+    deleted = sorted(set(before) - set(remaining))
+    assert len(deleted) == 7 + 19 > engine.chunk_size
+    with gzip.open(out["archive"], "rt", encoding="utf-8") as f:
+        archived = [json.loads(line) for line in f]
+    assert sorted((a["id"], a["conversation_id"], a["role"], a["content"], a["ts"]) for a in archived) == deleted
+    assert len(archived) == len(deleted)  # 중복 없이
+    assert engine.totals["archived"] == len(deleted)
+    assert [r[3] for r in remaining] == [f"내용 {i}" for i in range(19, 23)]
+
+
+def test_disabled_engine_does_nothing(tmp_path):
+    db = make_db(tmp_path, [("c1", "user", "m", ts(400))])
+    engine = RetentionEngine(db_path=db)
+    assert not engine.enabled
+    engine.run_once()
+    assert len(all_rows(db)) == 1
@@ -0,0 +1,106 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.cache import LRUCache
+from app.config import settings
+from app.fusion import Fusion, FusionWeights
+from app.retriever import Retriever
+
+DOCS = {f"d{i}": {"title": f"제목 {i}", "text": f"본문 {i}"} for i in range(5)}
+
+
+class FlakyBM25:
+    def __init__(self, fail=0):
+        self.fail = fail
+        self.calls = 0
+
+    def top_k(self, tokens, k):
+        self.calls += 1
+        if self.calls <= self.fail:
+            raise RuntimeError("bm25 down")
+        return [("d1", 8.0), ("d2", 4.0)]
+
+
+class FlakyCollection:
+    def __init__(self, fail=0):
+        self.fail = fail
+        self.calls = 0
+
+    def query(self, **_):
+        self.calls += 1
+        if self.calls <= self.fail:
+            raise RuntimeError("chroma down")
+        return {"ids": [["d2", "d3"]], "distances": [[0.1, 0.3]]}
+
+
+class FlakyReranker:
+    def __init__(self, fail=0):
+        self.fail = fail
+        self.calls = 0
+
+    def rerank(self, query, candidates, generation=0):
+        self.calls += 1
+        if self.calls <= self.fail:
+            raise RuntimeError("reranker down")
+        return {doc_id: float(i) for i, (doc_id, _, _) in enumerate(candidates)}
+
+
+class Embedder:
+    def embed_one(self, text):
+        return [1.0, 0.0]
+
+
+def make_retriever(bm25_fail=0, dense_fail=0, rerank_fail=0):
+    r = object.__new__(Retriever)
+    r.dense_ok = True
+    r.collection = FlakyCollection(dense_fail)
+    r.embed_cache = LRUCache(maxsize=0)
+    r.query_embedder = Embedder()
+    r._bm25 = FlakyBM25(bm25_fail)
+    r._doc_map = dict(DOCS)
+    r.reranker = FlakyReranker(rerank_fail)
+    r.fusion = Fusion("legacy", FusionWeights(dense=0.5, sparse=0.5))
+    r.generation = 0
+    r._generation_listeners = []
+    r.result_cache = LRUCache(maxsize=16)
+    r._last_refresh = time.monotonic()
+    r._title_index = None
+    r._stage_pool = ThreadPoolExecutor(max_workers=2)
+    return r
+
+
+@pytest.fixture(params=[True, False], ids=["parallel", "serial"])
+def parallel(request, monkeypatch):
+    monkeypatch.setattr(settings, "parallel_retrieval", request.param)
+    monkeypatch.setattr(settings, "index_refresh_interval_s", 3600.0)
+    return request.param
+
+
+@pytest.mark.parametrize("failing", ["bm25_fail", "dense_fail", "rerank_fail"])
+def test_degraded_results_are_not_cached(parallel, failing):
+    r = make_retriever(**{failing: 1})
+    first = r.retrieve("질문", k=3)
+    assert len(r.result_cache) == 0
+    second = r.retrieve("질문", k=3)  # 장애가 풀리면 다시 계산해서 정상 결과를 캐시
+    assert len(r.result_cache) == 1
+    assert first != second
+    assert r.retrieve("질문", k=3) == second
+    assert r.collection.calls == 2 and r._bm25.calls == 2
+
+
+def test_complete_results_are_cached(parallel):
+    r = make_retriever()
+    first = r.retrieve("질문", k=3)
+    assert r.retrieve("질문", k=3) == first
+    assert r.collection.calls == 1 and r._bm25.calls == 1
+
+
+def test_generation_bump_clears_caches_and_notifies():
+    r = make_retriever()
+    seen = []
+    r.on_generation_change(lambda: seen.append(r.generation))
+    r.result_cache.put("k", [])
+    r._bump_generation()
+    assert seen == [1] and len(r.result_cache) == 0
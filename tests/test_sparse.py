@@ -0,0 +1,71 @@
+import random
+
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from app.sparse import SparseBM25, tokenize
+
+ALPHABET = list("abcdefghij")
+
+
+def corpus(seed, n=80):
+    rng = random.Random(seed)
+    # 앞쪽 글자일수록 자주 등장 → 문서 절반 이상에 나오는(음수 IDF) 토큰이 생김
+    weights = [2.0 ** -i for i in range(len(ALPHABET))]
+    return [rng.choices(ALPHABET, weights, k=rng.randint(0, 12)) for _ in range(n)]
+
+
+def queries(seed):
+    rng = random.Random(seed + 1000)
+    out = [["a"], ["a", "a", "b"], ["j", "j", "j"], ["zz"], [], ["a", "zz", "c", "c"]]
+    out += [rng.choices(ALPHABET + ["zz"], k=rng.randint(1, 6)) for _ in range(20)]
+    return out
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_get_scores_matches_okapi(seed):
+    docs = corpus(seed)
+    okapi = BM25Okapi(docs)
+    sparse = SparseBM25.build(docs)
+    assert sum("a" in d for d in docs) > len(docs) / 2  # "a" 는 음수 IDF → epsilon 대체값 경로
+    for q in queries(seed):
+        np.testing.assert_allclose(sparse.get_scores(q), okapi.get_scores(q), rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_top_k_matches_okapi(seed):
+    docs = corpus(seed)
+    okapi = BM25Okapi(docs)
+    sparse = SparseBM25.build(docs)
+    for q in queries(seed):
+        expected = okapi.get_scores(q)
+        for k in (1, 5, 200):
+            top = sparse.top_k(q, k)
+            want = sorted((s for s in expected if s > 0), reverse=True)[:k]
+            np.testing.assert_allclose([s for _, s in top], want, rtol=1e-5, atol=1e-6)
+            for doc, s in top:
+                assert s == pytest.approx(expected[doc], rel=1e-5)
+
+
+def test_save_load_mmap_round_trip(tmp_path):
+    docs = [tokenize(t) for t in ["스마트스토어 정산 주기", "반품 배송비 정산", "상품 등록 방법", ""]]
+    sparse = SparseBM25.build(docs, k1=1.2, b=0.7, epsilon=0.3)
+    sparse.save(tmp_path / "bm25")
+    assert SparseBM25.exists(tmp_path / "bm25")
+    loaded = SparseBM25.load(tmp_path / "bm25", mmap=True)
+    assert isinstance(loaded.indices, np.memmap)
+    assert (loaded.k1, loaded.b, loaded.epsilon, len(loaded)) == (1.2, 0.7, 0.3, 4)
+    for q in ["정산", "반품 정산", "등록 방법", "없는말"]:
+        toks = tokenize(q)
+        np.testing.assert_array_equal(loaded.get_scores(toks), sparse.get_scores(toks))
+        assert loaded.top_k(toks, 3) == sparse.top_k(toks, 3)
+
+
+def test_from_okapi_migration():
+    docs = corpus(7)
+    okapi = BM25Okapi(docs, k1=1.3, b=0.6, epsilon=0.2)
+    sparse = SparseBM25.from_okapi(okapi)
+    assert (sparse.k1, sparse.b, sparse.epsilon) == (1.3, 0.6, 0.2)
+    for q in queries(7):
+        np.testing.assert_allclose(sparse.get_scores(q), okapi.get_scores(q), rtol=1e-5, atol=1e-6)
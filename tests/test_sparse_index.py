@@ -0,0 +1,128 @@
+import random
+import threading
+import time
+
+import pytest
+
+from app.docstore import DocStore
+from app.index_builder import replace_dir
+from app.sparse import SparseBM25, tokenize
+from app.sparse_index import MutableSparseIndex, index_lock
+
+WORDS = ["정산", "배송", "반품", "교환", "상품", "등록", "수수료", "판매자", "쿠폰", "리뷰",
+         "광고", "택배", "환불", "주문", "취소", "세금", "계산서", "가입", "인증", "통장"]
+
+
+def make_docs(n, seed, prefix="d"):
+    rng = random.Random(seed)
+    return [{"id": f"{prefix}{i}", "title": f"{prefix}{i}", "url": "", "category": "",
+             "text": " ".join(rng.sample(WORDS, rng.randint(2, 6)))} for i in range(n)]
+
+
+def write_base(root, docs):
+    SparseBM25.build([tokenize(d["text"]) for d in docs]).save(root / "bm25")
+    DocStore.write(root / "docs", docs)
+    return MutableSparseIndex(root)
+
+
+def scores(index, query):
+    return {doc_id: round(s, 4) for doc_id, s in index.top_k(tokenize(query), 1000)}
+
+
+QUERIES = ["정산 수수료", "반품 교환 택배", "세금 계산서", "쿠폰", "가입 인증 통장"]
+
+
+@pytest.fixture
+def edited(tmp_path):
+    """base 60개 → 추가 10개 / 내용 변경 10개 / 삭제 10개 (증분) 와 같은 최종 문서 집합"""
+    base = make_docs(60, seed=1)
+    index = write_base(tmp_path / "inc", base)
+    added = make_docs(10, seed=2, prefix="n")
+    changed = [dict(d, text=t["text"]) for d, t in zip(base[:10], make_docs(10, seed=3))]
+    deleted = [d["id"] for d in base[10:20]]
+    index.apply(upserts=added + changed)
+    index.apply(deletes=deleted)
+    final = {d["id"]: d for d in base}
+    final.update({d["id"]: d for d in changed + added})
+    for doc_id in deleted:
+        final.pop(doc_id)
+    full = write_base(tmp_path / "full", list(final.values()))
+    return index, full, final
+
+
+def test_incremental_matches_full_rebuild(edited):
+    index, full, final = edited
+    assert len(index) == len(final)
+    assert dict(index.docs.items()) == {k: {f: v[f] for f in ("id", "text", "title", "url", "category")}
+                                        for k, v in final.items()}
+    for q in QUERIES:
+        assert scores(index, q) == scores(full, q)
+
+
+def test_compaction_matches_full_rebuild(edited):
+    index, full, _ = edited
+    index.compact(chunk_size=7)
+    assert index.stats()["delta_docs"] == 0 and index.stats()["tombstones"] == 0
+    assert not (index.root / "delta.jsonl").exists() or (index.root / "delta.jsonl").stat().st_size == 0
+    for q in QUERIES:
+        assert scores(index, q) == scores(full, q)
+
+
+def test_other_worker_sees_journal_and_compaction(tmp_path):
+    base = make_docs(40, seed=4)
+    writer = write_base(tmp_path / "ix", base)
+    reader = MutableSparseIndex(tmp_path / "ix")
+
+    writer.apply(upserts=make_docs(5, seed=5, prefix="n"), deletes=["d0"])
+    assert reader.refresh() is True
+    assert "n0" in reader.docs and "d0" not in reader.docs
+    for q in QUERIES:
+        assert scores(reader, q) == scores(writer, q)
+
+    writer.compact()
+    assert reader.refresh() is True  # base 교체 감지 → 다시 열기
+    assert reader.stats()["base_docs"] == len(base) + 5 - 1
+    for q in QUERIES:
+        assert scores(reader, q) == scores(writer, q)
+    assert reader.refresh() is False
+
+
+def test_reopen_replays_journal(tmp_path):
+    index = write_base(tmp_path / "ix", make_docs(30, seed=6))
+    index.apply(upserts=make_docs(3, seed=7, prefix="n"), deletes=["d1", "d2"])
+    reopened = MutableSparseIndex(tmp_path / "ix")
+    assert len(reopened) == 31
+    for q in QUERIES:
+        assert scores(reopened, q) == scores(index, q)
+
+
+def test_stale_worker_writes_into_current_journal_after_compaction(tmp_path):
+    root = tmp_path / "ix"
+    a = write_base(root, make_docs(30, seed=1))
+    b = MutableSparseIndex(root)
+    a.apply(deletes=["d0"])
+    a.compact()
+    # b 는 compaction 을 아직 모름 → apply 가 먼저 다시 열고 새 저널에 써야 함
+    b.apply(upserts=make_docs(1, seed=5, prefix="late"))
+    assert "late0" in b.docs and "d0" not in b.docs
+    fresh = MutableSparseIndex(root)
+    assert "late0" in fresh.docs and "d0" not in fresh.docs
+    assert a.refresh() and "late0" in a.docs
+
+
+def test_writer_blocked_during_swap_is_not_lost(tmp_path):
+    root = tmp_path / "ix"
+    docs = make_docs(30, seed=1)
+    write_base(root, docs)
+    b = MutableSparseIndex(root)
+    with index_lock(root):
+        t = threading.Thread(target=b.apply, kwargs={"upserts": make_docs(1, seed=5, prefix="late")})
+        t.start()
+        time.sleep(0.2)  # b 는 잠금 대기 중
+        assert t.is_alive()
+        write_base(tmp_path / "new", docs[1:])
+        replace_dir(tmp_path / "new", root)  # compaction 과 같은 디렉토리 교체
+    t.join(5)
+    fresh = MutableSparseIndex(root)
+    assert "late0" in fresh.docs and "d0" not in fresh.docs
+    assert "late0" in b.docs and "d0" not in b.docs